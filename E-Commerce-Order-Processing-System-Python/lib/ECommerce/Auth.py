@@ -6,6 +6,8 @@ Equivalent to Perl ECommerce::Controllers::Auth
 
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from lib.ECommerce.Identity import build_identity, get_identity, store_identity
+from lib.ECommerce.LoginThrottle import clear_login_failures, login_blocked, record_login_failure
 from lib.ECommerce.Models.User import User
 from lib.ECommerce.Models.Customer import Customer
 
@@ -17,25 +19,43 @@ class Auth:
     def login_user(request, username, password):
         """
         Authenticate and login a user.
-        Returns user object on success, None on failure.
+        Returns user object on success, None on failure or while logins for
+        the username or client address are throttled. A password stored with
+        an older hasher or cost is rehashed with the current settings here.
         """
+        if login_blocked(request, username):
+            return None
+
         user = authenticate(request, username=username, password=password)
 
         if user is not None and user.is_active:
             login(request, user)
+            clear_login_failures(username)
 
-            # Store customer_id in session if user is a customer
-            if user.role == 'customer':
-                customer = Customer.get_customer_by_user_id(user.id)
-                if customer:
-                    request.session['customer_id'] = customer.id
+            # Resolve role and customer_id once; later requests read them
+            # from request.shop_identity without loading the user
+            store_identity(request, build_identity(user))
 
             return user
+
+        record_login_failure(request, username)
         return None
 
+    @staticmethod
+    def login_blocked(request, username):
+        """Check whether logins for this username or client address are throttled."""
+        return login_blocked(request, username)
+
     @staticmethod
     def logout_user(request):
         """Logout the current user."""
+        from django.conf import settings
+        from lib.ECommerce.Cart import Cart
+
+        # Session carts end with the session; persistent carts are kept
+        if not settings.CART_PERSISTENT:
+            Cart.for_request(request).clear()
+
         logout(request)
         # Clear session data
         request.session.flush()
@@ -106,17 +126,5 @@ class Auth:
 
     @staticmethod
     def get_customer_id(request):
-        """Get customer ID from session or user."""
-        # First check session
-        customer_id = request.session.get('customer_id')
-        if customer_id:
-            return customer_id
-
-        # Then check user's customer profile
-        if request.user.is_authenticated and request.user.role == 'customer':
-            customer = Customer.get_customer_by_user_id(request.user.id)
-            if customer:
-                request.session['customer_id'] = customer.id
-                return customer.id
-
-        return None
+        """Get customer ID from the identity stored at login."""
+        return get_identity(request).customer_id
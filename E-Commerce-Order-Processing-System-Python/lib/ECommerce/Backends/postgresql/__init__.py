@@ -0,0 +1,4 @@
+"""
+ShopPy - PostgreSQL Backend
+Django's PostgreSQL backend with an optional per-process connection pool.
+"""
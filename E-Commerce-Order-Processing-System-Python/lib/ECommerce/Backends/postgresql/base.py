@@ -0,0 +1,94 @@
+"""
+ShopPy - PostgreSQL Backend
+Django's PostgreSQL backend with an optional per-process connection pool.
+
+Selected by Config.parse_database_url() for postgres:// DATABASE_URLs.
+Without OPTIONS['pool'] it behaves exactly like
+django.db.backends.postgresql, keeping one connection per thread for
+CONN_MAX_AGE seconds. With OPTIONS['pool'] (a dict of psycopg_pool
+ConnectionPool arguments such as min_size, max_size and timeout) every
+thread borrows a connection from a pool shared by the process and returns
+it when Django closes the connection at the end of the request, so many
+threads can share a few server connections. With CONN_HEALTH_CHECKS the
+pool tests each connection before lending it out.
+"""
+
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+# One pool per database alias per process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        """The process-wide pool for this alias, or None if pooling is off."""
+        pool_options = self.settings_dict['OPTIONS'].get('pool')
+        if not pool_options:
+            return None
+
+        pool = _pools.get(self.alias)
+        if pool is not None:
+            return pool
+        if self.settings_dict['CONN_MAX_AGE']:
+            raise ImproperlyConfigured('Pooled connections cannot also be persistent; set CONN_MAX_AGE to 0.')
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImproperlyConfigured(
+                'Connection pooling needs psycopg_pool: pip install "psycopg[binary,pool]"'
+            ) from e
+
+        with _pools_lock:
+            if self.alias not in _pools:
+                kwargs = self.get_connection_params()
+                # Django switches autocommit itself after borrowing a connection
+                kwargs['autocommit'] = True
+                _pools[self.alias] = ConnectionPool(
+                    kwargs=kwargs,
+                    check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+                    name=f'shoppy-{self.alias}',
+                    open=True,
+                    **(pool_options if isinstance(pool_options, dict) else {})
+                )
+        return _pools[self.alias]
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        self.isolation_level = base.IsolationLevel.READ_COMMITTED
+        connection = pool.getconn()
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is not None:
+            self.isolation_level = base.IsolationLevel(isolation_level)
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        # The pool the connection came from, even if close_pool() has run since
+        pool = getattr(self.connection, '_pool', None)
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Any open transaction is rolled back by the pool
+            pool.putconn(self.connection)
+            self.connection = None
+
+    def close_pool(self):
+        """Close this alias's pool, e.g. before forking worker processes."""
+        with _pools_lock:
+            pool = _pools.pop(self.alias, None)
+        if pool is not None:
+            pool.close()
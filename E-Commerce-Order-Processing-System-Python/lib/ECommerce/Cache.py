@@ -0,0 +1,153 @@
+"""
+ShopPy - Cache Helpers
+Versioned cache namespaces.
+
+Every cached value lives under a namespace (e.g. 'orders') whose version is
+part of the key. Bumping the version invalidates everything in the
+namespace at once without having to know which keys were written. A value
+derived from several tables can be cached under a tuple of namespaces and
+is invalidated when any of them is bumped. Bumps made inside a transaction
+wait for it to commit, so a reader can never cache the old rows under the
+new version while the write is still in flight.
+
+The backend is configured in Config.CACHES from the CACHE_* environment
+variables. Versions live in the cache itself, so a bump only reaches the
+processes sharing that cache: with more than one worker process the
+backend must be 'file' (one host) or 'redis', which check_shared_cache()
+enforces. Lookups through get_or_compute() are counted per namespace;
+get_cache_stats() reports the hits and misses seen by this process.
+"""
+
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.checks import Error, Tags, register
+from django.db import transaction
+
+# Longest readable key tail before it is replaced by a digest
+MAX_KEY_PARTS_LENGTH = 200
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def _version_key(namespace):
+    return f"ns:{namespace}:version"
+
+
+def namespace_version(namespace):
+    """Return the current version of a cache namespace."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from a timestamp so an evicted counter never reuses old keys
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_namespace(namespace):
+    """
+    Invalidate every cached value in a namespace. Inside a transaction the
+    bump runs when it commits and is dropped if it rolls back; outside one
+    it runs straight away.
+    """
+    transaction.on_commit(lambda: _bump(namespace))
+
+
+def _bump(namespace):
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def cache_key(namespace, *parts):
+    """
+    Build a versioned cache key for a namespace or a tuple of namespaces.
+    Parts holding user input (spaces, control characters or long strings)
+    are hashed so the key is valid on every backend.
+    """
+    namespaces = (namespace,) if isinstance(namespace, str) else namespace
+    prefix = ':'.join(f"{name}:{namespace_version(name)}" for name in namespaces)
+    tail = ':'.join(str(part) for part in parts)
+    if len(tail) > MAX_KEY_PARTS_LENGTH or any(ord(char) <= 32 or ord(char) == 127 for char in tail):
+        tail = hashlib.md5(tail.encode('utf-8')).hexdigest()
+    return f"{prefix}:{tail}" if tail else prefix
+
+
+def get_or_compute(namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for (namespace, parts), computing it on a miss.
+    namespace may be a tuple of namespaces. timeout defaults to the
+    backend's CACHE_TIMEOUT.
+    """
+    key = cache_key(namespace, *parts)
+    value = cache.get(key)
+    _count(namespace, value is not None)
+    if value is None:
+        value = compute()
+        cache.set(key, value, _replica_timeout(timeout))
+    return value
+
+
+def _replica_timeout(timeout):
+    """
+    Cap the lifetime of a value computed from the read replica, which may
+    be up to DATABASE_REPLICA_LAG seconds behind the writes that bumped
+    its namespace.
+    """
+    from lib.ECommerce.Replicas import reading_from_replica
+
+    if not reading_from_replica():
+        return timeout
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+    if timeout is None:
+        return settings.DATABASE_REPLICA_LAG
+    return min(timeout, settings.DATABASE_REPLICA_LAG)
+
+
+def get_cache_stats():
+    """
+    Return hit and miss counts per namespace for this process.
+    Returns dict mapping namespace to {'hits', 'misses', 'hit_rate'}.
+    """
+    with _stats_lock:
+        stats = {namespace: dict(counts) for namespace, counts in _stats.items()}
+    for counts in stats.values():
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / lookups if lookups else 0
+    return stats
+
+
+def reset_cache_stats():
+    """Clear the hit and miss counters."""
+    with _stats_lock:
+        _stats.clear()
+
+
+def _count(namespace, hit):
+    label = namespace if isinstance(namespace, str) else '+'.join(namespace)
+    with _stats_lock:
+        _stats[label]['hits' if hit else 'misses'] += 1
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Refuse a per-process cache when several processes serve requests."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.WEB_CONCURRENCY > 1 and backend.endswith('.LocMemCache'):
+        return [Error(
+            f"WEB_CONCURRENCY is {settings.WEB_CONCURRENCY} but the cache is per process (locmem), "
+            f"so cache invalidations and login throttling would not reach the other workers",
+            hint="Set CACHE_BACKEND to 'file' (workers on one host) or 'redis'.",
+            id='ECommerce.E003',
+        )]
+    return []
@@ -0,0 +1,271 @@
+"""
+ShopPy - Cart Store
+Server-side shopping cart backed by the cart_items table.
+
+Every request gets a lazily loaded Cart as request.cart. The lines are read
+in one query the first time the cart is touched and kept in a dict keyed by
+product id, so lookups are O(1) and each mutation writes only the row it
+changes instead of rewriting the whole session.
+
+With CART_PERSISTENT enabled, a logged-in user's cart is keyed by user and
+follows them across devices; otherwise it is keyed by session and cleared on
+logout.
+
+calculate_totals() is the single place tax and shipping are worked out; the
+cart page, the JSON cart APIs and checkout all use it.
+"""
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+# Session key used by the old session-stored cart, imported on first access
+LEGACY_SESSION_KEY = 'cart'
+
+
+def calculate_totals(subtotal):
+    """
+    Work out tax, shipping and the grand total for a cart subtotal.
+    Returns dict with subtotal, tax, tax_rate, shipping, free_shipping,
+    free_shipping_threshold and total.
+    """
+    from lib.ECommerce.Config import APP_CONFIG
+
+    subtotal = float(subtotal)
+    tax_rate = APP_CONFIG.get('tax_rate', 0.08)
+    shipping_rate = APP_CONFIG.get('shipping_rate', 5.00)
+    free_shipping_threshold = APP_CONFIG.get('free_shipping_threshold', 100.00)
+
+    tax = subtotal * tax_rate
+    free_shipping = subtotal >= free_shipping_threshold
+    shipping = 0 if free_shipping else shipping_rate
+
+    return {
+        'subtotal': subtotal,
+        'tax': tax,
+        'tax_rate': tax_rate,
+        'shipping': shipping,
+        'free_shipping': free_shipping,
+        'free_shipping_threshold': free_shipping_threshold,
+        'total': subtotal + tax + shipping,
+    }
+
+
+class Cart:
+    """Shopping cart for one user or session."""
+
+    def __init__(self, cart_key):
+        self.cart_key = cart_key
+        self._lines = None
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the cart belonging to the current request."""
+        from lib.ECommerce.Identity import get_identity
+
+        identity = get_identity(request)
+        if not identity.is_authenticated:
+            return cls(None)
+
+        if settings.CART_PERSISTENT:
+            cart_key = f'user:{identity.user_id}'
+        else:
+            if not request.session.session_key:
+                request.session.save()
+            cart_key = f'session:{request.session.session_key}'
+
+        cart = cls(cart_key)
+        legacy_items = request.session.pop(LEGACY_SESSION_KEY, None)
+        if legacy_items:
+            for item in legacy_items:
+                cart._import_line(item)
+        return cart
+
+    def __len__(self):
+        # Distinct products in the cart (not total quantity)
+        return len(self._load())
+
+    def __iter__(self):
+        return iter(self.items())
+
+    def __bool__(self):
+        return bool(self._load())
+
+    def items(self):
+        """Return cart lines as dicts with product_id, name, price, quantity, image_url."""
+        return [
+            {
+                'product_id': line.product_id,
+                'name': line.name,
+                'price': float(line.price),
+                'quantity': line.quantity,
+                'image_url': line.image_url,
+            }
+            for line in self._load().values()
+        ]
+
+    def hydrate(self):
+        """
+        Return cart lines repriced against the current catalog.
+        All products are loaded with one query. Each line gets the current
+        price, stock and image plus flags:
+          price_changed / previous_price - the price differs from when it was added
+          unavailable - the product was removed or deactivated
+          insufficient_stock - fewer units in stock than the line quantity
+        Changed prices are saved back to the cart, so a change is flagged once.
+        """
+        from lib.ECommerce.Models.Cart import CartItem
+        from lib.ECommerce.Models.Product import Product
+
+        lines = self._load()
+        if not lines:
+            return []
+
+        products = Product.objects.in_bulk(list(lines))
+        hydrated = []
+        repriced = []
+
+        for product_id, line in lines.items():
+            product = products.get(product_id)
+            previous_price = line.price
+
+            if product is not None and (product.price != line.price
+                                        or product.name != line.name
+                                        or (product.image_url or '') != line.image_url):
+                line.price = product.price
+                line.name = product.name
+                line.image_url = product.image_url or ''
+                repriced.append(line)
+
+            unavailable = product is None or not product.is_active
+            stock_quantity = product.stock_quantity if product is not None else 0
+            price = float(line.price)
+
+            hydrated.append({
+                'product_id': product_id,
+                'name': line.name,
+                'price': price,
+                'quantity': line.quantity,
+                'image_url': line.image_url,
+                'subtotal': 0.0 if unavailable else price * line.quantity,
+                'stock_quantity': stock_quantity,
+                'price_changed': line.price != previous_price,
+                'previous_price': float(previous_price),
+                'unavailable': unavailable,
+                'insufficient_stock': not unavailable and stock_quantity < line.quantity,
+            })
+
+        if repriced:
+            now = timezone.now()
+            for line in repriced:
+                line.updated_at = now
+            CartItem.objects.bulk_update(repriced, ['price', 'name', 'image_url', 'updated_at'])
+
+        return hydrated
+
+    @staticmethod
+    def totals(lines):
+        """Totals for hydrated lines; unavailable lines are not charged."""
+        return calculate_totals(sum(line['subtotal'] for line in lines))
+
+    def get(self, product_id):
+        """Return the quantity of a product in the cart (0 if absent)."""
+        line = self._load().get(int(product_id))
+        return line.quantity if line else 0
+
+    def add(self, product, quantity=1):
+        """Add a product to the cart, increasing the quantity if already present."""
+        from lib.ECommerce.Models.Cart import CartItem
+
+        lines = self._load()
+        line = lines.get(product.id)
+        if line is not None:
+            self._line_queryset(product.id).update(
+                quantity=models.F('quantity') + quantity,
+                updated_at=timezone.now()
+            )
+            line.quantity += quantity
+            return
+
+        try:
+            with transaction.atomic():
+                line = CartItem.objects.create(
+                    cart_key=self.cart_key,
+                    product_id=product.id,
+                    name=product.name,
+                    price=product.price,
+                    quantity=quantity,
+                    image_url=product.image_url or '',
+                )
+        except IntegrityError:
+            # The same product was just added from another tab or device
+            self._line_queryset(product.id).update(
+                quantity=models.F('quantity') + quantity,
+                updated_at=timezone.now()
+            )
+            line = self._line_queryset(product.id).get()
+        lines[product.id] = line
+
+    def set_quantity(self, product_id, quantity):
+        """Set the quantity of a product. Returns False if it is not in the cart."""
+        product_id = int(product_id)
+        line = self._load().get(product_id)
+        if line is None:
+            return False
+
+        self._line_queryset(product_id).update(quantity=quantity, updated_at=timezone.now())
+        line.quantity = quantity
+        return True
+
+    def remove(self, product_id):
+        """Remove a product from the cart."""
+        product_id = int(product_id)
+        if self._load().pop(product_id, None) is not None:
+            self._line_queryset(product_id).delete()
+
+    def clear(self):
+        """Remove every line from the cart."""
+        from lib.ECommerce.Models.Cart import CartItem
+
+        if self.cart_key is None:
+            return
+        CartItem.objects.filter(cart_key=self.cart_key).delete()
+        self._lines = {}
+
+    def _load(self):
+        from lib.ECommerce.Models.Cart import CartItem
+
+        if self._lines is None:
+            if self.cart_key is None:
+                self._lines = {}
+            else:
+                self._lines = {
+                    line.product_id: line
+                    for line in CartItem.objects.filter(cart_key=self.cart_key).order_by('id')
+                }
+        return self._lines
+
+    def _line_queryset(self, product_id):
+        from lib.ECommerce.Models.Cart import CartItem
+        return CartItem.objects.filter(cart_key=self.cart_key, product_id=product_id)
+
+    def _import_line(self, item):
+        from lib.ECommerce.Models.Product import Product
+
+        try:
+            product = Product.objects.get(id=item['product_id'])
+        except (Product.DoesNotExist, KeyError, ValueError):
+            return
+        self.add(product, int(item.get('quantity', 1)))
+
+
+class CartMiddleware:
+    """Attach a lazily loaded cart to each request as request.cart."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.cart = SimpleLazyObject(lambda: Cart.for_request(request))
+        return self.get_response(request)
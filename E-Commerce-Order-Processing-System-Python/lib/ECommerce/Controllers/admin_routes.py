@@ -6,26 +6,34 @@ Equivalent to Perl routes/admin_routes.pl
 
 from django.urls import path
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.views.decorators.http import require_POST, require_GET
 from django.http import JsonResponse
 from django.db import models
 from functools import wraps
 import json
 
 from lib.ECommerce.Models.Product import Product
-from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Order import Order, InventoryTransaction
+from lib.ECommerce.Models.Rollup import DailyOrderRollup, DailySalesRollup
 from lib.ECommerce.Models.Customer import Customer
 from lib.ECommerce.Config import PRODUCT_CATEGORIES, ORDER_STATUS
+from lib.ECommerce.Cache import get_or_compute, get_cache_stats
+from lib.ECommerce.Identity import identity_required
+from lib.ECommerce.Inventory import ledger_writer
+from lib.ECommerce.Pagination import KeysetPaginator
+from lib.ECommerce.Replicas import replica_reads
+from lib.ECommerce.Rollups import day_range
+from lib.ECommerce.Transitions import transition_orders
 
 
 def admin_required(view_func):
     """Decorator to require admin or staff role."""
     @wraps(view_func)
-    @login_required
+    @identity_required
     def wrapper(request, *args, **kwargs):
-        if request.user.role not in ['admin', 'staff']:
+        if request.shop_identity.role not in ['admin', 'staff']:
             messages.error(request, 'Access denied. Admin privileges required.')
             return redirect('dashboard')
         return view_func(request, *args, **kwargs)
@@ -43,7 +51,7 @@ def product_add(request):
     categories = [cat[0] for cat in PRODUCT_CATEGORIES]
     return render(request, 'admin/product_add.html', {
         'categories': categories,
-        'role': request.user.role,
+        'role': request.shop_identity.role,
     })
 
 
@@ -67,17 +75,19 @@ def product_add_submit(request):
         return redirect('product_add')
 
     try:
-        Product.objects.create(
-            name=name,
-            description=description,
-            sku=sku,
-            category=category,
-            price=price,
-            cost=cost or 0,
-            stock_quantity=stock_quantity or 0,
-            reorder_level=reorder_level or 10,
-            image_url=image_url
-        )
+        with ledger_writer() as ledger:
+            product = Product.objects.create(
+                name=name,
+                description=description,
+                sku=sku,
+                category=category,
+                price=price,
+                cost=cost or 0,
+                stock_quantity=int(stock_quantity or 0),
+                reorder_level=reorder_level or 10,
+                image_url=image_url
+            )
+            ledger.add(product.id, product.stock_quantity, 'adjustment', notes='Initial stock')
         messages.success(request, 'Product created successfully!')
         return redirect('products')
     except Exception as e:
@@ -95,7 +105,7 @@ def product_edit(request, product_id):
     return render(request, 'admin/product_edit.html', {
         'product': product,
         'categories': categories,
-        'role': request.user.role,
+        'role': request.shop_identity.role,
     })
 
 
@@ -118,12 +128,22 @@ def product_edit_submit(request, product_id):
     product.category = request.POST.get('category', product.category)
     product.price = request.POST.get('price', product.price)
     product.cost = request.POST.get('cost', product.cost) or 0
-    product.stock_quantity = request.POST.get('stock_quantity', product.stock_quantity) or 0
     product.reorder_level = request.POST.get('reorder_level', product.reorder_level) or 10
     product.image_url = request.POST.get('image_url', product.image_url)
 
     try:
-        product.save()
+        stock_quantity = int(request.POST.get('stock_quantity', product.stock_quantity) or 0)
+        # The stock level the form was rendered with; sales since then are kept
+        # unless the field was actually changed
+        original_stock = int(request.POST.get('original_stock_quantity', product.stock_quantity) or 0)
+        with ledger_writer():
+            product.save(update_fields=[
+                'name', 'description', 'sku', 'category', 'price', 'cost',
+                'reorder_level', 'image_url', 'updated_at'
+            ])
+            if stock_quantity != original_stock:
+                if Product.set_stock(product.id, stock_quantity, 'adjustment', notes='Product edit') is None:
+                    raise ValueError('stock changed during the update, please try again')
         messages.success(request, 'Product updated successfully!')
         return redirect('products')
     except Exception as e:
@@ -158,18 +178,26 @@ def product_adjust_stock(request, product_id):
             return redirect('products')
         
         old_stock = product.stock_quantity
+        notes = f'Manual stock adjustment ({adjustment_type})'
         
         if adjustment_type == 'add':
-            product.stock_quantity += quantity
+            new_stock = Product.apply_stock_change(product.id, quantity, 'adjustment', notes=notes)
         elif adjustment_type == 'remove':
-            product.stock_quantity = max(0, product.stock_quantity - quantity)
+            new_stock = Product.apply_stock_change(
+                product.id, -min(quantity, old_stock), 'adjustment', notes=notes
+            )
         elif adjustment_type == 'set':
-            product.stock_quantity = quantity
+            old_stock = Product.set_stock(product.id, quantity, 'adjustment', notes=notes)
+            new_stock = quantity if old_stock is not None else None
         else:
             messages.error(request, 'Invalid adjustment type')
             return redirect('products')
         
-        product.save()
+        if new_stock is None:
+            messages.error(request, f'Stock for {product.name} changed during the adjustment. Please try again.')
+            return redirect('products')
+        
+        product.stock_quantity = new_stock
         
         # Create a meaningful success message
         if adjustment_type == 'add':
@@ -189,6 +217,35 @@ def product_adjust_stock(request, product_id):
         return redirect('products')
 
 
+@admin_required
+@require_GET
+def api_product_ledger(request, product_id):
+    """API endpoint for a product's recent inventory transactions with running balance."""
+    product = get_object_or_404(Product, id=product_id)
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 500)
+    except ValueError:
+        limit = 50
+
+    return JsonResponse({
+        'product_id': product.id,
+        'sku': product.sku,
+        'stock_quantity': product.stock_quantity,
+        'transactions': [
+            {
+                'id': entry.id,
+                'created_at': entry.created_at.isoformat(),
+                'transaction_type': entry.transaction_type,
+                'quantity_change': entry.quantity_change,
+                'balance_after': entry.balance_after,
+                'reference_id': entry.reference_id,
+                'notes': entry.notes,
+            }
+            for entry in InventoryTransaction.get_running_balance(product.id, limit)
+        ],
+    })
+
+
 # =============================================================================
 # ORDER MANAGEMENT
 # =============================================================================
@@ -201,9 +258,11 @@ def order_update_status(request, order_id):
     new_status = request.POST.get('status', '')
 
     if new_status:
-        order.status = new_status
-        order.save()
-        messages.success(request, f'Order status updated to {new_status}')
+        result = order.update_status(new_status)
+        if result['success']:
+            messages.success(request, result['message'])
+        else:
+            messages.error(request, result['message'])
 
     return redirect('order_detail', order_id=order_id)
 
@@ -224,13 +283,9 @@ def api_order_update_status(request):
             }, status=400)
         
         order = get_object_or_404(Order, id=order_id)
-        order.status = new_status
-        order.save()
+        result = order.update_status(new_status)
         
-        return JsonResponse({
-            'success': True,
-            'message': f'Order status updated to {new_status}'
-        })
+        return JsonResponse(result, status=200 if result['success'] else 400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -253,13 +308,10 @@ def api_order_bulk_update(request):
                 'message': 'Order IDs and status are required'
             }, status=400)
         
-        updated_count = Order.objects.filter(id__in=order_ids).update(status=new_status)
+        # Validated and applied set-wise; cancellations restore stock
+        result = transition_orders(order_ids, new_status)
         
-        return JsonResponse({
-            'success': True,
-            'message': f'{updated_count} order(s) updated to {new_status}',
-            'count': updated_count
-        })
+        return JsonResponse(result, status=200 if result['success'] else 400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -273,8 +325,8 @@ def order_delete(request, order_id):
     """Delete an order."""
     order = get_object_or_404(Order, id=order_id)
 
-    # Delete order items first
-    order.items.all().delete()
+    # The items go with the order by cascade, after the pre_delete hook has
+    # read them to take the order out of the sales rollups
     order.delete()
 
     messages.success(request, 'Order deleted successfully!')
@@ -286,6 +338,7 @@ def order_delete(request, order_id):
 # =============================================================================
 
 @admin_required
+@replica_reads
 def customers(request):
     """List all customers."""
     search = request.GET.get('search', '')
@@ -298,17 +351,16 @@ def customers(request):
         customers_list = Customer.objects.select_related('user').order_by('-created_at')
 
     # Pagination
-    total = customers_list.count()
-    start = (page - 1) * per_page
-    end = start + per_page
-    customers_page = customers_list[start:end]
-    total_pages = (total + per_page - 1) // per_page
+    paginator = KeysetPaginator(customers_list, per_page)
+    customers_page = paginator.page(request.GET.get('cursor'), page)
 
     return render(request, 'admin/customers.html', {
-        'customers': customers_page,
+        'customers': customers_page.object_list,
         'page': page,
-        'total_pages': total_pages,
-        'role': request.user.role,
+        'total_pages': paginator.num_pages(),
+        'next_cursor': customers_page.next_cursor,
+        'previous_cursor': customers_page.previous_cursor,
+        'role': request.shop_identity.role,
     })
 
 
@@ -328,6 +380,7 @@ def customer_delete(request, customer_id):
 
 
 @admin_required
+@replica_reads
 def customer_detail(request, customer_id):
     """View customer details."""
     customer = get_object_or_404(Customer.objects.select_related('user'), id=customer_id)
@@ -346,7 +399,7 @@ def customer_detail(request, customer_id):
         'customer': customer,
         'orders': orders,
         'stats': stats,
-        'role': request.user.role,
+        'role': request.shop_identity.role,
     })
 
 
@@ -355,6 +408,17 @@ def customer_detail(request, customer_id):
 # =============================================================================
 
 @admin_required
+@require_GET
+def api_cache_stats(request):
+    """API endpoint for cache hit/miss counters of this worker process."""
+    return JsonResponse({
+        'backend': settings.CACHES['default']['BACKEND'],
+        'namespaces': get_cache_stats(),
+    })
+
+
+@admin_required
+@replica_reads
 def reports(request):
     """Show reports and analytics."""
     from django.db.models import Sum, Count, F
@@ -392,147 +456,142 @@ def reports(request):
         start_date = today - timedelta(days=30)
         end_date = today
 
-    # Filter orders by date range
-    orders_in_range = Order.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    )
+    def build_report():
+        # Order and item figures come from the daily rollups; only customer
+        # figures still read raw rows, using index-friendly datetime bounds
+        range_start, range_end = day_range(start_date, end_date)
+        order_rollups = DailyOrderRollup.objects.filter(day__gte=start_date, day__lte=end_date).order_by()
+        sales_rollups = DailySalesRollup.objects.filter(day__gte=start_date, day__lte=end_date).order_by()
 
-    # Total revenue (exclude cancelled)
-    total_revenue = orders_in_range.exclude(status='cancelled').aggregate(
-        total=Sum('total')
-    )['total'] or 0
+        # Total revenue (exclude cancelled)
+        total_revenue = order_rollups.exclude(status='cancelled').aggregate(
+            total=Sum('revenue')
+        )['total'] or 0
 
-    # Total orders
-    total_orders = orders_in_range.count()
+        # Total orders
+        total_orders = order_rollups.aggregate(total=Sum('order_count'))['total'] or 0
 
-    # Average order value
-    avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+        # Average order value
+        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
 
-    # Products sold
-    from lib.ECommerce.Models.Order import OrderItem
-    products_sold = OrderItem.objects.filter(
-        order__in=orders_in_range
-    ).aggregate(total=Sum('quantity'))['total'] or 0
-    
-    unique_products = OrderItem.objects.filter(
-        order__in=orders_in_range
-    ).values('product').distinct().count()
-
-    # New customers in period
-    new_customers = Customer.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    ).count()
+        # Products sold
+        products_sold = sales_rollups.aggregate(total=Sum('quantity'))['total'] or 0
+
+        unique_products = sales_rollups.filter(quantity__gt=0).values('product_sku').distinct().count()
+
+        # New customers in period
+        new_customers = Customer.objects.filter(
+            created_at__gte=range_start,
+            created_at__lt=range_end
+        ).count()
     
-    # Returning customers (customers with orders before and during period)
-    returning_customers = 0  # Simplified for now
-
-    # Top products
-    top_products_data = OrderItem.objects.filter(
-        order__in=orders_in_range.exclude(status='cancelled')
-    ).values('product_name').annotate(
-        quantity_sold=Sum('quantity'),
-        revenue=Sum('subtotal')
-    ).order_by('-revenue')[:10]
+        # Returning customers (customers with orders before and during period)
+        returning_customers = 0  # Simplified for now
+
+        # Top products
+        top_products_data = sales_rollups.exclude(status='cancelled').values('product_name').annotate(
+            quantity_sold=Sum('quantity'),
+            revenue=Sum('revenue')
+        ).order_by('-revenue')[:10]
     
-    top_products = [
-        {
-            'name': p['product_name'],
-            'quantity_sold': p['quantity_sold'],
-            'revenue': float(p['revenue'] or 0)
-        }
-        for p in top_products_data
-    ]
-
-    # Top customers
-    top_customers = Customer.objects.annotate(
-        order_count=Count('orders', filter=models.Q(
-            orders__created_at__date__gte=start_date,
-            orders__created_at__date__lte=end_date
-        )),
-        total_spent=Sum('orders__total', filter=models.Q(
-            orders__created_at__date__gte=start_date,
-            orders__created_at__date__lte=end_date,
-        ) & ~models.Q(orders__status='cancelled'))
-    ).filter(order_count__gt=0).order_by('-total_spent')[:10]
-
-    top_customers_list = [
-        {
-            'first_name': c.first_name,
-            'last_name': c.last_name,
-            'order_count': c.order_count,
-            'total_spent': float(c.total_spent or 0)
-        }
-        for c in top_customers
-    ]
-
-    # Chart data - Revenue over time
-    revenue_by_day = orders_in_range.exclude(status='cancelled').extra(
-        select={'day': 'DATE(created_at)'}
-    ).values('day').annotate(
-        daily_revenue=Sum('total')
-    ).order_by('day')
+        top_products = [
+            {
+                'name': p['product_name'],
+                'quantity_sold': p['quantity_sold'],
+                'revenue': float(p['revenue'] or 0)
+            }
+            for p in top_products_data
+        ]
+
+        # Top customers
+        top_customers = Customer.objects.annotate(
+            order_count=Count('orders', filter=models.Q(
+                orders__created_at__gte=range_start,
+                orders__created_at__lt=range_end
+            )),
+            total_spent=Sum('orders__total', filter=models.Q(
+                orders__created_at__gte=range_start,
+                orders__created_at__lt=range_end,
+            ) & ~models.Q(orders__status='cancelled'))
+        ).filter(order_count__gt=0).order_by('-total_spent')[:10]
+
+        top_customers_list = [
+            {
+                'first_name': c.first_name,
+                'last_name': c.last_name,
+                'order_count': c.order_count,
+                'total_spent': float(c.total_spent or 0)
+            }
+            for c in top_customers
+        ]
+
+        # Chart data - Revenue over time
+        revenue_by_day = order_rollups.exclude(status='cancelled').values('day').annotate(
+            daily_revenue=Sum('revenue')
+        ).order_by('day')
     
-    revenue_labels = [str(r['day']) for r in revenue_by_day]
-    revenue_data = [float(r['daily_revenue'] or 0) for r in revenue_by_day]
+        revenue_labels = [str(r['day']) for r in revenue_by_day]
+        revenue_data = [float(r['daily_revenue'] or 0) for r in revenue_by_day]
     
-    # If no data, provide empty arrays
-    if not revenue_labels:
-        revenue_labels = [str(start_date)]
-        revenue_data = [0]
-
-    # Category sales data
-    category_sales = OrderItem.objects.filter(
-        order__in=orders_in_range.exclude(status='cancelled')
-    ).values('product__category').annotate(
-        total=Sum('subtotal')
-    ).order_by('-total')[:6]
+        # If no data, provide empty arrays
+        if not revenue_labels:
+            revenue_labels = [str(start_date)]
+            revenue_data = [0]
+
+        # Category sales data
+        category_sales = sales_rollups.exclude(status='cancelled').values('category').annotate(
+            total=Sum('revenue')
+        ).order_by('-total')[:6]
     
-    category_labels = [c['product__category'] or 'Uncategorized' for c in category_sales]
-    category_data = [float(c['total'] or 0) for c in category_sales]
+        category_labels = [c['category'] or 'Uncategorized' for c in category_sales]
+        category_data = [float(c['total'] or 0) for c in category_sales]
     
-    if not category_labels:
-        category_labels = ['No Data']
-        category_data = [0]
-
-    # Status distribution
-    status_counts = orders_in_range.values('status').annotate(count=Count('id'))
-    status_map = {'pending': 0, 'processing': 0, 'shipped': 0, 'delivered': 0, 'cancelled': 0}
-    for s in status_counts:
-        if s['status'] in status_map:
-            status_map[s['status']] = s['count']
-    status_data = [status_map['pending'], status_map['processing'], status_map['shipped'], status_map['delivered'], status_map['cancelled']]
-
-    # Build report data
-    report = {
-        'total_revenue': total_revenue,
-        'total_orders': total_orders,
-        'average_order_value': avg_order_value,
-        'products_sold': products_sold,
-        'unique_products': unique_products,
-        'new_customers': new_customers,
-        'returning_customers': returning_customers,
-        'top_products': top_products,
-        'top_customers': top_customers_list,
-    }
-
-    # Chart data for JavaScript
-    chart_data = {
-        'revenue_labels': json.dumps(revenue_labels),
-        'revenue_data': json.dumps(revenue_data),
-        'category_labels': json.dumps(category_labels),
-        'category_data': json.dumps(category_data),
-        'status_data': json.dumps(status_data),
-    }
+        if not category_labels:
+            category_labels = ['No Data']
+            category_data = [0]
+
+        # Status distribution
+        status_counts = order_rollups.values('status').annotate(count=Sum('order_count'))
+        status_map = {'pending': 0, 'processing': 0, 'shipped': 0, 'delivered': 0, 'cancelled': 0}
+        for s in status_counts:
+            if s['status'] in status_map:
+                status_map[s['status']] = s['count']
+        status_data = [status_map['pending'], status_map['processing'], status_map['shipped'], status_map['delivered'], status_map['cancelled']]
+
+        # Build report data
+        report = {
+            'total_revenue': total_revenue,
+            'total_orders': total_orders,
+            'average_order_value': avg_order_value,
+            'products_sold': products_sold,
+            'unique_products': unique_products,
+            'new_customers': new_customers,
+            'returning_customers': returning_customers,
+            'top_products': top_products,
+            'top_customers': top_customers_list,
+        }
+
+        # Chart data for JavaScript
+        chart_data = {
+            'revenue_labels': json.dumps(revenue_labels),
+            'revenue_data': json.dumps(revenue_data),
+            'category_labels': json.dumps(category_labels),
+            'category_data': json.dumps(category_data),
+            'status_data': json.dumps(status_data),
+        }
+
+        return {'report': report, 'chart_data': chart_data}
+
+    # Cached until an order or customer is written
+    cached = get_or_compute(('orders', 'customers'), ('reports', start_date, end_date), build_report)
 
     return render(request, 'admin/reports.html', {
-        'report': report,
-        'chart_data': chart_data,
+        'report': cached['report'],
+        'chart_data': cached['chart_data'],
         'period': period,
         'date_from': date_from,
         'date_to': date_to,
-        'role': request.user.role,
+        'role': request.shop_identity.role,
     })
 
 
@@ -553,6 +612,7 @@ urlpatterns = [
     path('products/<int:product_id>/delete/', product_delete, name='product_delete'),
     path('products/<int:product_id>/adjust-stock/', product_adjust_stock, name='admin_product_adjust_stock'),
     path('products/<int:product_id>/adjust-stock/', product_adjust_stock, name='product_adjust_stock'),
+    path('api/products/<int:product_id>/ledger/', api_product_ledger, name='api_product_ledger'),
 
     # Orders - Admin
     path('orders/<int:order_id>/update-status/', order_update_status, name='admin_order_update_status'),
@@ -564,6 +624,9 @@ urlpatterns = [
     path('api/orders/update-status/', api_order_update_status, name='api_order_update_status'),
     path('api/orders/bulk-update/', api_order_bulk_update, name='api_order_bulk_update'),
 
+    # Cache - Admin
+    path('api/cache/stats/', api_cache_stats, name='api_cache_stats'),
+
     # Customers - Admin
     path('customers/', customers, name='admin_customers'),
     path('customers/', customers, name='customers'),
@@ -6,25 +6,25 @@ Equivalent to Perl routes/customer_routes.pl
 
 from django.urls import path
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from functools import wraps
 
 from lib.ECommerce.Auth import Auth
+from lib.ECommerce.Identity import identity_required, refresh_identity
 from lib.ECommerce.Models.Product import Product
 from lib.ECommerce.Models.Order import Order
 from lib.ECommerce.Models.Customer import Customer
-from lib.ECommerce.Config import APP_CONFIG
 
 
 def customer_required(view_func):
     """Decorator to require customer role."""
     @wraps(view_func)
-    @login_required
+    @identity_required
     def wrapper(request, *args, **kwargs):
-        if request.user.role != 'customer':
+        if request.shop_identity.role != 'customer':
             messages.error(request, 'This page is for customers only.')
             return redirect('dashboard')
         return view_func(request, *args, **kwargs)
@@ -35,21 +35,12 @@ def customer_required(view_func):
 # CART
 # =============================================================================
 
-@login_required
+@identity_required
 def cart(request):
     """View shopping cart."""
-    cart_items = request.session.get('cart', [])
-
-    # Ensure each cart item has an image_url and calculate subtotal
-    for item in cart_items:
-        if not item.get('image_url'):
-            try:
-                product = Product.objects.get(id=item['product_id'])
-                item['image_url'] = product.image_url
-            except Product.DoesNotExist:
-                item['image_url'] = ''
-        # Calculate item subtotal
-        item['subtotal'] = float(item['price']) * int(item['quantity'])
+    # Reprice every line against the current catalog in one query
+    cart_items = request.cart.hydrate()
+    totals = request.cart.totals(cart_items)
 
     # Get customer's address
     customer_address = ''
@@ -61,31 +52,27 @@ def cart(request):
         except Customer.DoesNotExist:
             pass
 
-    # Calculate totals
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    tax_rate = APP_CONFIG.get('tax_rate', 0.08)
-    shipping_rate = APP_CONFIG.get('shipping_rate', 5.00)
-    free_shipping_threshold = APP_CONFIG.get('free_shipping_threshold', 100.00)
-
-    tax = subtotal * tax_rate
-    shipping = 0 if subtotal >= free_shipping_threshold else shipping_rate
-    total = subtotal + tax + shipping
+    cart_changed = any(
+        item['price_changed'] or item['unavailable'] or item['insufficient_stock']
+        for item in cart_items
+    )
 
     return render(request, 'customer/cart.html', {
         'cart_items': cart_items,
         'cart_count': len(cart_items),
-        'cart_subtotal': subtotal,
-        'cart_tax': tax,
-        'tax_rate': tax_rate * 100,
-        'cart_shipping': shipping,
-        'cart_total': total,
+        'cart_changed': cart_changed,
+        'cart_subtotal': totals['subtotal'],
+        'cart_tax': totals['tax'],
+        'tax_rate': totals['tax_rate'] * 100,
+        'cart_shipping': totals['shipping'],
+        'cart_total': totals['total'],
         'customer_address': customer_address,
-        'free_shipping_threshold': free_shipping_threshold,
-        'role': request.user.role,
+        'free_shipping_threshold': totals['free_shipping_threshold'],
+        'role': request.shop_identity.role,
     })
 
 
-@login_required
+@identity_required
 @require_POST
 def cart_add(request):
     """Add item to cart."""
@@ -100,29 +87,10 @@ def cart_add(request):
         messages.error(request, 'Product not found')
         return redirect('products')
 
-    cart = request.session.get('cart', [])
-
-    # Check if product already in cart
-    found = False
-    for item in cart:
-        if str(item['product_id']) == str(product_id):
-            item['quantity'] += quantity
-            found = True
-            break
-
-    if not found:
-        cart.append({
-            'product_id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'quantity': quantity,
-            'image_url': product.image_url,
-        })
-
-    request.session['cart'] = cart
+    request.cart.add(product, quantity)
 
     # Calculate cart count (distinct products)
-    cart_count = len(cart)
+    cart_count = len(request.cart)
 
     # Check if AJAX request
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -136,22 +104,22 @@ def cart_add(request):
     return redirect('products')
 
 
-@login_required
+@identity_required
 @require_POST
 def cart_remove(request):
     """Remove item from cart."""
     product_id = request.POST.get('product_id')
-    cart = request.session.get('cart', [])
 
-    # Filter out the product to remove
-    cart = [item for item in cart if str(item['product_id']) != str(product_id)]
-    request.session['cart'] = cart
+    try:
+        request.cart.remove(product_id)
+    except (TypeError, ValueError):
+        pass
 
     messages.success(request, 'Product removed from cart')
     return redirect('cart')
 
 
-@login_required
+@identity_required
 @require_POST
 def api_cart_add(request):
     """API endpoint for adding to cart via JSON."""
@@ -173,30 +141,10 @@ def api_cart_add(request):
     if product.stock_quantity < quantity:
         return JsonResponse({'success': False, 'message': 'Not enough stock available'})
     
-    cart = request.session.get('cart', [])
-    
-    # Check if product already in cart
-    found = False
-    for item in cart:
-        if str(item['product_id']) == str(product_id):
-            item['quantity'] += quantity
-            found = True
-            break
-    
-    if not found:
-        cart.append({
-            'product_id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'quantity': quantity,
-            'image_url': product.image_url or '',
-        })
-    
-    request.session['cart'] = cart
-    request.session.modified = True
+    request.cart.add(product, quantity)
     
     # Calculate cart count (distinct products)
-    cart_count = len(cart)
+    cart_count = len(request.cart)
     
     return JsonResponse({
         'success': True,
@@ -205,7 +153,7 @@ def api_cart_add(request):
     })
 
 
-@login_required
+@identity_required
 @require_POST
 def api_cart_update(request):
     """API endpoint for updating cart item quantity."""
@@ -230,46 +178,28 @@ def api_cart_update(request):
     if product.stock_quantity < quantity:
         return JsonResponse({'success': False, 'message': 'Not enough stock available'})
     
-    cart = request.session.get('cart', [])
-    
     # Update quantity for the product
-    found = False
-    for item in cart:
-        if str(item['product_id']) == str(product_id):
-            item['quantity'] = quantity
-            item['subtotal'] = float(item['price']) * quantity
-            found = True
-            break
-    
-    if not found:
+    if not request.cart.set_quantity(product.id, quantity):
         return JsonResponse({'success': False, 'message': 'Product not in cart'})
     
-    request.session['cart'] = cart
-    request.session.modified = True
+    cart = request.cart.hydrate()
     
     # Calculate totals
-    subtotal = sum(float(item['price']) * int(item['quantity']) for item in cart)
-    tax_rate = APP_CONFIG.get('tax_rate', 0.08)
-    shipping_rate = APP_CONFIG.get('shipping_rate', 5.00)
-    free_shipping_threshold = APP_CONFIG.get('free_shipping_threshold', 100.00)
-    
-    tax = subtotal * tax_rate
-    shipping = 0 if subtotal >= free_shipping_threshold else shipping_rate
-    total = subtotal + tax + shipping
+    totals = request.cart.totals(cart)
     
     return JsonResponse({
         'success': True,
         'cart_count': len(cart),
         'items': cart,
-        'subtotal': subtotal,
-        'tax': tax,
-        'shipping': shipping,
-        'free_shipping': subtotal >= free_shipping_threshold,
-        'total': total
+        'subtotal': totals['subtotal'],
+        'tax': totals['tax'],
+        'shipping': totals['shipping'],
+        'free_shipping': totals['free_shipping'],
+        'total': totals['total']
     })
 
 
-@login_required
+@identity_required
 @require_POST
 def api_cart_remove(request):
     """API endpoint for removing item from cart."""
@@ -281,41 +211,33 @@ def api_cart_remove(request):
     except (json.JSONDecodeError, ValueError):
         return JsonResponse({'success': False, 'message': 'Invalid request data'})
     
-    cart = request.session.get('cart', [])
+    try:
+        request.cart.remove(product_id)
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Invalid request data'})
     
-    # Filter out the product to remove
-    cart = [item for item in cart if str(item['product_id']) != str(product_id)]
-    request.session['cart'] = cart
-    request.session.modified = True
+    cart = request.cart.hydrate()
     
     # Calculate totals
-    subtotal = sum(float(item['price']) * int(item['quantity']) for item in cart)
-    tax_rate = APP_CONFIG.get('tax_rate', 0.08)
-    shipping_rate = APP_CONFIG.get('shipping_rate', 5.00)
-    free_shipping_threshold = APP_CONFIG.get('free_shipping_threshold', 100.00)
-    
-    tax = subtotal * tax_rate
-    shipping = 0 if subtotal >= free_shipping_threshold else shipping_rate
-    total = subtotal + tax + shipping
+    totals = request.cart.totals(cart)
     
     return JsonResponse({
         'success': True,
         'cart_count': len(cart),
         'items': cart,
-        'subtotal': subtotal,
-        'tax': tax,
-        'shipping': shipping,
-        'free_shipping': subtotal >= free_shipping_threshold,
-        'total': total
+        'subtotal': totals['subtotal'],
+        'tax': totals['tax'],
+        'shipping': totals['shipping'],
+        'free_shipping': totals['free_shipping'],
+        'total': totals['total']
     })
 
 
-@login_required
+@identity_required
 @require_POST
 def api_cart_clear(request):
     """API endpoint for clearing the entire cart."""
-    request.session['cart'] = []
-    request.session.modified = True
+    request.cart.clear()
     
     return JsonResponse({
         'success': True,
@@ -328,11 +250,11 @@ def api_cart_clear(request):
 # CHECKOUT
 # =============================================================================
 
-@login_required
+@identity_required
 @require_POST
 def checkout(request):
     """Process checkout."""
-    cart = request.session.get('cart', [])
+    cart = request.cart.items()
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
 
     if not cart:
@@ -348,10 +270,7 @@ def checkout(request):
         # Try to get customer by user_id
         customer = Customer.get_customer_by_user_id(request.user.id)
 
-        if customer:
-            customer_id = customer.id
-            request.session['customer_id'] = customer_id
-        else:
+        if not customer:
             # Create customer profile
             customer = Customer.objects.create(
                 user=request.user,
@@ -360,8 +279,7 @@ def checkout(request):
                 phone='',
                 address=''
             )
-            customer_id = customer.id
-            request.session['customer_id'] = customer_id
+        customer_id = refresh_identity(request).customer_id
 
     # Get checkout form data
     payment_method = request.POST.get('payment_method', '')
@@ -380,12 +298,13 @@ def checkout(request):
         customer=customer,
         cart_items=cart,
         payment_method=payment_method,
-        shipping_address=shipping_address
+        shipping_address=shipping_address,
+        skip_locked=settings.CHECKOUT_SKIP_LOCKED
     )
 
     if result['success']:
         # Clear cart
-        request.session['cart'] = []
+        request.cart.clear()
         if is_ajax:
             from django.urls import reverse
             return JsonResponse({
@@ -495,7 +414,7 @@ def account(request):
     return render(request, 'customer/account.html', {
         'customer': customer,
         'stats': stats,
-        'role': request.user.role,
+        'role': request.shop_identity.role,
     })
 
 
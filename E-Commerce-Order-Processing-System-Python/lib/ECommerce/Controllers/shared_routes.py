@@ -4,19 +4,23 @@ Routes accessible by both admin and customer users.
 Equivalent to Perl routes/shared_routes.pl
 """
 
+from django.conf import settings
 from django.urls import path
 from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_GET
 
 from lib.ECommerce.Auth import Auth
+from lib.ECommerce.Identity import identity_required
 from lib.ECommerce.Models.User import User
-from lib.ECommerce.Models.Customer import Customer
 from lib.ECommerce.Models.Product import Product
 from lib.ECommerce.Models.Order import Order
 from lib.ECommerce.Config import APP_CONFIG
+from lib.ECommerce.Pagination import KeysetPage, KeysetPaginator
+from lib.ECommerce.Replicas import replica_reads
+from lib.ECommerce.Cache import get_or_compute, namespace_version
+from lib.ECommerce.Dashboard import get_admin_stats, get_customer_stats
 
 
 # =============================================================================
@@ -25,7 +29,7 @@ from lib.ECommerce.Config import APP_CONFIG
 
 def home(request):
     """Home page - login form or redirect to dashboard."""
-    if request.user.is_authenticated:
+    if request.shop_identity.is_authenticated:
         return redirect('dashboard')
     return render(request, 'login.html')
 
@@ -41,6 +45,9 @@ def login_view(request):
     if user:
         messages.success(request, 'Login successful!')
         return redirect('dashboard')
+    elif Auth.login_blocked(request, username):
+        messages.error(request, 'Too many failed login attempts, please try again in a few minutes')
+        return redirect('home')
     else:
         messages.error(request, 'Invalid username or password')
         return redirect('home')
@@ -59,7 +66,7 @@ def logout_view(request):
 
 def register(request):
     """Show registration form."""
-    if request.user.is_authenticated:
+    if request.shop_identity.is_authenticated:
         return redirect('dashboard')
     return render(request, 'customer/register.html')
 
@@ -103,47 +110,31 @@ def register_submit(request):
 # DASHBOARD (Role-based)
 # =============================================================================
 
-@login_required
+@identity_required
 def dashboard(request):
     """Dashboard view - role-based."""
-    from django.db.models import Sum
-    
-    user = request.user
-    role = user.role
+    role = request.shop_identity.role
 
     if role in ['admin', 'staff']:
         # Admin/Staff Dashboard
-        import django.db.models as models
-        
         page = int(request.GET.get('page', 1))
         per_page = 10
 
-        total_products = Product.objects.filter(is_active=True).count()
-        low_stock = Product.objects.filter(
-            is_active=True,
-            stock_quantity__lte=models.F('reorder_level')
-        ).count() if hasattr(Product, 'objects') else Product.get_low_stock_products().count()
-
         # Get recent orders with pagination
         all_orders = Order.objects.select_related('customer').order_by('-created_at')
-        total_orders = all_orders.exclude(status__in=['delivered', 'cancelled', 'refunded']).count()
-        total_customers = Customer.objects.count()
 
         # Paginate recent orders
-        start = (page - 1) * per_page
-        end = start + per_page
-        recent_orders = all_orders[start:end]
-        total_pages = (all_orders.count() + per_page - 1) // per_page
-
-        stats = {
-            'total_products': total_products,
-            'low_stock': low_stock,
-            'total_orders': total_orders,
-            'total_customers': total_customers,
-            'recent_orders': recent_orders,
+        paginator = KeysetPaginator(all_orders, per_page)
+        orders_page = paginator.page(request.GET.get('cursor'), page)
+
+        stats = get_admin_stats()
+        stats.update({
+            'recent_orders': orders_page.object_list,
             'page': page,
-            'total_pages': total_pages,
-        }
+            'total_pages': paginator.num_pages(),
+            'next_cursor': orders_page.next_cursor,
+            'previous_cursor': orders_page.previous_cursor,
+        })
 
         return render(request, 'admin/dashboard_admin.html', {
             'stats': stats,
@@ -158,29 +149,19 @@ def dashboard(request):
             per_page = 10
 
             orders = Order.objects.filter(customer_id=customer_id).order_by('-created_at')
-            total_orders = orders.count()
-            pending_orders = orders.filter(status='pending').count()
-            delivered_orders = orders.filter(status='delivered').count()
-
-            total_spent = orders.exclude(status='cancelled').aggregate(
-                total=Sum('total')
-            )['total'] or 0
+            stats = get_customer_stats(customer_id)
 
             # Paginate orders
-            start = (page - 1) * per_page
-            end = start + per_page
-            recent_orders = orders[start:end]
-            total_pages = (total_orders + per_page - 1) // per_page
+            orders_page = KeysetPaginator(orders, per_page).page(request.GET.get('cursor'), page)
+            total_pages = (stats['total_orders'] + per_page - 1) // per_page
 
-            stats = {
-                'total_orders': total_orders,
-                'pending_orders': pending_orders,
-                'delivered_orders': delivered_orders,
-                'total_spent': total_spent,
-                'recent_orders': recent_orders,
+            stats.update({
+                'recent_orders': orders_page.object_list,
                 'page': page,
                 'total_pages': total_pages,
-            }
+                'next_cursor': orders_page.next_cursor,
+                'previous_cursor': orders_page.previous_cursor,
+            })
         else:
             stats = {
                 'total_orders': 0,
@@ -202,11 +183,11 @@ def dashboard(request):
 # PRODUCTS (Role-based)
 # =============================================================================
 
-@login_required
+@identity_required
+@replica_reads
 def products(request):
     """Products list view - role-based."""
-    user = request.user
-    role = user.role
+    role = request.shop_identity.role
 
     search = request.GET.get('search', '')
     category = request.GET.get('category', '')
@@ -242,13 +223,31 @@ def products(request):
         else:
             products_list = products_list.order_by('id')
 
-    # Pagination
-    total = products_list.count()
-    start = (page - 1) * per_page
-    end = start + per_page
-    products_page = products_list[start:end]
-    total_pages = (total + per_page - 1) // per_page
-    has_more = end < total
+    # Pagination (keyset; the cursor makes deep pages as cheap as the first)
+    cursor = request.GET.get('cursor', '')
+    paginator = KeysetPaginator(products_list, per_page)
+
+    # Customers get the page's product ids and rendered cards from the cache,
+    # keyed by the catalog version; only stock and price are read fresh, with
+    # one primary key lookup, and pick the rendered grid for that state
+    if role == 'customer' and request.GET.get('ajax') != '1':
+        grid = _cached_catalog_page(paginator, search, category, page, cursor)
+        return render(request, 'customer/products_customer.html', {
+            'grid': grid,
+            'grid_state': _grid_state(grid),
+            'catalog_version': namespace_version('catalog'),
+            'catalog_cache_timeout': settings.CATALOG_CACHE_TIMEOUT,
+            'categories': categories,
+            'search': search,
+            'category': category,
+            'sort': sort,
+            'page': page,
+            'cursor': cursor,
+            'role': role,
+        })
+
+    products_page = paginator.page(cursor, page)
+    has_more = products_page.has_next
     next_page = page + 1 if has_more else None
 
     # Handle AJAX request for infinite scroll
@@ -268,14 +267,19 @@ def products(request):
             'products': products_data,
             'has_more': has_more,
             'next_page': next_page,
+            'next_cursor': products_page.next_cursor,
         })
 
     # Generate page range for pagination (admin only)
+    total = paginator.count()
+    total_pages = paginator.num_pages()
     page_range = range(1, total_pages + 1)
 
     context = {
-        'products': products_page,
+        'products': products_page.object_list,
         'categories': categories,
+        'search': search,
+        'category': category,
         'sort': sort,
         'page': page,
         'total_pages': total_pages,
@@ -283,24 +287,51 @@ def products(request):
         'page_range': page_range,
         'has_more': has_more,
         'next_page': next_page,
+        'next_cursor': products_page.next_cursor,
+        'previous_cursor': products_page.previous_cursor,
         'role': role,
     }
 
-    if role in ['admin', 'staff']:
-        return render(request, 'admin/products_admin.html', context)
-    else:
-        return render(request, 'customer/products_customer.html', context)
+    return render(request, 'admin/products_admin.html', context)
+
+
+def _cached_catalog_page(paginator, search, category, page, cursor):
+    """A customer catalog page whose ids come from the 'catalog' namespace and rows from the database."""
+    def build_page():
+        products_page = paginator.page(cursor, page)
+        return {
+            'ids': [product.id for product in products_page],
+            'has_next': products_page.has_next,
+            'has_previous': products_page.has_previous,
+            'next_cursor': products_page.next_cursor,
+            'previous_cursor': products_page.previous_cursor,
+        }
+
+    cached = get_or_compute(
+        'catalog', ('customer_product_page', search, category, page, cursor), build_page,
+        settings.CATALOG_CACHE_TIMEOUT
+    )
+    products = Product.objects.in_bulk(cached['ids'])
+    return KeysetPage(
+        [products[product_id] for product_id in cached['ids'] if product_id in products],
+        page, cached['has_next'], cached['has_previous'], cached['next_cursor'], cached['previous_cursor']
+    )
+
+
+def _grid_state(grid):
+    """What a catalog page shows beyond the cached card text: its products' stock and prices."""
+    return ','.join(f'{product.id}:{product.stock_quantity}:{product.price}' for product in grid)
 
 
 # =============================================================================
 # ORDERS (Role-based)
 # =============================================================================
 
-@login_required
+@identity_required
+@replica_reads
 def orders(request):
     """Orders list view - role-based."""
-    user = request.user
-    role = user.role
+    role = request.shop_identity.role
 
     search = request.GET.get('search', '')
     status = request.GET.get('status', '')
@@ -310,32 +341,21 @@ def orders(request):
 
     if role in ['admin', 'staff']:
         orders_list = Order.objects.select_related('customer').order_by('-created_at')
-        # Admin stats
-        stats = {
-            'total_orders': Order.objects.count(),
-            'pending_orders': Order.objects.filter(status='pending').count(),
-            'processing_orders': Order.objects.filter(status='processing').count(),
-            'delivered_orders': Order.objects.filter(status='delivered').count(),
-        }
+        # Admin stats (store-wide, from the daily rollups)
+        counts = Order.get_status_counts(from_rollups=True)
     else:
         customer_id = Auth.get_customer_id(request)
         if customer_id:
             orders_list = Order.objects.filter(customer_id=customer_id).order_by('-created_at')
             # Customer stats
-            stats = {
-                'total_orders': Order.objects.filter(customer_id=customer_id).count(),
-                'pending_orders': Order.objects.filter(customer_id=customer_id, status='pending').count(),
-                'processing_orders': Order.objects.filter(customer_id=customer_id, status='processing').count(),
-                'delivered_orders': Order.objects.filter(customer_id=customer_id, status='delivered').count(),
-            }
+            counts = Order.get_status_counts(customer_id=customer_id)
         else:
             orders_list = Order.objects.none()
-            stats = {
-                'total_orders': 0,
-                'pending_orders': 0,
-                'processing_orders': 0,
-                'delivered_orders': 0,
-            }
+            counts = dict.fromkeys([status for status, _ in Order.STATUS_CHOICES] + ['total'], 0)
+
+    # One entry per status (pending_orders, shipped_orders, ...) plus the total
+    stats = {f'{status}_orders': count for status, count in counts.items() if status != 'total'}
+    stats['total_orders'] = counts['total']
 
     # Search filter
     if search:
@@ -360,20 +380,22 @@ def orders(request):
     elif sort == 'total_low':
         orders_list = orders_list.order_by('total')
 
-    # Pagination
-    total = orders_list.count()
-    start = (page - 1) * per_page
-    end = start + per_page
-    orders_page = orders_list[start:end]
-    total_pages = (total + per_page - 1) // per_page
+    # Pagination; the status counts already give the row count unless searching
+    total = None
+    if not search:
+        total = counts.get(status, 0) if status else counts['total']
+    paginator = KeysetPaginator(orders_list, per_page, total=total)
+    orders_page = paginator.page(request.GET.get('cursor'), page)
 
     context = {
-        'orders': orders_page,
+        'orders': orders_page.object_list,
         'stats': stats,
         'status': status,
         'sort': sort,
         'page': page,
-        'total_pages': total_pages,
+        'total_pages': paginator.num_pages(),
+        'next_cursor': orders_page.next_cursor,
+        'previous_cursor': orders_page.previous_cursor,
         'role': role,
     }
 
@@ -383,11 +405,10 @@ def orders(request):
         return render(request, 'customer/orders_customer.html', context)
 
 
-@login_required
+@identity_required
 def order_detail(request, order_id):
     """Order detail view - role-based."""
-    user = request.user
-    role = user.role
+    role = request.shop_identity.role
 
     try:
         order = Order.objects.select_related('customer').prefetch_related('items').get(id=order_id)
@@ -418,48 +439,52 @@ def order_detail(request, order_id):
 # API ENDPOINTS
 # =============================================================================
 
-@login_required
+@identity_required
 @require_GET
+@replica_reads
 def api_products(request):
     """API endpoint for infinite scroll products."""
     search = request.GET.get('search', '')
     category = request.GET.get('category', '')
     page = int(request.GET.get('page', 1))
+    cursor = request.GET.get('cursor', '')
     per_page = 10
 
-    if search:
-        products = Product.search_products(search)
-    elif category:
-        products = Product.get_products_by_category(category)
-    else:
-        products = Product.get_active_products()
-
-    # Pagination
-    total = products.count()
-    start = (page - 1) * per_page
-    end = start + per_page
-    products_page = products[start:end]
-    has_more = end < total
-
-    # Serialize products
-    products_data = []
-    for p in products_page:
-        products_data.append({
-            'id': p.id,
-            'name': p.name,
-            'description': p.description,
-            'sku': p.sku,
-            'category': p.category,
-            'price': float(p.price),
-            'stock_quantity': p.stock_quantity,
-            'reorder_level': p.reorder_level,
-            'image_url': p.image_url,
-        })
+    def build_payload():
+        if search:
+            products = Product.search_products(search)
+        elif category:
+            products = Product.get_products_by_category(category)
+        else:
+            products = Product.get_active_products()
+
+        # Pagination
+        products_page = KeysetPaginator(products, per_page).page(cursor, page)
+
+        # Serialize products
+        products_data = []
+        for p in products_page:
+            products_data.append({
+                'id': p.id,
+                'name': p.name,
+                'description': p.description,
+                'sku': p.sku,
+                'category': p.category,
+                'price': float(p.price),
+                'stock_quantity': p.stock_quantity,
+                'reorder_level': p.reorder_level,
+                'image_url': p.image_url,
+            })
+
+        return {
+            'products': products_data,
+            'has_more': products_page.has_next,
+            'next_cursor': products_page.next_cursor,
+        }
 
-    return JsonResponse({
-        'products': products_data,
-        'has_more': has_more
-    })
+    # Served from the catalog cache until any product changes
+    payload = get_or_compute('products', ('api_products', search, category, page, cursor), build_payload)
+    return JsonResponse(payload)
 
 
 # =============================================================================
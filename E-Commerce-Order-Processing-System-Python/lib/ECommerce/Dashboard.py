@@ -0,0 +1,70 @@
+"""
+ShopPy - Dashboard Statistics
+Headline numbers for the admin and customer dashboards.
+
+Each role's figures come from one or two grouped queries and are cached
+briefly under the namespaces of the tables they read, so any write to
+products, orders or customers invalidates them straight away.
+"""
+
+from django.db.models import Count, F, Q, Sum
+
+from lib.ECommerce.Cache import get_or_compute
+
+# Seconds to keep dashboard numbers when nothing is written in between
+DASHBOARD_CACHE_TIMEOUT = 30
+
+
+def get_admin_stats():
+    """
+    Return store-wide dashboard figures.
+    Returns dict with total_products, low_stock, total_orders and total_customers.
+    """
+    return get_or_compute(
+        ('products', 'orders', 'customers'),
+        ('dashboard', 'admin'),
+        _compute_admin_stats,
+        DASHBOARD_CACHE_TIMEOUT
+    )
+
+
+def get_customer_stats(customer_id):
+    """
+    Return dashboard figures for one customer.
+    Returns dict with total_orders, pending_orders, delivered_orders and total_spent.
+    """
+    return get_or_compute(
+        'orders',
+        ('dashboard', 'customer', customer_id),
+        lambda: _compute_customer_stats(customer_id),
+        DASHBOARD_CACHE_TIMEOUT
+    )
+
+
+def _compute_admin_stats():
+    from lib.ECommerce.Models.Customer import Customer
+    from lib.ECommerce.Models.Order import Order
+    from lib.ECommerce.Models.Product import Product
+
+    # Served from the partial index on active products' stock columns
+    stats = Product.objects.filter(is_active=True).aggregate(
+        total_products=Count('id'),
+        low_stock=Count('id', filter=Q(stock_quantity__lte=F('reorder_level'))),
+    )
+    # Active orders come from the shared per-status order stats
+    stats['total_orders'] = Order.get_order_stats(cached=True)['total_orders']
+    stats['total_customers'] = Customer.objects.count()
+    return stats
+
+
+def _compute_customer_stats(customer_id):
+    from lib.ECommerce.Models.Order import Order
+
+    stats = Order.objects.filter(customer_id=customer_id).aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='pending')),
+        delivered_orders=Count('id', filter=Q(status='delivered')),
+        total_spent=Sum('total', filter=~Q(status='cancelled')),
+    )
+    stats['total_spent'] = stats['total_spent'] or 0
+    return stats
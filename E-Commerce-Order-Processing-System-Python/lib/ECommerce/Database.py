@@ -1,12 +1,37 @@
 """
 ShopPy - Database Module
-Handles database initialization and sample data.
+Handles database initialization, connection tuning and sample data.
 Equivalent to Perl ECommerce::Database
+
+apply_database_profile() runs on every new SQLite connection and applies
+the pragmas of settings.DATABASE_PROFILE. The system checks below reject
+invalid pragma values at startup and, when the database is checked
+(migrate, or `manage.py check --database default`), warn if SQLite did not
+accept them, e.g. WAL on a filesystem that cannot share memory.
 """
 
 import os
 from pathlib import Path
 from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Accepted values of the keyword pragmas, in SQLite's numbering where
+# the pragma reads back as a number
+PRAGMA_CHOICES = {
+    'journal_mode': ['DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'],
+    'synchronous': ['OFF', 'NORMAL', 'FULL', 'EXTRA'],
+    'temp_store': ['DEFAULT', 'FILE', 'MEMORY'],
+}
+
+# Pragmas that change the database file, left alone on read-only replicas
+FILE_PRAGMAS = ('journal_mode',)
+
+# Numeric pragmas and the smallest value each accepts
+PRAGMA_MINIMUMS = {
+    'busy_timeout': 0,
+    'mmap_size': 0,
+    'cache_size': None,
+}
 
 
 def get_db_path():
@@ -14,6 +39,84 @@ def get_db_path():
     return settings.DATABASES['default']['NAME']
 
 
+def get_database_profile(alias=None):
+    """Pragmas of the configured database profile for a database alias."""
+    profile = settings.DATABASE_PROFILES[settings.DATABASE_PROFILE]
+    if alias == settings.DATABASE_REPLICA_ALIAS:
+        profile = {name: value for name, value in profile.items() if name not in FILE_PRAGMAS}
+    return profile
+
+
+def apply_database_profile(sender, connection, **kwargs):
+    """
+    Apply the profile pragmas to a new SQLite connection.
+    Connected to the connection_created signal in ECommerceConfig.ready().
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in get_database_profile(connection.alias).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@register()
+def check_database_profile(app_configs, **kwargs):
+    """Validate the profile pragmas before any connection uses them."""
+    errors = []
+    profile = get_database_profile()
+    for name, value in profile.items():
+        if name in PRAGMA_CHOICES:
+            valid = str(value).upper() in PRAGMA_CHOICES[name]
+        elif name in PRAGMA_MINIMUMS:
+            minimum = PRAGMA_MINIMUMS[name]
+            valid = isinstance(value, int) and (minimum is None or value >= minimum)
+        else:
+            valid = False
+        if not valid:
+            errors.append(Error(
+                f"Invalid SQLite pragma in the '{settings.DATABASE_PROFILE}' database profile: "
+                f"{name} = {value!r}",
+                hint='See DATABASE_PROFILES in lib/ECommerce/Config.py.',
+                id='ECommerce.E001',
+            ))
+    return errors
+
+
+@register(Tags.database)
+def check_database_pragmas(app_configs, databases=None, **kwargs):
+    """Warn when SQLite did not apply a profile pragma."""
+    from django.db import connections
+
+    if check_database_profile(app_configs):
+        return []
+
+    errors = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            continue
+        profile = get_database_profile(alias)
+        with connection.cursor() as cursor:
+            for name, value in profile.items():
+                cursor.execute(f'PRAGMA {name}')
+                actual = cursor.fetchone()[0]
+                if name in PRAGMA_CHOICES:
+                    expected = value.upper()
+                    if isinstance(actual, int):
+                        actual = PRAGMA_CHOICES[name][actual]
+                    actual = actual.upper()
+                else:
+                    expected = value
+                if actual != expected:
+                    errors.append(Warning(
+                        f"SQLite did not apply {name} = {value} on database '{alias}' "
+                        f"(it is {actual})",
+                        hint='Set DATABASE_PROFILE=default if this filesystem does not support it.',
+                        id='ECommerce.W001',
+                    ))
+    return errors
+
+
 def initialize_database():
     """
     Initialize database and create sample data if needed.
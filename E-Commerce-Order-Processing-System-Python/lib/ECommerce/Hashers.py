@@ -0,0 +1,105 @@
+"""
+ShopPy - Password Hashers
+Django's password hashers with their cost taken from the settings.
+
+settings.PASSWORD_HASHER picks the algorithm new passwords are stored with
+and PASSWORD_HASH_COST its cost. PASSWORD_HASHERS lists all four hashers,
+so passwords stored with any of them keep working. Django rewrites a hash
+with the configured algorithm and cost when the user next logs in,
+because must_update() compares the stored cost with the one below.
+
+The system checks reject a hasher whose library is missing and warn when
+the cost is below the minimum for that algorithm.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.checks import Error, Tags, Warning, register
+
+# Costs each hasher uses when PASSWORD_HASH_COST is not set; bcrypt is
+# lowered from Django's 12 rounds so logins stay cheap under load
+DEFAULT_COSTS = {
+    'bcrypt': 10,
+    'argon2': hashers.Argon2PasswordHasher.time_cost,
+    'scrypt': 14,
+    'pbkdf2': hashers.PBKDF2PasswordHasher.iterations,
+}
+
+# Lowest cost accepted without a warning (OWASP password storage guidance)
+MINIMUM_COSTS = {
+    'bcrypt': 10,
+    'argon2': 2,
+    'scrypt': 14,
+    'pbkdf2': 600000,
+}
+
+# Module each hasher needs installed
+HASHER_LIBRARIES = {
+    'bcrypt': 'bcrypt',
+    'argon2': 'argon2',
+}
+
+
+def get_hash_cost(name):
+    """Cost for a hasher: PASSWORD_HASH_COST if it is the configured one, else its default."""
+    if name == settings.PASSWORD_HASHER and settings.PASSWORD_HASH_COST:
+        return settings.PASSWORD_HASH_COST
+    return DEFAULT_COSTS[name]
+
+
+class BCryptPasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt over a SHA-256 digest; cost is the log2 number of rounds."""
+
+    @property
+    def rounds(self):
+        return get_hash_cost('bcrypt')
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id; cost is the number of passes (time_cost). Needs argon2-cffi."""
+
+    @property
+    def time_cost(self):
+        return get_hash_cost('argon2')
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """scrypt; cost is the log2 work factor (14 means N = 16384)."""
+
+    @property
+    def work_factor(self):
+        return 2 ** get_hash_cost('scrypt')
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256, Django's default; cost is the number of iterations."""
+
+    @property
+    def iterations(self):
+        return get_hash_cost('pbkdf2')
+
+
+@register(Tags.security)
+def check_password_hasher(app_configs, **kwargs):
+    """Check that the configured hasher can run and its cost is not too low."""
+    import importlib.util
+
+    errors = []
+    name = settings.PASSWORD_HASHER
+    library = HASHER_LIBRARIES.get(name)
+    if library and importlib.util.find_spec(library) is None:
+        errors.append(Error(
+            f"PASSWORD_HASHER is '{name}' but the {library} package is not installed",
+            hint=f"pip install {'argon2-cffi' if name == 'argon2' else library}",
+            id='ECommerce.E002',
+        ))
+
+    cost = get_hash_cost(name)
+    if cost < MINIMUM_COSTS[name]:
+        errors.append(Warning(
+            f"PASSWORD_HASH_COST {cost} is below the recommended minimum of "
+            f"{MINIMUM_COSTS[name]} for {name}",
+            hint='Only lower it for development or tests.',
+            id='ECommerce.W002',
+        ))
+    return errors
@@ -0,0 +1,146 @@
+"""
+ShopPy - Identity Context
+Who is logged in, without loading the User row on every request.
+
+At login Auth.login_user() resolves the user id, role, username and
+customer id once and stores them in the session as a compact signed
+payload. IdentityMiddleware exposes it as request.shop_identity, decoded on
+first use, so role checks (admin_required, customer_required,
+identity_required), templates and Auth.get_customer_id() need no database
+query beyond loading the session.
+
+The payload is trusted for SHOP_IDENTITY_MAX_AGE seconds. After that, or if
+it is missing or does not belong to the session's user, it is rebuilt from
+request.user, which also re-runs Django's session checks. A role change or
+deactivation therefore takes effect within that time; logging out or
+deleting the session takes effect immediately.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.views import redirect_to_login
+from django.core import signing
+from django.utils.functional import SimpleLazyObject
+
+# Session key holding the signed payload
+IDENTITY_SESSION_KEY = '_shop_identity'
+IDENTITY_SALT = 'lib.ECommerce.Identity'
+
+
+class ShopIdentity:
+    """The logged-in user's id, role, username and customer id."""
+
+    __slots__ = ('user_id', 'role', 'username', 'customer_id')
+
+    def __init__(self, user_id=None, role='', username='', customer_id=None):
+        self.user_id = user_id
+        self.role = role
+        self.username = username
+        self.customer_id = customer_id
+
+    def __repr__(self):
+        return f'<ShopIdentity user={self.user_id} role={self.role!r} customer={self.customer_id}>'
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_staff(self):
+        """Staff or admin, like Auth.is_staff()."""
+        return self.role in ('staff', 'admin')
+
+    @property
+    def is_customer(self):
+        return self.role == 'customer'
+
+
+ANONYMOUS = ShopIdentity()
+
+
+def build_identity(user):
+    """Resolve the identity of a user; customers' profiles are looked up once here."""
+    from lib.ECommerce.Models.Customer import Customer
+
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+    customer_id = None
+    if user.role == 'customer':
+        customer = Customer.get_customer_by_user_id(user.id)
+        customer_id = customer.id if customer else None
+    return ShopIdentity(user.id, user.role, user.username, customer_id)
+
+
+def store_identity(request, identity):
+    """Sign an identity into the session and make it the request's identity."""
+    request.session[IDENTITY_SESSION_KEY] = signing.dumps(
+        [identity.user_id, identity.role, identity.username, identity.customer_id],
+        salt=IDENTITY_SALT,
+        compress=True,
+    )
+    request.shop_identity = identity
+
+
+def refresh_identity(request):
+    """Rebuild the identity from request.user, e.g. after creating a customer profile."""
+    identity = build_identity(getattr(request, 'user', None))
+    if identity.is_authenticated:
+        store_identity(request, identity)
+    return identity
+
+
+def _load_identity(request):
+    session = getattr(request, 'session', None)
+    if session is None or session.get(SESSION_KEY) is None:
+        return ANONYMOUS
+
+    payload = session.get(IDENTITY_SESSION_KEY)
+    if payload:
+        try:
+            user_id, role, username, customer_id = signing.loads(
+                payload, salt=IDENTITY_SALT, max_age=settings.SHOP_IDENTITY_MAX_AGE
+            )
+        except (signing.BadSignature, ValueError):
+            pass
+        else:
+            if str(user_id) == str(session[SESSION_KEY]):
+                return ShopIdentity(user_id, role, username, customer_id)
+
+    # Missing, expired or stale: load the user once and sign a new payload
+    return refresh_identity(request)
+
+
+def get_identity(request):
+    """Return the request's identity, decoding it if the middleware has not."""
+    identity = getattr(request, 'shop_identity', None)
+    if identity is None:
+        identity = _load_identity(request)
+        request.shop_identity = identity
+    return identity
+
+
+class IdentityMiddleware:
+    """Attach the lazily decoded identity to each request as request.shop_identity."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.shop_identity = SimpleLazyObject(lambda: _load_identity(request))
+        return self.get_response(request)
+
+
+def identity_required(view_func):
+    """Like login_required, but checks request.shop_identity instead of loading the user."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not get_identity(request).is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return view_func(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,381 @@
+"""
+ShopPy - Bulk Imports
+Streaming readers and batched writers for supplier feeds.
+
+Feeds are CSV (with a header row) or JSON Lines files. They are read one
+record at a time and written in fixed-size batches, so memory use depends
+on the batch size rather than the size of the file. import_products()
+upserts catalog rows and sync_stock() sets stock levels, both keyed by SKU.
+"""
+
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+FEED_FORMATS = ('csv', 'jsonl')
+
+MAX_PRICE = Decimal('100000000')
+
+
+class FeedError(ValueError):
+    """Raised for a record that cannot be imported."""
+
+
+def detect_format(path):
+    """Guess the feed format from the file extension."""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise FeedError(f"Cannot tell the format of '{path}', expected .csv or .jsonl")
+
+
+def read_feed(path, fmt=None):
+    """
+    Yield (line_number, record) pairs from a CSV or JSONL file.
+    Records that cannot be parsed are yielded as (line_number, FeedError).
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FEED_FORMATS:
+        raise FeedError(f"Unknown feed format '{fmt}'")
+
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        if fmt == 'csv':
+            reader = csv.DictReader(handle)
+            for record in reader:
+                # Drop empty cells so they fall back to defaults
+                yield reader.line_num, {
+                    key.strip(): value.strip()
+                    for key, value in record.items()
+                    if key and value is not None and value.strip() != ''
+                }
+        else:
+            for line_number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, FeedError(f"Invalid JSON: {e}")
+                    continue
+                if not isinstance(record, dict):
+                    yield line_number, FeedError('Expected a JSON object')
+                    continue
+                yield line_number, record
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def update_rows(objs, fields):
+    """
+    Save the given fields of already loaded model instances.
+    Runs one UPDATE per row through executemany; bulk_update builds a CASE
+    expression per field and row, which costs far more than the writes
+    themselves on large batches.
+    """
+    if not objs:
+        return
+    meta = objs[0]._meta
+    columns = [meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in columns)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(meta.db_table)} SET {assignments} WHERE {quote(meta.pk.column)} = %s',
+            [
+                [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in columns]
+                + [obj.pk]
+                for obj in objs
+            ]
+        )
+
+
+def parse_decimal(value, field):
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise FeedError(f"Invalid {field}: '{value}'")
+    # Matches DecimalField(max_digits=10, decimal_places=2)
+    if not number.is_finite() or number < 0 or number >= MAX_PRICE:
+        raise FeedError(f"Invalid {field}: '{value}'")
+    return number.quantize(Decimal('0.01'))
+
+
+def parse_int(value, field):
+    try:
+        number = int(str(value))
+    except ValueError:
+        raise FeedError(f"Invalid {field}: '{value}'")
+    if number < 0:
+        raise FeedError(f"Invalid {field}: '{value}'")
+    return number
+
+
+def parse_bool(value, field):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y'):
+        return True
+    if text in ('0', 'false', 'no', 'n'):
+        return False
+    raise FeedError(f"Invalid {field}: '{value}'")
+
+
+def _clean_product(record, categories):
+    """Validate a product record. Returns (sku, fields) or raises FeedError."""
+    sku = str(record.get('sku', '')).strip()
+    if not sku:
+        raise FeedError('Missing sku')
+    if len(sku) > 50:
+        raise FeedError(f"SKU too long: '{sku}'")
+
+    fields = {}
+    if 'name' in record:
+        fields['name'] = str(record['name']).strip()[:255]
+    if 'description' in record:
+        fields['description'] = str(record['description'])
+    if 'category' in record:
+        category = categories.get(str(record['category']).strip().lower())
+        if category is None:
+            raise FeedError(f"Unknown category: '{record['category']}'")
+        fields['category'] = category
+    if 'price' in record:
+        fields['price'] = parse_decimal(record['price'], 'price')
+    if 'cost' in record:
+        fields['cost'] = parse_decimal(record['cost'], 'cost')
+    if 'stock_quantity' in record:
+        fields['stock_quantity'] = parse_int(record['stock_quantity'], 'stock_quantity')
+    if 'reorder_level' in record:
+        fields['reorder_level'] = parse_int(record['reorder_level'], 'reorder_level')
+    if 'image_url' in record:
+        fields['image_url'] = str(record['image_url']).strip()[:500]
+    if 'is_active' in record:
+        fields['is_active'] = parse_bool(record['is_active'], 'is_active')
+    return sku, fields
+
+
+def import_products(records, batch_size=1000, on_error=None, on_batch=None):
+    """
+    Upsert products by SKU from (line_number, record) pairs.
+    New SKUs are inserted with bulk_create and need name, category and
+    price; existing SKUs are updated in place, changing only the fields
+    present in the record. Nothing is ever deleted. Stock set by the feed
+    is recorded as 'adjustment' inventory transactions.
+    on_error(line_number, message) is called for each rejected record and
+    on_batch(stats) after each batch is written.
+    Returns dict with processed, created, updated and errors.
+    """
+    from lib.ECommerce.Cache import bump_namespace
+    from lib.ECommerce.Inventory import ledger_writer
+    from lib.ECommerce.Models.Product import Product
+
+    categories = {name.lower(): name for name in Product.get_categories()}
+    stats = {'processed': 0, 'created': 0, 'updated': 0, 'errors': 0}
+
+    def reject(line_number, message):
+        stats['errors'] += 1
+        if on_error:
+            on_error(line_number, message)
+
+    for batch in batched(records, batch_size):
+        stats['processed'] += len(batch)
+
+        # Validate, keeping the last row for a SKU repeated within the batch
+        rows = {}
+        for line_number, record in batch:
+            if isinstance(record, Exception):
+                reject(line_number, str(record))
+                continue
+            try:
+                sku, fields = _clean_product(record, categories)
+            except FeedError as e:
+                reject(line_number, str(e))
+                continue
+            rows[sku] = (line_number, fields)
+
+        if not rows:
+            continue
+
+        with ledger_writer() as ledger:
+            # Locked in id order, like checkouts, so the two never deadlock
+            existing = {
+                product.sku: product
+                for product in Product.objects.select_for_update().filter(sku__in=list(rows)).order_by('id')
+            }
+
+            now = timezone.now()
+            to_create = []
+            to_update = []
+            update_fields = set()
+            for sku, (line_number, fields) in rows.items():
+                product = existing.get(sku)
+                if product is None:
+                    missing = [name for name in ('name', 'category', 'price') if name not in fields]
+                    if missing:
+                        reject(line_number, f"New product {sku} is missing {', '.join(missing)}")
+                        continue
+                    to_create.append(Product(sku=sku, **fields))
+                else:
+                    if 'stock_quantity' in fields:
+                        ledger.add(product.id, fields['stock_quantity'] - product.stock_quantity,
+                                   'adjustment', notes='Catalog import', created_at=now)
+                    for name, value in fields.items():
+                        setattr(product, name, value)
+                    product.updated_at = now
+                    update_fields.update(fields)
+                    to_update.append(product)
+
+            Product.objects.bulk_create(to_create, batch_size=batch_size)
+            for product in to_create:
+                ledger.add(product.id, product.stock_quantity, 'adjustment',
+                           notes='Initial stock', created_at=now)
+            update_rows(to_update, sorted(update_fields | {'updated_at'}))
+
+        stats['created'] += len(to_create)
+        stats['updated'] += len(to_update)
+        if on_batch:
+            on_batch(stats)
+
+    # Bulk writes bypass the Product save hooks
+    bump_namespace('products')
+    bump_namespace('catalog')
+    return stats
+
+
+def _clean_stock(record):
+    """Validate a stock record. Returns (sku, quantity) or raises FeedError."""
+    sku = str(record.get('sku', '')).strip()
+    if not sku:
+        raise FeedError('Missing sku')
+    for key in ('quantity', 'stock_quantity'):
+        if key in record:
+            return sku, parse_int(record[key], 'quantity')
+    raise FeedError('Missing quantity')
+
+
+def sync_stock(records, batch_size=1000, notes='Stock sync', on_error=None, on_batch=None):
+    """
+    Set absolute stock levels by SKU from (line_number, record) pairs.
+    Each record has a sku and a quantity (or stock_quantity). Products whose
+    stock changes are updated in batches and get an 'adjustment' inventory
+    transaction for the difference; unchanged products are left alone.
+    on_error(line_number, message) is called for each rejected record and
+    on_batch(stats) after each batch is written.
+    Returns dict with processed, updated, unchanged, errors, units_added
+    and units_removed.
+    """
+    from lib.ECommerce.Cache import bump_namespace
+    from lib.ECommerce.Models.Order import InventoryTransaction
+    from lib.ECommerce.Models.Product import Product
+
+    product_table = Product._meta.db_table
+    ledger_table = InventoryTransaction._meta.db_table
+    stats = {
+        'processed': 0, 'updated': 0, 'unchanged': 0, 'errors': 0,
+        'units_added': 0, 'units_removed': 0,
+    }
+
+    def reject(line_number, message):
+        stats['errors'] += 1
+        if on_error:
+            on_error(line_number, message)
+
+    for batch in batched(records, batch_size):
+        stats['processed'] += len(batch)
+
+        rows = {}
+        for line_number, record in batch:
+            if isinstance(record, Exception):
+                reject(line_number, str(record))
+                continue
+            try:
+                sku, quantity = _clean_stock(record)
+            except FeedError as e:
+                reject(line_number, str(e))
+                continue
+            rows[sku] = (line_number, quantity)
+
+        if not rows:
+            continue
+
+        with transaction.atomic():
+            # Lock the rows (in id order, like checkouts) so a checkout cannot
+            # change stock under the diff
+            current = {
+                sku: (product_id, stock_quantity)
+                for product_id, sku, stock_quantity in Product.objects.select_for_update().filter(
+                    sku__in=list(rows)
+                ).order_by('id').values_list('id', 'sku', 'stock_quantity')
+            }
+
+            changes = []
+            for sku, (line_number, quantity) in rows.items():
+                if sku not in current:
+                    reject(line_number, f"Unknown SKU: '{sku}'")
+                    continue
+                product_id, stock_quantity = current[sku]
+                delta = quantity - stock_quantity
+                if not delta:
+                    stats['unchanged'] += 1
+                    continue
+                changes.append((product_id, quantity, delta))
+                if delta > 0:
+                    stats['units_added'] += delta
+                else:
+                    stats['units_removed'] -= delta
+
+            if changes:
+                # Plain executemany: building model instances costs more than the writes
+                now = connection.ops.adapt_datetimefield_value(timezone.now())
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f"UPDATE {product_table} SET stock_quantity = %s, updated_at = %s WHERE id = %s",
+                        [(quantity, now, product_id) for product_id, quantity, _ in changes]
+                    )
+                    cursor.executemany(
+                        f"INSERT INTO {ledger_table} "
+                        f"(product_id, quantity_change, transaction_type, notes, created_at) "
+                        f"VALUES (%s, %s, 'adjustment', %s, %s)",
+                        [(product_id, delta, notes, now) for product_id, _, delta in changes]
+                    )
+
+        stats['updated'] += len(changes)
+        if on_batch:
+            on_batch(stats)
+
+    # Bulk writes bypass the Product save hooks
+    bump_namespace('products')
+    return stats
+
+
+def get_stock_totals():
+    """
+    Catalog-wide stock figures from a single aggregate query.
+    Returns dict with total_products, total_stock, out_of_stock and low_stock.
+    """
+    from django.db.models import Count, F, Q, Sum
+    from lib.ECommerce.Models.Product import Product
+
+    totals = Product.objects.aggregate(
+        total_products=Count('id'),
+        total_stock=Sum('stock_quantity'),
+        out_of_stock=Count('id', filter=Q(stock_quantity=0)),
+        low_stock=Count('id', filter=Q(stock_quantity__lte=F('reorder_level'))),
+    )
+    totals['total_stock'] = totals['total_stock'] or 0
+    return totals
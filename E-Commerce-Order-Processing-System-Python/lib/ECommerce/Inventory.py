@@ -0,0 +1,214 @@
+"""
+ShopPy - Inventory Ledger
+Buffered writer for inventory_transactions, the append-only stock ledger.
+
+Every stock change goes through ledger_writer(), which opens a transaction
+and collects ledger rows in memory. The rows are written with one
+bulk_create just before the transaction commits, so a checkout, a
+cancellation or an import costs one INSERT however many products it
+touches, and a rollback never leaves ledger rows behind.
+
+Writers nest: a stock change made while another writer is open on the same
+thread (cancel_order restoring each line, for example) adds to the
+outer writer's buffer instead of flushing on its own.
+
+reconcile_inventory() checks products.stock_quantity against the ledger.
+Per-product balances are checkpointed in inventory_snapshots, so each run
+only replays the ledger rows written since the previous one.
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+# Ledger rows written per INSERT, and the buffer size that forces an early flush
+LEDGER_BATCH_SIZE = 1000
+
+# Ledger rows younger than this are not checkpointed yet, so a transaction
+# still in flight cannot commit a row below the checkpoint
+RECONCILE_SETTLE_SECONDS = 60
+
+# Products read, checkpointed or re-checked per query during reconciliation
+RECONCILE_BATCH_SIZE = 1000
+
+_state = threading.local()
+
+
+class LedgerWriter:
+    """Collects inventory transactions and writes them in bulk."""
+
+    def __init__(self, batch_size=LEDGER_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.entries = []
+        # Open nested writers; the buffer is only flushed early outside them
+        self.depth = 0
+
+    def add(self, product_id, quantity_change, transaction_type, reference_id=None, notes='', created_at=None):
+        """Queue one ledger row. Zero changes are not recorded."""
+        from lib.ECommerce.Models.Order import InventoryTransaction
+
+        if not quantity_change:
+            return
+        self.entries.append(InventoryTransaction(
+            product_id=product_id,
+            quantity_change=quantity_change,
+            transaction_type=transaction_type,
+            reference_id=reference_id,
+            notes=notes,
+            created_at=created_at or timezone.now()
+        ))
+        if len(self.entries) >= self.batch_size and not self.depth:
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows."""
+        from lib.ECommerce.Models.Order import InventoryTransaction
+
+        if self.entries:
+            InventoryTransaction.objects.bulk_create(self.entries, batch_size=self.batch_size)
+            self.entries = []
+
+
+@contextmanager
+def ledger_writer():
+    """
+    Run a block of stock changes in one transaction with a shared ledger buffer.
+    Yields the LedgerWriter to add rows to. The outermost writer flushes
+    the buffer before committing; nested writers run in a savepoint and
+    drop the rows they queued if it rolls back.
+    """
+    writer = getattr(_state, 'writer', None)
+    if writer is not None:
+        queued = len(writer.entries)
+        writer.depth += 1
+        try:
+            with transaction.atomic():
+                yield writer
+        except BaseException:
+            del writer.entries[queued:]
+            raise
+        finally:
+            writer.depth -= 1
+        return
+
+    writer = LedgerWriter()
+    _state.writer = writer
+    try:
+        with transaction.atomic():
+            yield writer
+            writer.flush()
+    finally:
+        _state.writer = None
+
+
+def reconcile_inventory(fix=False, full=False, settle_seconds=RECONCILE_SETTLE_SECONDS, on_drift=None):
+    """
+    Compare every product's stock level with its ledger balance.
+    Only ledger rows after the latest snapshot checkpoint are replayed;
+    full=True ignores the snapshots and replays the whole ledger. Products
+    that look out of line are re-checked with their rows locked, and with
+    fix=True the difference is recorded as an 'adjustment' so the ledger
+    agrees with the stock level. Snapshots are then moved forward to the
+    newest settled ledger row.
+    on_drift(product_id, sku, stock_quantity, ledger_balance) is called for
+    each product that does not match.
+    Returns dict with products, replayed, drifted, fixed, snapshots and
+    checkpoint.
+    """
+    from django.db.models import Count, Max, Q, Sum
+    from lib.ECommerce.Models.Inventory import InventorySnapshot
+    from lib.ECommerce.Models.Order import InventoryTransaction
+    from lib.ECommerce.Models.Product import Product
+
+    start = 0
+    if not full:
+        start = InventorySnapshot.objects.aggregate(mark=Max('last_transaction_id'))['mark'] or 0
+
+    # Every row after the start, and how many of them are old enough to checkpoint
+    new_rows = InventoryTransaction.objects.filter(id__gt=start).order_by()
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    checkpoint = new_rows.filter(created_at__lte=cutoff).aggregate(mark=Max('id'))['mark'] or start
+    changes = {
+        row['product_id']: row
+        for row in new_rows.values('product_id').annotate(
+            total=Sum('quantity_change'),
+            settled=Sum('quantity_change', filter=Q(id__lte=checkpoint)),
+            settled_rows=Count('id', filter=Q(id__lte=checkpoint)),
+        )
+    }
+
+    stats = {
+        'products': 0,
+        'replayed': sum(row['settled_rows'] for row in changes.values()),
+        'drifted': 0,
+        'fixed': 0,
+        'snapshots': 0,
+        'checkpoint': checkpoint,
+    }
+
+    bases = {}
+    suspects = []
+    now = timezone.now()
+    products = Product.objects.values_list('id', 'stock_quantity', 'inventory_snapshot__balance')
+    # One transaction, so a failed run never leaves the checkpoint half moved
+    with transaction.atomic():
+        last_id = 0
+        while True:
+            # Walk products in id order, checkpointing each batch
+            batch = list(products.filter(id__gt=last_id).order_by('id')[:RECONCILE_BATCH_SIZE])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            snapshots = []
+            for product_id, stock_quantity, base in batch:
+                base = 0 if full or base is None else base
+                row = changes.get(product_id)
+                if stock_quantity != base + (row['total'] if row else 0):
+                    bases[product_id] = base
+                    suspects.append(product_id)
+                if row and row['settled_rows']:
+                    snapshots.append(InventorySnapshot(
+                        product_id=product_id,
+                        balance=base + (row['settled'] or 0),
+                        last_transaction_id=checkpoint,
+                        as_of=now
+                    ))
+
+            InventorySnapshot.objects.bulk_create(
+                snapshots,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['balance', 'last_transaction_id', 'as_of']
+            )
+            stats['products'] += len(batch)
+            stats['snapshots'] += len(snapshots)
+
+    # Stock and ledger move together inside one transaction, so a product that
+    # changed while it was being read can look out of line; check again locked
+    for offset in range(0, len(suspects), RECONCILE_BATCH_SIZE):
+        product_ids = suspects[offset:offset + RECONCILE_BATCH_SIZE]
+        with ledger_writer() as ledger:
+            current = Product.objects.select_for_update().filter(
+                id__in=product_ids
+            ).order_by('id').values_list('id', 'sku', 'stock_quantity')
+            totals = dict(
+                InventoryTransaction.objects.filter(product_id__in=product_ids, id__gt=start)
+                .order_by().values_list('product_id').annotate(total=Sum('quantity_change'))
+            )
+            for product_id, sku, stock_quantity in current:
+                balance = bases[product_id] + (totals.get(product_id) or 0)
+                if stock_quantity == balance:
+                    continue
+                stats['drifted'] += 1
+                if on_drift:
+                    on_drift(product_id, sku, stock_quantity, balance)
+                if fix:
+                    ledger.add(product_id, stock_quantity - balance, 'adjustment',
+                               notes='Inventory reconciliation')
+                    stats['fixed'] += 1
+
+    return stats
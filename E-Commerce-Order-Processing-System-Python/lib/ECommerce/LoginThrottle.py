@@ -0,0 +1,81 @@
+"""
+ShopPy - Login Throttling
+Refuses logins for a username or client address after too many failures.
+
+Auth.login_user() asks login_blocked() before it calls authenticate(), so a
+brute-force run costs one cache lookup per attempt instead of a password
+hash. Failures are counted per username (LOGIN_ATTEMPT_LIMIT) and per
+client address (LOGIN_IP_ATTEMPT_LIMIT) for LOGIN_ATTEMPT_WINDOW seconds
+from the first failure. A successful login clears the username's counter
+but not the address's, so one valid account cannot reset an attacker's
+budget.
+
+The address limit is off by default: behind a reverse proxy REMOTE_ADDR is
+the proxy, and every customer would share one counter. Enable it together
+with LOGIN_CLIENT_IP_HEADER, the header the proxy sets to the client
+address; the last address in that header is the one the proxy added.
+
+Counters are kept in the default cache: with the per-process locmem
+backend every worker process counts on its own.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _username_key(username):
+    digest = hashlib.md5(username.strip().lower().encode('utf-8')).hexdigest()
+    return f"login:user:{digest}"
+
+
+def _client_address(request):
+    """The client address from LOGIN_CLIENT_IP_HEADER, or REMOTE_ADDR without one."""
+    if settings.LOGIN_CLIENT_IP_HEADER:
+        meta_key = 'HTTP_' + settings.LOGIN_CLIENT_IP_HEADER.upper().replace('-', '_')
+        # Earlier entries of X-Forwarded-For come from the client and can be forged
+        forwarded = request.META.get(meta_key, '').split(',')[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _address_key(request):
+    return f"login:ip:{_client_address(request)}"
+
+
+def _limits(request, username):
+    """(cache key, limit) pairs for the enabled limits."""
+    limits = []
+    if settings.LOGIN_ATTEMPT_LIMIT and username:
+        limits.append((_username_key(username), settings.LOGIN_ATTEMPT_LIMIT))
+    if settings.LOGIN_IP_ATTEMPT_LIMIT:
+        limits.append((_address_key(request), settings.LOGIN_IP_ATTEMPT_LIMIT))
+    return limits
+
+
+def login_blocked(request, username):
+    """Check whether logins for this username or from this address are refused."""
+    limits = _limits(request, username)
+    if not limits:
+        return False
+    counts = cache.get_many([key for key, _ in limits])
+    return any(counts.get(key, 0) >= limit for key, limit in limits)
+
+
+def record_login_failure(request, username):
+    """Count a failed login against the username and the client address."""
+    for key, _ in _limits(request, username):
+        # add() only starts the window on the first failure
+        cache.add(key, 0, settings.LOGIN_ATTEMPT_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, settings.LOGIN_ATTEMPT_WINDOW)
+
+
+def clear_login_failures(username):
+    """Forget the failed logins of a username after it logs in."""
+    if settings.LOGIN_ATTEMPT_LIMIT and username:
+        cache.delete(_username_key(username))
@@ -0,0 +1,40 @@
+"""
+ShopPy - Cart Model
+Stores shopping cart lines server-side, one row per product.
+"""
+
+from django.db import models
+from django.utils import timezone
+
+
+class CartItem(models.Model):
+    """
+    A single line in a shopping cart.
+    Lines are grouped by cart_key, which identifies either a logged-in
+    user (shared across devices) or a single browser session.
+    """
+
+    cart_key = models.CharField(max_length=64)
+    product = models.ForeignKey(
+        'ECommerce.Product',
+        on_delete=models.CASCADE,
+        related_name='cart_items'
+    )
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.IntegerField(default=1)
+    image_url = models.URLField(max_length=500, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cart_items'
+        verbose_name = 'Cart Item'
+        verbose_name_plural = 'Cart Items'
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['cart_key', 'product'], name='cart_items_key_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.cart_key}: {self.name} x {self.quantity}"
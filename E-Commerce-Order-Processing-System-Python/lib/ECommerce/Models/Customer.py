@@ -7,6 +7,8 @@ Equivalent to Perl ECommerce::Models::Customer
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 
 class Customer(models.Model):
@@ -36,6 +38,9 @@ class Customer(models.Model):
         db_table = 'customers'
         verbose_name = 'Customer'
         verbose_name_plural = 'Customers'
+        indexes = [
+            models.Index(fields=['-created_at'], name='customers_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -87,3 +92,10 @@ class Customer(models.Model):
             Q(phone__icontains=search_term) |
             Q(user__email__icontains=search_term)
         ).order_by('-created_at')
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_customer_caches(sender, **kwargs):
+    """Drop cached customer aggregates whenever a customer is written."""
+    from lib.ECommerce.Cache import bump_namespace
+    bump_namespace('customers')
@@ -0,0 +1,39 @@
+"""
+ShopPy - Inventory Snapshot Model
+Checkpointed ledger balances used by inventory reconciliation.
+Maintained by lib.ECommerce.Inventory.reconcile_inventory.
+"""
+
+from django.db import models
+from django.utils import timezone
+
+
+class InventorySnapshot(models.Model):
+    """
+    A product's ledger balance as of a given inventory transaction.
+    balance is the sum of every ledger row for the product up to and
+    including last_transaction_id, so reconciliation only has to replay
+    the rows written after it.
+    """
+
+    product = models.OneToOneField(
+        'Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='inventory_snapshot'
+    )
+    balance = models.IntegerField(default=0)
+    last_transaction_id = models.BigIntegerField(default=0)
+    as_of = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'inventory_snapshots'
+        verbose_name = 'Inventory Snapshot'
+        verbose_name_plural = 'Inventory Snapshots'
+        indexes = [
+            # Latest checkpoint, where the next reconciliation starts replaying
+            models.Index(fields=['last_transaction_id'], name='inv_snapshot_last_txn_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.balance} @ {self.last_transaction_id}"
@@ -7,8 +7,8 @@ Equivalent to Perl ECommerce::Models::Order
 from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
-import random
-from datetime import datetime
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
 
 
 class Order(models.Model):
@@ -26,6 +26,17 @@ class Order(models.Model):
         ('refunded', 'Refunded'),
     ]
 
+    # Statuses each status may move to. Orders only move forward; they can be
+    # cancelled until shipped and refunded once shipped.
+    ALLOWED_TRANSITIONS = {
+        'pending': {'processing', 'shipped', 'delivered', 'cancelled'},
+        'processing': {'shipped', 'delivered', 'cancelled'},
+        'shipped': {'delivered', 'refunded'},
+        'delivered': {'refunded'},
+        'cancelled': set(),
+        'refunded': set(),
+    }
+
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('paid', 'Paid'),
@@ -74,68 +85,131 @@ class Order(models.Model):
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='orders_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='orders_status_created_idx'),
+            models.Index(fields=['customer', '-created_at'], name='orders_customer_created_idx'),
+            models.Index(fields=['customer', 'status'], name='orders_customer_status_idx'),
+            models.Index(fields=['-total'], name='orders_total_idx'),
+        ]
 
     def __str__(self):
         return self.order_number
 
     @staticmethod
     def generate_order_number():
-        """Generate unique order number."""
-        date_str = datetime.now().strftime('%Y%m%d')
-        random_num = random.randint(10000, 99999)
-        return f"ORD-{date_str}-{random_num}"
+        """Generate unique order number using the configured generator."""
+        from lib.ECommerce.OrderNumbers import get_order_number_generator
+        return get_order_number_generator().next()
 
     @classmethod
-    def create_from_cart(cls, customer, cart_items, payment_method, shipping_address, billing_address=None, notes=''):
+    def create_from_cart(cls, customer, cart_items, payment_method, shipping_address, billing_address=None, notes='',
+                         skip_locked=False):
         """
         Create order from shopping cart.
         cart_items should be list of dicts with product_id, quantity, price, name
+
+        All cart products are loaded in a single query. Stock is decremented
+        with conditional updates in product id order, so concurrent checkouts
+        can neither oversell nor deadlock, and order items and inventory
+        transactions are written in bulk. Lines that cannot be fulfilled
+        (missing or deactivated products, not enough stock) are reported in
+        'failed_items'.
+
+        With skip_locked, on databases with row locks (PostgreSQL), the cart
+        products are locked before anything is written and lines whose
+        product another checkout is holding fail at once with a retry
+        message, instead of queueing behind it.
         """
+        from django.db.models import F
         from lib.ECommerce.Models.Product import Product
-        from lib.ECommerce.Config import APP_CONFIG
+        from lib.ECommerce.Cart import calculate_totals
+        from lib.ECommerce.Cache import bump_namespace
+        from lib.ECommerce.Inventory import ledger_writer
+        from lib.ECommerce.Outbox import record_transitions
+        from lib.ECommerce.Rollups import record_orders
 
         if not cart_items:
             return {'success': False, 'message': 'Cart is empty'}
 
+        # Merge duplicate lines so each product is decremented only once
+        quantities = {}
+        names = {}
+        for item in cart_items:
+            product_id = int(item['product_id'])
+            quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+            names.setdefault(product_id, item.get('name', 'Unknown'))
+
+        products = Product.objects.in_bulk(list(quantities))
+
         subtotal = 0
         order_items_data = []
+        failed_items = []
 
         # Validate cart and calculate totals
-        for item in cart_items:
-            try:
-                product = Product.objects.get(id=item['product_id'])
-            except Product.DoesNotExist:
-                return {'success': False, 'message': f"Product not found: {item.get('name', 'Unknown')}"}
-
-            if product.stock_quantity < item['quantity']:
-                return {'success': False, 'message': f"Insufficient stock for: {product.name}"}
-
-            item_subtotal = float(product.price) * item['quantity']
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                failed_items.append(cls._failed_line(
+                    product_id, names[product_id], f"Product not found: {names[product_id]}"
+                ))
+                continue
+
+            if not product.is_active:
+                failed_items.append(cls._failed_line(
+                    product_id, product.name, f"No longer available: {product.name}"
+                ))
+                continue
+
+            if product.stock_quantity < quantity:
+                failed_items.append(cls._failed_line(
+                    product_id, product.name, f"Insufficient stock for: {product.name}"
+                ))
+                continue
+
+            item_subtotal = float(product.price) * quantity
             subtotal += item_subtotal
 
             order_items_data.append({
                 'product': product,
                 'product_name': product.name,
                 'product_sku': product.sku,
-                'quantity': item['quantity'],
+                'product_category': product.category,
+                'quantity': quantity,
                 'unit_price': product.price,
                 'subtotal': item_subtotal,
             })
 
-        # Calculate tax and shipping
-        tax_rate = APP_CONFIG.get('tax_rate', 0.08)
-        shipping_rate = APP_CONFIG.get('shipping_rate', 5.00)
-        free_shipping_threshold = APP_CONFIG.get('free_shipping_threshold', 100.00)
+        if failed_items:
+            return cls._checkout_failure(failed_items)
 
-        tax = subtotal * tax_rate
-        shipping = 0 if subtotal >= free_shipping_threshold else shipping_rate
-        total = subtotal + tax + shipping
+        # Calculate tax and shipping
+        totals = calculate_totals(subtotal)
+        tax = totals['tax']
+        shipping = totals['shipping']
+        total = totals['total']
 
         try:
-            with transaction.atomic():
+            # Generated before the checkout transaction, so its lease (when
+            # a new block is needed) does not hold the sequence row for the
+            # whole checkout
+            order_number = cls.generate_order_number()
+
+            with ledger_writer() as ledger:
+                if skip_locked:
+                    locked = Product.lock_for_update(quantities, skip_locked=True)
+                    for product_id in sorted(set(quantities) - locked):
+                        product = products[product_id]
+                        failed_items.append(cls._failed_line(
+                            product_id, product.name,
+                            f"{product.name} is being ordered by another customer, please try again"
+                        ))
+                    if failed_items:
+                        return cls._checkout_failure(failed_items)
+
                 # Create order
                 order = cls.objects.create(
-                    order_number=cls.generate_order_number(),
+                    order_number=order_number,
                     customer=customer,
                     subtotal=subtotal,
                     tax=tax,
@@ -147,23 +221,48 @@ class Order(models.Model):
                     notes=notes
                 )
 
-                # Create order items and update stock
-                for item_data in order_items_data:
-                    product = item_data.pop('product')
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        **item_data
+                # Reserve stock; the guards make each update a no-op if another
+                # checkout got there first or the product was just deactivated
+                now = timezone.now()
+                for product_id in sorted(quantities):
+                    reserved = Product.objects.filter(
+                        id=product_id,
+                        is_active=True,
+                        stock_quantity__gte=quantities[product_id]
+                    ).update(
+                        stock_quantity=F('stock_quantity') - quantities[product_id],
+                        updated_at=now
                     )
-
-                    # Update stock
-                    product.update_stock(
-                        quantity_change=-item_data['quantity'],
-                        transaction_type='sale',
+                    if not reserved:
+                        product = products[product_id]
+                        failed_items.append(cls._failed_line(
+                            product_id, product.name, f"Insufficient stock for: {product.name}"
+                        ))
+
+                if failed_items:
+                    transaction.set_rollback(True)
+                    return cls._checkout_failure(failed_items)
+
+                bump_namespace('products')
+
+                # Create order items and queue the inventory transactions
+                order_items = OrderItem.objects.bulk_create([
+                    OrderItem(order=order, **item_data)
+                    for item_data in order_items_data
+                ])
+                for item_data in order_items_data:
+                    ledger.add(
+                        item_data['product'].id,
+                        -item_data['quantity'],
+                        'sale',
                         reference_id=order.id,
-                        notes=f"Order {order.order_number}"
+                        notes=f"Order {order.order_number}",
+                        created_at=now
                     )
 
+                record_orders([order], items=order_items)
+                record_transitions([order], {order.id: ''}, order.status, created_at=now)
+
                 return {
                     'success': True,
                     'order_id': order.id,
@@ -173,35 +272,88 @@ class Order(models.Model):
         except Exception as e:
             return {'success': False, 'message': f"Failed to create order: {str(e)}"}
 
+    @staticmethod
+    def _failed_line(product_id, name, message):
+        """Describe a cart line that could not be fulfilled."""
+        return {'product_id': product_id, 'name': name, 'message': message}
+
+    @staticmethod
+    def _checkout_failure(failed_items):
+        """Build the failure result for a checkout with unfulfillable lines."""
+        return {
+            'success': False,
+            'message': '; '.join(line['message'] for line in failed_items),
+            'failed_items': failed_items,
+        }
+
+    def can_transition(self, new_status):
+        """Check whether the order may move from its current status to new_status."""
+        return new_status in self.ALLOWED_TRANSITIONS.get(self.status, ())
+
     def update_status(self, new_status):
-        """Update order status."""
+        """
+        Move the order to new_status if its current status allows it.
+        Cancelling restores stock. Returns dict with success and message.
+        """
+        from lib.ECommerce.Transitions import transition_orders
+
+        if new_status not in dict(self.STATUS_CHOICES):
+            return {'success': False, 'message': f"Invalid status: '{new_status}'"}
+        if not self.can_transition(new_status):
+            return {
+                'success': False,
+                'message': f'Cannot change order from {self.status} to {new_status}'
+            }
+
+        result = transition_orders([self.id], new_status)
+        if not result['count']:
+            return {'success': False, 'message': 'Order status was changed by someone else, please reload'}
         self.status = new_status
-        self.save()
-        return {'success': True}
+        return {'success': True, 'message': f'Order status updated to {new_status}'}
 
     def cancel_order(self):
         """Cancel order and restore stock."""
-        if self.status not in ['pending', 'processing']:
+        if not self.can_transition('cancelled'):
             return {'success': False, 'message': 'Cannot cancel order in current status'}
 
         try:
-            with transaction.atomic():
-                # Restore stock for each item
-                for item in self.items.all():
-                    item.product.update_stock(
-                        quantity_change=item.quantity,
-                        transaction_type='cancellation',
-                        reference_id=self.id,
-                        notes=f"Order {self.order_number} cancelled"
-                    )
-
-                self.status = 'cancelled'
-                self.save()
-
-                return {'success': True}
+            return self.update_status('cancelled')
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
+    @classmethod
+    def get_status_counts(cls, customer_id=None, from_rollups=False):
+        """
+        Count orders per status in a single statement.
+        Returns dict mapping every status to its count, plus 'total'.
+        With from_rollups=True the store-wide counts are summed from the
+        incrementally maintained daily order rollups instead of scanning
+        orders; counts scoped to a customer always come from orders.
+        """
+        from django.db.models import Count, Q, Sum
+
+        counts = {status: 0 for status, _ in cls.STATUS_CHOICES}
+
+        if from_rollups and customer_id is None:
+            from lib.ECommerce.Models.Rollup import DailyOrderRollup
+            rows = DailyOrderRollup.objects.order_by().values('status').annotate(
+                count=Sum('order_count')
+            )
+            for row in rows:
+                counts[row['status']] = row['count'] or 0
+            counts['total'] = sum(counts.values())
+            return counts
+
+        queryset = cls.objects.order_by()
+        if customer_id is not None:
+            queryset = queryset.filter(customer_id=customer_id)
+
+        counts.update(queryset.aggregate(
+            total=Count('id'),
+            **{status: Count('id', filter=Q(status=status)) for status in counts}
+        ))
+        return counts
+
     @classmethod
     def get_orders_by_customer(cls, customer_id):
         """Get all orders for a customer."""
@@ -213,36 +365,51 @@ class Order(models.Model):
         return cls.objects.select_related('customer').order_by('-created_at')[:limit]
 
     @classmethod
-    def get_order_stats(cls):
-        """Get order statistics for reports."""
-        from django.db.models import Sum, Count, Avg
+    def get_order_stats(cls, cached=False):
+        """
+        Get order statistics for reports.
+        Computed from a single grouped pass over orders. With cached=True the
+        result is served from the 'orders' cache namespace, which is
+        invalidated whenever an order is written.
+        """
+        if cached:
+            from lib.ECommerce.Cache import get_or_compute
+            return get_or_compute('orders', ('order_stats',), cls._compute_order_stats)
+        return cls._compute_order_stats()
 
-        all_orders = cls.objects.all()
+    @classmethod
+    def _compute_order_stats(cls):
+        """Aggregate count and revenue per status in one query."""
+        from django.db.models import Sum, Count
+
+        rows = {
+            row['status']: row
+            for row in cls.objects.order_by().values('status').annotate(
+                count=Count('id'),
+                revenue=Sum('total')
+            )
+        }
 
-        # Total revenue (exclude cancelled)
-        total_revenue = cls.objects.exclude(status='cancelled').aggregate(
-            total=Sum('total')
-        )['total'] or 0
+        # Total revenue and average order value (exclude cancelled)
+        billable = [row for status, row in rows.items() if status != 'cancelled']
+        total_revenue = sum((row['revenue'] or 0 for row in billable), 0)
+        billable_count = sum(row['count'] for row in billable)
+        avg_order = total_revenue / billable_count if billable_count else 0
 
         # Total orders (exclude delivered, cancelled, refunded for "active" count)
-        total_orders = cls.objects.exclude(
-            status__in=['delivered', 'cancelled', 'refunded']
-        ).count()
-
-        # Average order value
-        avg_order = cls.objects.exclude(status='cancelled').aggregate(
-            avg=Avg('total')
-        )['avg'] or 0
+        total_orders = sum(
+            row['count'] for status, row in rows.items()
+            if status not in ['delivered', 'cancelled', 'refunded']
+        )
 
         # Orders by status
         by_status = {}
         for status, _ in cls.STATUS_CHOICES:
-            count = cls.objects.filter(status=status).count()
-            if count > 0:
-                revenue = cls.objects.filter(status=status).aggregate(
-                    total=Sum('total')
-                )['total'] or 0
-                by_status[status] = {'count': count, 'revenue': revenue}
+            if status in rows:
+                by_status[status] = {
+                    'count': rows[status]['count'],
+                    'revenue': rows[status]['revenue'] or 0,
+                }
 
         return {
             'total_revenue': total_revenue,
@@ -270,6 +437,7 @@ class OrderItem(models.Model):
     )
     product_name = models.CharField(max_length=255)
     product_sku = models.CharField(max_length=50)
+    product_category = models.CharField(max_length=50, blank=True, default='')
     quantity = models.IntegerField()
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -287,6 +455,8 @@ class InventoryTransaction(models.Model):
     """
     Inventory transaction model for tracking stock changes.
     Mirrors the Perl inventory_transactions table structure.
+    Rows are append-only and written in bulk through
+    lib.ECommerce.Inventory.ledger_writer().
     """
 
     TRANSACTION_TYPES = [
@@ -313,6 +483,46 @@ class InventoryTransaction(models.Model):
         verbose_name = 'Inventory Transaction'
         verbose_name_plural = 'Inventory Transactions'
         ordering = ['-created_at']
+        indexes = [
+            # Per-product history in ledger order, as read by get_running_balance
+            models.Index(fields=['product', 'created_at', 'id'], name='inv_txn_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type}: {self.product.name} ({self.quantity_change:+d})"
+
+    @classmethod
+    def get_running_balance(cls, product_id, limit=50):
+        """
+        Get a product's most recent ledger rows, newest first, each annotated
+        with balance_after: the stock level right after that change.
+        Balances are worked back from the current stock level by a window
+        sum over the later changes, so history from before the ledger was
+        kept does not matter. Runs as one query on the product/time index.
+        """
+        from django.db.models import F, Sum, Window
+        from django.db.models.expressions import RowRange
+
+        # Changes from the newest row up to and including this one
+        changes_since = Window(
+            Sum('quantity_change'),
+            order_by=[F('created_at').desc(), F('id').desc()],
+            frame=RowRange(start=None, end=0)
+        )
+        return cls.objects.filter(product_id=product_id).annotate(
+            balance_after=F('product__stock_quantity') - changes_since + F('quantity_change')
+        ).order_by('-created_at', '-id')[:limit]
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_order_caches(sender, **kwargs):
+    """Drop cached order aggregates whenever an order is written."""
+    from lib.ECommerce.Cache import bump_namespace
+    bump_namespace('orders')
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """Take a deleted order out of the daily sales rollups."""
+    from lib.ECommerce.Rollups import record_orders
+    record_orders([instance], sign=-1)
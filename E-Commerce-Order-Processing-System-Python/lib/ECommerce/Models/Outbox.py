@@ -0,0 +1,53 @@
+"""
+ShopPy - Order Outbox Models
+Transactional outbox of order status changes and the consumers reading it.
+Written and read by lib.ECommerce.Outbox.
+"""
+
+from django.db import models
+from django.utils import timezone
+
+
+class OrderEvent(models.Model):
+    """
+    One order entering a status, written in the same transaction as the
+    change itself. from_status is blank for a newly placed order. Events
+    are kept after the order is deleted, so the order is referenced
+    without a database constraint.
+    """
+
+    order = models.ForeignKey(
+        'Order',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='events'
+    )
+    customer_id = models.BigIntegerField()
+    from_status = models.CharField(max_length=20, blank=True, default='')
+    to_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'order_events'
+        verbose_name = 'Order Event'
+        verbose_name_plural = 'Order Events'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status or 'new'} -> {self.to_status}"
+
+
+class OutboxCursor(models.Model):
+    """How far a named consumer has processed the order events."""
+
+    consumer = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'outbox_cursors'
+        verbose_name = 'Outbox Cursor'
+        verbose_name_plural = 'Outbox Cursors'
+
+    def __str__(self):
+        return f"{self.consumer}: {self.last_event_id}"
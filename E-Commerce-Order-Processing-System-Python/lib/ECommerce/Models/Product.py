@@ -6,6 +6,8 @@ Equivalent to Perl ECommerce::Models::Product
 
 from django.db import models
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 
 class Product(models.Model):
@@ -27,6 +29,9 @@ class Product(models.Model):
         ('Other', 'Other'),
     ]
 
+    # Retries for set_stock when a concurrent writer changes stock mid-swap
+    STOCK_CAS_ATTEMPTS = 5
+
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, default='')
     sku = models.CharField(max_length=50, unique=True)
@@ -45,6 +50,18 @@ class Product(models.Model):
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['name']
+        indexes = [
+            # Customer catalog: active products in id order
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='products_active_idx'),
+            # Dashboard low-stock count, covering both compared columns
+            models.Index(
+                fields=['stock_quantity', 'reorder_level'],
+                condition=models.Q(is_active=True),
+                name='products_active_stock_idx'
+            ),
+            models.Index(fields=['category', 'id'], name='products_category_idx'),
+            models.Index(fields=['stock_quantity'], name='products_stock_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -75,27 +92,115 @@ class Product(models.Model):
             return 'low_stock'
         return 'in_stock'
 
-    def update_stock(self, quantity_change, transaction_type, reference_id=None, notes=''):
+    def update_stock(self, quantity_change, transaction_type, reference_id=None, notes='', skip_locked=False):
         """
         Update product stock and record transaction.
         Positive quantity_change increases stock, negative decreases.
+        Returns False if the change would take stock below zero, or with
+        skip_locked if another transaction is changing the product.
         """
-        from lib.ECommerce.Models.Order import InventoryTransaction
-
-        self.stock_quantity += quantity_change
-        self.save()
-
-        # Record the transaction
-        InventoryTransaction.objects.create(
-            product=self,
-            quantity_change=quantity_change,
-            transaction_type=transaction_type,
-            reference_id=reference_id,
-            notes=notes
+        new_quantity = Product.apply_stock_change(
+            self.id, quantity_change, transaction_type, reference_id, notes, skip_locked=skip_locked
         )
+        if new_quantity is None:
+            return False
 
+        self.stock_quantity = new_quantity
         return True
 
+    @classmethod
+    def apply_stock_change(cls, product_id, quantity_change, transaction_type, reference_id=None, notes='',
+                           skip_locked=False):
+        """
+        Atomically apply a relative stock change and record the transaction.
+        Runs a single conditional UPDATE, so concurrent writers never overwrite
+        each other and a decrease never takes stock below zero. The ledger row is buffered
+        with any other changes in the same ledger_writer() block.
+        With skip_locked, on databases with row locks (PostgreSQL), a product
+        another transaction is changing is left alone instead of waited for.
+        Returns the new stock quantity, or None if there was not enough stock
+        for a decrease, the product is missing or the row was skipped.
+        """
+        from lib.ECommerce.Cache import bump_namespace
+        from lib.ECommerce.Inventory import ledger_writer
+
+        with ledger_writer() as ledger:
+            if skip_locked and not cls.lock_for_update([product_id], skip_locked=True):
+                return None
+
+            rows = cls.objects.filter(id=product_id)
+            if quantity_change < 0:
+                # Only decreases are guarded, so a restock always applies,
+                # even to a product whose stock is already below zero
+                rows = rows.filter(stock_quantity__gte=-quantity_change)
+            updated = rows.update(
+                stock_quantity=models.F('stock_quantity') + quantity_change,
+                updated_at=timezone.now()
+            )
+            if not updated:
+                return None
+
+            # Queryset updates bypass the post_save hook
+            bump_namespace('products')
+
+            ledger.add(product_id, quantity_change, transaction_type, reference_id, notes)
+
+            return cls.objects.filter(id=product_id).values_list('stock_quantity', flat=True).get()
+
+    @classmethod
+    def lock_for_update(cls, product_ids, skip_locked=False):
+        """
+        Lock products for the rest of the transaction, in id order so that
+        concurrent lockers cannot deadlock. With skip_locked, products another
+        transaction holds are left out instead of waited for. A no-op on
+        databases without row locks (SQLite, which locks the whole database
+        for writing instead).
+        Returns the set of ids locked.
+        """
+        from django.db import connection
+
+        product_ids = set(product_ids)
+        if not connection.features.has_select_for_update:
+            return product_ids
+        skip_locked = skip_locked and connection.features.has_select_for_update_skip_locked
+        return set(
+            cls.objects.select_for_update(skip_locked=skip_locked)
+            .filter(id__in=product_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    @classmethod
+    def set_stock(cls, product_id, quantity, transaction_type='adjustment', reference_id=None, notes=''):
+        """
+        Atomically set stock to an absolute quantity and record the difference.
+        Uses compare-and-swap on the current quantity, retrying if another
+        writer changed it in between.
+        Returns the previous stock quantity, or None if the product is missing
+        or the stock kept changing.
+        """
+        from lib.ECommerce.Cache import bump_namespace
+        from lib.ECommerce.Inventory import ledger_writer
+
+        for _ in range(cls.STOCK_CAS_ATTEMPTS):
+            current = cls.objects.filter(id=product_id).values_list('stock_quantity', flat=True).first()
+            if current is None:
+                return None
+
+            with ledger_writer() as ledger:
+                swapped = cls.objects.filter(
+                    id=product_id,
+                    stock_quantity=current
+                ).update(stock_quantity=quantity, updated_at=timezone.now())
+                if not swapped:
+                    continue
+
+                bump_namespace('products')
+                ledger.add(product_id, quantity - current, transaction_type, reference_id, notes)
+                return current
+
+        return None
+
     @classmethod
     def get_active_products(cls):
         """Get all active products."""
@@ -111,16 +216,16 @@ class Product(models.Model):
 
     @classmethod
     def search_products(cls, search_term, active_only=True):
-        """Search products by name, SKU, or description."""
-        from django.db.models import Q
+        """
+        Search products by name, SKU, description, or category.
+        Uses the full-text index when available, most relevant first for a
+        selective search.
+        """
+        from lib.ECommerce.Search import search_products
         queryset = cls.objects.all()
         if active_only:
             queryset = queryset.filter(is_active=True)
-        return queryset.filter(
-            Q(name__icontains=search_term) |
-            Q(sku__icontains=search_term) |
-            Q(description__icontains=search_term)
-        ).order_by('id')
+        return search_products(queryset, search_term)
 
     @classmethod
     def get_products_by_category(cls, category, active_only=True):
@@ -134,3 +239,15 @@ class Product(models.Model):
     def get_categories(cls):
         """Get list of all category choices."""
         return [cat[0] for cat in cls.CATEGORY_CHOICES]
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_caches(sender, **kwargs):
+    """
+    Drop cached product aggregates whenever a product is written, and the
+    customer catalog too. Stock changes go through queryset updates and
+    bump only 'products', so a sale leaves the catalog cached.
+    """
+    from lib.ECommerce.Cache import bump_namespace
+    bump_namespace('products')
+    bump_namespace('catalog')
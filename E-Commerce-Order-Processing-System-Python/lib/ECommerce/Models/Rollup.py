@@ -0,0 +1,63 @@
+"""
+ShopPy - Sales Rollup Models
+Pre-aggregated daily sales figures that power the reports page.
+Maintained incrementally by lib.ECommerce.Rollups.
+"""
+
+from django.db import models
+
+
+class DailyOrderRollup(models.Model):
+    """
+    Order count and revenue per day and order status.
+    Revenue is the sum of order totals (including tax and shipping).
+    """
+
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'daily_order_rollups'
+        verbose_name = 'Daily Order Rollup'
+        verbose_name_plural = 'Daily Order Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='daily_order_rollup_key'),
+        ]
+        indexes = [
+            # Store-wide order counts per status, read from the index alone
+            models.Index(fields=['status', 'order_count'], name='daily_order_rollup_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.order_count}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Units sold and item revenue per day, order status, category and product.
+    Revenue is the sum of order item subtotals.
+    """
+
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    category = models.CharField(max_length=50)
+    product_sku = models.CharField(max_length=50)
+    product_name = models.CharField(max_length=255)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'daily_sales_rollups'
+        verbose_name = 'Daily Sales Rollup'
+        verbose_name_plural = 'Daily Sales Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'category', 'product_sku'],
+                name='daily_sales_rollup_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status} {self.product_sku}: {self.quantity}"
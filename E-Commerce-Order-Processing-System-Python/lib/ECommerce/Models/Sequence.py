@@ -0,0 +1,52 @@
+"""
+ShopPy - Sequence Model
+Named counters for generating collision-free identifiers.
+"""
+
+from django.db import models, transaction, IntegrityError
+
+
+class Sequence(models.Model):
+    """
+    Named monotonic counter stored in the database.
+    Values are handed out in blocks so that each process only touches the
+    table once per block.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'sequences'
+        verbose_name = 'Sequence'
+        verbose_name_plural = 'Sequences'
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+    @classmethod
+    def lease(cls, name, block_size):
+        """
+        Reserve the next block of values for a sequence.
+        Returns (first, limit) where values first..limit-1 belong to the caller.
+        Inside an enclosing transaction the lease commits or rolls back with
+        it, so callers that keep unused values for later must only do so
+        once it has committed (see SequenceOrderNumberGenerator).
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(name=name).update(
+                next_value=models.F('next_value') + block_size
+            )
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, next_value=1 + block_size)
+                except IntegrityError:
+                    # Another process created the sequence first
+                    cls.objects.filter(name=name).update(
+                        next_value=models.F('next_value') + block_size
+                    )
+
+            limit = cls.objects.filter(name=name).values_list('next_value', flat=True).get()
+
+        return limit - block_size, limit
@@ -6,5 +6,11 @@ from lib.ECommerce.Models.User import User
 from lib.ECommerce.Models.Customer import Customer
 from lib.ECommerce.Models.Product import Product
 from lib.ECommerce.Models.Order import Order, OrderItem, InventoryTransaction
+from lib.ECommerce.Models.Sequence import Sequence
+from lib.ECommerce.Models.Rollup import DailyOrderRollup, DailySalesRollup
+from lib.ECommerce.Models.Cart import CartItem
+from lib.ECommerce.Models.Inventory import InventorySnapshot
+from lib.ECommerce.Models.Outbox import OrderEvent, OutboxCursor
 
-__all__ = ['User', 'Customer', 'Product', 'Order', 'OrderItem', 'InventoryTransaction']
+__all__ = ['User', 'Customer', 'Product', 'Order', 'OrderItem', 'InventoryTransaction', 'Sequence',
+           'DailyOrderRollup', 'DailySalesRollup', 'CartItem', 'InventorySnapshot', 'OrderEvent', 'OutboxCursor']
@@ -0,0 +1,101 @@
+"""
+ShopPy - Order Number Generators
+Pluggable strategies for generating unique order numbers.
+The active generator is selected with the ORDER_NUMBER_GENERATOR setting.
+"""
+
+import os
+import random
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class OrderNumberGenerator:
+    """Base class for order number generators."""
+
+    prefix = 'ORD'
+
+    def next(self):
+        """Return a new order number."""
+        raise NotImplementedError
+
+    def format(self, value):
+        """Format a value as ORD-YYYYMMDD-<value>."""
+        date_str = datetime.now().strftime('%Y%m%d')
+        return f"{self.prefix}-{date_str}-{value}"
+
+
+class RandomOrderNumberGenerator(OrderNumberGenerator):
+    """
+    Legacy generator using a random five-digit suffix.
+    Collisions become likely on busy days; kept for compatibility only.
+    """
+
+    def next(self):
+        return self.format(random.randint(10000, 99999))
+
+
+class SequenceOrderNumberGenerator(OrderNumberGenerator):
+    """
+    Generator backed by a database sequence leased in blocks.
+    Numbers never collide across threads or processes and grow over time,
+    so inserts land at the end of the order_number index.
+    """
+
+    sequence_name = 'order_number'
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or settings.ORDER_NUMBER_BLOCK_SIZE
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = 0
+        self._limit = 0
+
+    def next(self):
+        from django.db import transaction
+        from lib.ECommerce.Models.Sequence import Sequence
+
+        with self._lock:
+            # A forked worker must not reuse the block leased by its parent
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._limit = 0
+
+            if self._next < self._limit:
+                value = self._next
+                self._next += 1
+                return self.format(f"{value:010d}")
+
+            value, limit = Sequence.lease(self.sequence_name, self.block_size)
+            if transaction.get_connection().in_atomic_block:
+                # The lease rolls back with the caller's transaction, and
+                # another process would then lease the same block again, so
+                # only keep the rest of it once the transaction has committed
+                transaction.on_commit(lambda: self._keep(value + 1, limit, os.getpid()))
+            else:
+                self._next, self._limit = value + 1, limit
+
+        return self.format(f"{value:010d}")
+
+    def _keep(self, first, limit, pid):
+        """Use first..limit-1 for the next numbers, unless a newer block is in use."""
+        with self._lock:
+            if self._pid == pid and self._next >= self._limit:
+                self._next, self._limit = first, limit
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_order_number_generator():
+    """Return the configured order number generator (created once per process)."""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = import_string(settings.ORDER_NUMBER_GENERATOR)()
+    return _generator
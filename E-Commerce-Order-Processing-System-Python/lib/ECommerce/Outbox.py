@@ -0,0 +1,143 @@
+"""
+ShopPy - Order Outbox
+Order status changes as an append-only event stream.
+
+Placing an order and every status change write an order_events row in the
+same transaction as the change, so an event exists exactly when the change
+committed. Consumers read the stream from their own cursor with consume(),
+which hands over events in id order and moves the cursor in the same
+transaction as the handler's database work. Nothing has to poll or rescan
+the orders table to find out what changed.
+
+Consumers are registered with @consumer('name') and run by
+`manage.py process_outbox`. The built-in 'notifications' consumer sends
+the order_status_changed signal for each event, so emails or webhooks can
+hook in without slowing down checkout or the admin.
+"""
+
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Events handed to a consumer per transaction
+OUTBOX_BATCH_SIZE = 500
+
+# Events younger than this, and any after them, wait for the next pass,
+# so a transaction still in flight cannot commit an event behind a
+# consumer's cursor
+OUTBOX_SETTLE_SECONDS = 5
+
+# Sent by the 'notifications' consumer with event=<OrderEvent>
+order_status_changed = Signal()
+
+# Registered consumers by name
+CONSUMERS = {}
+
+
+def consumer(name):
+    """Register handler(events) as the outbox consumer called name."""
+    def register(handler):
+        CONSUMERS[name] = handler
+        return handler
+    return register
+
+
+def record_transitions(orders, old_statuses, new_status, created_at=None):
+    """
+    Write one event per order moving to new_status.
+    old_statuses maps order id to the previous status ('' for a new order).
+    Must run inside the transaction that makes the change.
+    """
+    from lib.ECommerce.Models.Outbox import OrderEvent
+
+    created_at = created_at or timezone.now()
+    OrderEvent.objects.bulk_create([
+        OrderEvent(
+            order_id=order.id,
+            customer_id=order.customer_id,
+            from_status=old_statuses[order.id],
+            to_status=new_status,
+            created_at=created_at
+        )
+        for order in orders
+    ], batch_size=OUTBOX_BATCH_SIZE)
+
+
+def consume(name, handler, batch_size=OUTBOX_BATCH_SIZE, settle_seconds=OUTBOX_SETTLE_SECONDS, limit=None):
+    """
+    Pass the events after a consumer's cursor to handler(events) in batches.
+    A batch ends before the first event younger than settle_seconds, which
+    waits for a later call together with everything after it.
+    Each batch commits together with the cursor move; if the handler raises,
+    the batch is rolled back and offered again on the next call. When
+    another worker is already running the same consumer (PostgreSQL), its
+    locked cursor is skipped and this call returns straight away.
+    Returns the number of events processed.
+    """
+    from lib.ECommerce.Models.Outbox import OrderEvent, OutboxCursor
+
+    OutboxCursor.objects.get_or_create(consumer=name)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    processed = 0
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    while limit is None or processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        with transaction.atomic():
+            cursor = OutboxCursor.objects.select_for_update(skip_locked=skip_locked).filter(
+                consumer=name
+            ).first()
+            if cursor is None:
+                break
+            events = list(
+                OrderEvent.objects.filter(id__gt=cursor.last_event_id).order_by('id')[:size]
+            )
+            # Stop at the first unsettled event rather than moving the cursor past it
+            settled = next(
+                (index for index, event in enumerate(events) if event.created_at > cutoff), len(events)
+            )
+            events = events[:settled]
+            if not events:
+                break
+            handler(events)
+            cursor.last_event_id = events[-1].id
+            cursor.save(update_fields=['last_event_id', 'updated_at'])
+        processed += len(events)
+    return processed
+
+
+def get_backlog():
+    """
+    Events waiting for each registered consumer.
+    Returns dict mapping consumer name to the number of unprocessed events.
+    """
+    from lib.ECommerce.Models.Outbox import OrderEvent, OutboxCursor
+
+    cursors = dict(OutboxCursor.objects.values_list('consumer', 'last_event_id'))
+    return {
+        name: OrderEvent.objects.filter(id__gt=cursors.get(name, 0)).count()
+        for name in CONSUMERS
+    }
+
+
+def prune_events():
+    """
+    Delete events every registered consumer has processed.
+    Returns the number of events deleted.
+    """
+    from lib.ECommerce.Models.Outbox import OrderEvent, OutboxCursor
+
+    cursors = dict(OutboxCursor.objects.filter(consumer__in=list(CONSUMERS)).values_list(
+        'consumer', 'last_event_id'
+    ))
+    low_water = min((cursors.get(name, 0) for name in CONSUMERS), default=0)
+    deleted, _ = OrderEvent.objects.filter(id__lte=low_water).delete()
+    return deleted
+
+
+@consumer('notifications')
+def send_notifications(events):
+    """Send order_status_changed for each event."""
+    for event in events:
+        order_status_changed.send(sender=event.__class__, event=event)
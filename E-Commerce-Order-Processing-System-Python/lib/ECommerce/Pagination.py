@@ -0,0 +1,182 @@
+"""
+ShopPy - Keyset Pagination
+Cursor-based pagination that costs the same on every page.
+
+Instead of OFFSET, each page is fetched by filtering on the sort key of
+the last (or first) row of the neighbouring page, so deep pages use the
+same index range scan as the first one. Cursors are opaque URL-safe
+tokens. Numbered page jumps are still supported through an OFFSET
+fallback, and total counts are optional.
+"""
+
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Sort keys that identify a row on their own; any other ordering gets the
+# primary key as a tie-breaker. search_rowid is the product id as read from
+# the full-text index (see Search.py).
+UNIQUE_KEYS = ('id', 'pk', 'search_rowid')
+
+
+class CursorEncoder(json.JSONEncoder):
+    """JSON encoder that keeps full precision for sort key values."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token cannot be decoded."""
+
+
+class KeysetPage:
+    """One page of results with cursors to its neighbours."""
+
+    def __init__(self, object_list, number, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.number = number
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by its sort key.
+    The ordering defaults to the queryset's order_by and always ends with
+    a unique key, the primary key unless it has one, so every row has a
+    unique position. Callers that
+    already know the row count can pass it as total to skip the COUNT.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, count_timeout=60, total=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_timeout = count_timeout
+        self.total = total
+
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(name.lstrip('-') in UNIQUE_KEYS for name in ordering):
+            ordering.append('-id' if ordering and ordering[0].startswith('-') else 'id')
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    def page(self, cursor=None, number=1):
+        """
+        Return a page. With a cursor the page is fetched by key; otherwise
+        page `number` is fetched with OFFSET. An invalid cursor falls back
+        to the numbered page.
+        """
+        number = max(int(number or 1), 1)
+        if cursor:
+            try:
+                direction, values = self._decode(cursor)
+            except InvalidCursor:
+                pass
+            else:
+                if direction == 'previous':
+                    return self._page_before(values, number)
+                return self._page_after(values, number)
+
+        offset = (number - 1) * self.per_page
+        rows = list(self._ordered(reverse=False)[offset:offset + self.per_page + 1])
+        return self._build(rows[:self.per_page], number, len(rows) > self.per_page, number > 1)
+
+    def count(self, cached=True):
+        """
+        Total number of rows. With cached=True the count is cached briefly in
+        the model's cache namespace, so listing pages do not pay a full
+        COUNT(*) on every request.
+        """
+        if self.total is not None:
+            return self.total
+        if not cached:
+            return self.queryset.count()
+
+        from lib.ECommerce.Cache import get_or_compute
+        sql = str(self.queryset.order_by().query)
+        digest = hashlib.md5(sql.encode('utf-8')).hexdigest()
+        return get_or_compute(
+            self.queryset.model._meta.db_table,
+            ('count', digest),
+            self.queryset.count,
+            self.count_timeout
+        )
+
+    def num_pages(self, cached=True):
+        """Total number of pages (at least 1)."""
+        return max((self.count(cached) + self.per_page - 1) // self.per_page, 1)
+
+    def _page_after(self, values, number):
+        rows = list(self._ordered(reverse=False).filter(self._seek(values, reverse=False))[:self.per_page + 1])
+        return self._build(rows[:self.per_page], number, len(rows) > self.per_page, True)
+
+    def _page_before(self, values, number):
+        rows = list(self._ordered(reverse=True).filter(self._seek(values, reverse=True))[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        return self._build(list(reversed(rows[:self.per_page])), number, True, has_previous)
+
+    def _build(self, rows, number, has_next, has_previous):
+        next_cursor = self._encode('next', rows[-1]) if rows and has_next else None
+        previous_cursor = self._encode('previous', rows[0]) if rows and has_previous else None
+        return KeysetPage(rows, number, has_next, has_previous, next_cursor, previous_cursor)
+
+    def _ordered(self, reverse):
+        order_by = [
+            ('-' if descending != reverse else '') + name
+            for name, descending in self.ordering
+        ]
+        return self.queryset.order_by(*order_by)
+
+    def _seek(self, values, reverse):
+        """Build the filter selecting rows strictly after the key `values`."""
+        condition = Q()
+        equal_so_far = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+    def _encode(self, direction, row):
+        values = [getattr(row, name) for name, _ in self.ordering]
+        payload = json.dumps([direction, values], cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if direction not in ('next', 'previous') or len(raw_values) != len(self.ordering):
+                raise InvalidCursor(cursor)
+            values = [
+                self._to_python(name, value)
+                for (name, _), value in zip(self.ordering, raw_values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank are plain JSON numbers
+            return value
+        return field.to_python(value)
@@ -0,0 +1,161 @@
+"""
+ShopPy - Read Replica Routing
+Sends the reads of read-only pages to a replica database.
+
+Views decorated with @replica_reads run their ORM reads against the
+replica alias, so report aggregations and catalog listings do not compete
+with checkout writes on the primary. Everything else stays on the primary:
+writes, reads made inside a transaction, users, sessions and other
+framework tables, data that must always be current (carts, sequences,
+outbox cursors) and every page outside the decorator.
+
+Read-your-writes: after any successful POST the browser gets a short-lived
+cookie, and decorated views read from the primary while it is present, so
+a customer who has just placed an order or an admin who has just saved a
+product never sees the replica's older copy.
+
+Without DATABASE_REPLICA configured the router and the decorator do nothing.
+sync_replica() copies the SQLite primary to the replica file; run it
+periodically with `manage.py sync_replica --loop`.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Cookie marking a browser that wrote recently and must read from the primary
+PIN_COOKIE = 'shoppy_primary'
+
+# Models that are always read from the primary, besides AUTH_USER_MODEL
+PRIMARY_ONLY_MODELS = {'ECommerce.CartItem', 'ECommerce.Sequence', 'ECommerce.OutboxCursor'}
+
+_state = threading.local()
+
+
+def replica_configured():
+    """Check whether a replica database is configured."""
+    return settings.DATABASE_REPLICA_ALIAS in settings.DATABASES
+
+
+def reading_from_replica():
+    """Check whether reads on this thread currently go to the replica."""
+    return getattr(_state, 'active', False)
+
+
+@contextmanager
+def use_replica():
+    """Send the ORM reads made inside the block to the replica, if there is one."""
+    previous = reading_from_replica()
+    _state.active = replica_configured()
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def replica_reads(view_func):
+    """
+    Decorator for read-only views: run GET requests against the replica
+    unless the browser wrote recently.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or PIN_COOKIE in request.COOKIES:
+            return view_func(request, *args, **kwargs)
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Routes reads inside use_replica() to the replica and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if not reading_from_replica() or model._meta.app_label != 'ECommerce':
+            return DEFAULT_DB_ALIAS
+        if model._meta.label in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        # Logins right after a password change or sign-up must not see a
+        # lagging copy of the user
+        if model._meta.label == settings.AUTH_USER_MODEL:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return settings.DATABASE_REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Objects read from the replica are saved to the primary too
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """Pin a browser to the primary for DATABASE_REPLICA_LAG seconds after it writes."""
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_LAG,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+def sync_replica():
+    """
+    Copy the primary SQLite database to the replica file.
+    The copy is taken with SQLite's online backup, so writers are not
+    blocked, and swapped in atomically: connections already open keep
+    reading the previous copy, new ones open the new one.
+    Returns the replica path.
+    """
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ValueError('sync_replica copies SQLite databases; use the database server\'s own replication')
+    if not replica_configured():
+        raise ValueError('No replica configured; set DATABASE_REPLICA')
+
+    target = Path(settings.DATABASE_REPLICA).resolve()
+    fd, temp_path = tempfile.mkstemp(prefix='.replica-', suffix='.db', dir=target.parent)
+    os.close(fd)
+    try:
+        shutil.copymode(primary.settings_dict['NAME'], temp_path)
+        source = sqlite3.connect(str(primary.settings_dict['NAME']))
+        copy = sqlite3.connect(temp_path)
+        try:
+            source.backup(copy)
+            # Replicas are opened read-only and must not need a -wal file
+            copy.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            copy.close()
+            source.close()
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return target
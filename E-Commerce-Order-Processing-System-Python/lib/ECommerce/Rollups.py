@@ -0,0 +1,191 @@
+"""
+ShopPy - Sales Rollups
+Keeps the daily rollup tables in step with orders.
+
+Each order contributes to the rollup row of its creation day and current
+status. Creating an order adds it, a status change moves it from the old
+status to the new one, and deleting it removes it. All changes are applied
+as INSERT ... ON CONFLICT DO UPDATE increments, which SQLite and
+PostgreSQL both support.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from lib.ECommerce.Cache import bump_namespace
+from lib.ECommerce.Models.Order import Order, OrderItem
+from lib.ECommerce.Models.Rollup import DailyOrderRollup, DailySalesRollup
+
+
+def record_orders(orders, sign=1, status=None, items=None):
+    """
+    Add (sign=1) or remove (sign=-1) orders from the rollups.
+    status overrides the status the orders are counted under. items may be
+    passed when the caller already holds the order items, saving a query.
+    """
+    entries = [(order, status or order.status, sign) for order in orders]
+    _apply(entries, items)
+
+
+def record_status_change(orders, old_statuses, new_status, items=None):
+    """
+    Move orders from their previous status to new_status.
+    old_statuses maps order id to the status before the change. items may
+    be passed when the caller already holds the order items.
+    """
+    entries = []
+    for order in orders:
+        old_status = old_statuses[order.id]
+        if old_status != new_status:
+            entries.append((order, old_status, -1))
+            entries.append((order, new_status, 1))
+    _apply(entries, items)
+
+
+def day_range(date_from, date_to):
+    """
+    Convert an inclusive day range into aware [start, end) datetimes.
+    Either bound may be None. Filtering created_at on these bounds can use
+    an index, unlike created_at__date lookups.
+    """
+    start = end = None
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to, time.min)) + timedelta(days=1)
+    return start, end
+
+
+def rebuild(date_from=None, date_to=None):
+    """
+    Recompute the rollups from raw orders, optionally for an inclusive day range.
+    Returns the number of (order, sales) rollup rows written.
+    """
+    orders = Order.objects.order_by()
+    items = OrderItem.objects.order_by()
+    order_rollups = DailyOrderRollup.objects.all()
+    sales_rollups = DailySalesRollup.objects.all()
+
+    start, end = day_range(date_from, date_to)
+    if start:
+        orders = orders.filter(created_at__gte=start)
+        items = items.filter(order__created_at__gte=start)
+        order_rollups = order_rollups.filter(day__gte=date_from)
+        sales_rollups = sales_rollups.filter(day__gte=date_from)
+    if end:
+        orders = orders.filter(created_at__lt=end)
+        items = items.filter(order__created_at__lt=end)
+        order_rollups = order_rollups.filter(day__lte=date_to)
+        sales_rollups = sales_rollups.filter(day__lte=date_to)
+
+    order_rows = orders.annotate(day=TruncDate('created_at')).values('day', 'status').annotate(
+        order_count=Count('id'),
+        revenue=Sum('total')
+    )
+    sales_rows = items.annotate(day=TruncDate('order__created_at')).values(
+        'day', 'order__status', 'product_category', 'product_sku'
+    ).annotate(
+        product_name=Max('product_name'),
+        quantity=Sum('quantity'),
+        revenue=Sum('subtotal')
+    )
+
+    with transaction.atomic():
+        order_rollups.delete()
+        sales_rollups.delete()
+
+        created_orders = DailyOrderRollup.objects.bulk_create(
+            (DailyOrderRollup(**row) for row in order_rows.iterator()),
+            batch_size=1000
+        )
+        created_sales = DailySalesRollup.objects.bulk_create(
+            (
+                DailySalesRollup(
+                    day=row['day'],
+                    status=row['order__status'],
+                    category=row['product_category'],
+                    product_sku=row['product_sku'],
+                    product_name=row['product_name'],
+                    quantity=row['quantity'],
+                    revenue=row['revenue'],
+                )
+                for row in sales_rows.iterator()
+            ),
+            batch_size=1000
+        )
+
+    # Reports are cached under the orders namespace
+    bump_namespace('orders')
+
+    return len(created_orders), len(created_sales)
+
+
+def _apply(entries, items=None):
+    """Apply (order, status, sign) entries to both rollup tables."""
+    if not entries:
+        return
+
+    if items is None:
+        order_ids = {order.id for order, _, _ in entries}
+        items = OrderItem.objects.filter(order_id__in=order_ids).only(
+            'order_id', 'product_category', 'product_sku', 'product_name', 'quantity', 'subtotal'
+        )
+
+    items_by_order = defaultdict(list)
+    for item in items:
+        items_by_order[item.order_id].append(item)
+
+    order_deltas = defaultdict(lambda: [0, Decimal('0')])
+    sales_deltas = defaultdict(lambda: [0, Decimal('0'), ''])
+
+    for order, status, sign in entries:
+        day = timezone.localdate(order.created_at)
+
+        delta = order_deltas[(day, status)]
+        delta[0] += sign
+        delta[1] += sign * Decimal(str(order.total))
+
+        for item in items_by_order[order.id]:
+            delta = sales_deltas[(day, status, item.product_category, item.product_sku)]
+            delta[0] += sign * item.quantity
+            delta[1] += sign * Decimal(str(item.subtotal))
+            delta[2] = item.product_name
+
+    ops = connection.ops
+    order_table = DailyOrderRollup._meta.db_table
+    sales_table = DailySalesRollup._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {order_table} (day, status, order_count, revenue) "
+            f"VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT (day, status) DO UPDATE SET "
+            f"order_count = {order_table}.order_count + excluded.order_count, "
+            f"revenue = {order_table}.revenue + excluded.revenue",
+            [
+                (ops.adapt_datefield_value(day), status, count,
+                 ops.adapt_decimalfield_value(revenue, 14, 2))
+                for (day, status), (count, revenue) in order_deltas.items()
+            ]
+        )
+        if sales_deltas:
+            cursor.executemany(
+                f"INSERT INTO {sales_table} "
+                f"(day, status, category, product_sku, product_name, quantity, revenue) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s) "
+                f"ON CONFLICT (day, status, category, product_sku) DO UPDATE SET "
+                f"product_name = excluded.product_name, "
+                f"quantity = {sales_table}.quantity + excluded.quantity, "
+                f"revenue = {sales_table}.revenue + excluded.revenue",
+                [
+                    (ops.adapt_datefield_value(day), status, category, sku, name, quantity,
+                     ops.adapt_decimalfield_value(revenue, 14, 2))
+                    for (day, status, category, sku), (quantity, revenue, name) in sales_deltas.items()
+                ]
+            )
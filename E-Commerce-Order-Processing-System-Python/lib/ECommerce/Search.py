@@ -0,0 +1,107 @@
+"""
+ShopPy - Product Search
+Full-text product search backed by an SQLite FTS5 index.
+
+The products_fts table indexes name, SKU, description and category and is
+kept in sync with the products table by triggers (see migration
+0005_product_search_index). Every search word is matched as a prefix.
+
+bm25 has to score every matching row before the first page can be cut, so
+results are only ranked when the search is selective: every word at least
+SEARCH_MIN_RANK_LENGTH characters and at most SEARCH_RANK_LIMIT matches.
+Short or common terms return the matches in index order instead, which
+FTS5 streams straight into the LIMIT. Either way the index is joined to
+products; Django has no join to a virtual table, hence extra(). On other
+database backends, or if SQLite was built without FTS5, search falls back
+to icontains filters.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_fts'
+
+# bm25 column weights: name, sku, description, category
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+
+# Searches with a shorter word, or with more matches, are not ranked
+SEARCH_MIN_RANK_LENGTH = 3
+SEARCH_RANK_LIMIT = 1000
+
+_fts_enabled = None
+
+
+def fts_enabled():
+    """Return True if the FTS5 product index exists in the database."""
+    global _fts_enabled
+    if _fts_enabled is None:
+        _fts_enabled = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_enabled
+
+
+def build_match_query(search_term):
+    """
+    Turn user input into an FTS5 MATCH expression.
+    Each word becomes a quoted prefix term and all words must match.
+    Returns None if the input contains no searchable words.
+    """
+    words = re.findall(r'\w+', search_term)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def count_matches(match, limit):
+    """Number of index rows matching match, counting no further than limit."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+            [match, limit]
+        )
+        return cursor.fetchone()[0]
+
+
+def search_products(queryset, search_term):
+    """
+    Filter a product queryset by search_term: most relevant first for a
+    selective search, otherwise in id order.
+    """
+    match = build_match_query(search_term) if fts_enabled() else None
+    if match is None:
+        return icontains_search(queryset, search_term)
+
+    table = queryset.model._meta.db_table
+    queryset = queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = {table}.id", f"{FTS_TABLE} MATCH %s"],
+        params=[match],
+    )
+    words = re.findall(r'\w+', search_term)
+    if (min(len(word) for word in words) < SEARCH_MIN_RANK_LENGTH
+            or count_matches(match, SEARCH_RANK_LIMIT + 1) > SEARCH_RANK_LIMIT):
+        # Ordered by the index's own rowid (the product id), so FTS5 hands
+        # over matches in order and stops at the page's LIMIT
+        return queryset.annotate(
+            search_rowid=RawSQL(f"{FTS_TABLE}.rowid", ())
+        ).order_by('search_rowid')
+
+    # At most SEARCH_RANK_LIMIT rows are scored, once each
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    return queryset.annotate(
+        search_rank=RawSQL(f"bm25({FTS_TABLE}, {weights})", ())
+    ).order_by('search_rank', 'id')
+
+
+def icontains_search(queryset, search_term):
+    """Filter by substring on name, SKU and description; the fallback without FTS5."""
+    return queryset.filter(
+        Q(name__icontains=search_term) |
+        Q(sku__icontains=search_term) |
+        Q(description__icontains=search_term)
+    ).order_by('id')
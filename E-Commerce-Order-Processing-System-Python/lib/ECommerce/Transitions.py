@@ -0,0 +1,186 @@
+"""
+ShopPy - Order Status Transitions
+Validated, set-based status changes for one order or thousands.
+
+Orders are moved in batches inside one transaction. Each batch costs the
+same handful of queries however many orders it holds: the eligible orders
+are selected, moved with one UPDATE per current status that only matches
+rows still in that status, and an outbox event is written for each (see
+lib.ECommerce.Outbox). Orders whose current status does not allow the
+move, including any another transaction moved in the meantime, are
+skipped and reported.
+
+Work that has to happen in the same transaction as a move is registered
+with @transition_hook(status). Hooks receive the whole batch, so they can
+stay set-based too: cancelling restores the stock of every affected
+product with a single UPDATE ... CASE and writes the inventory
+transactions in bulk.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+# Orders moved per batch; keeps each IN (...) list well under parameter limits
+TRANSITION_BATCH_SIZE = 1000
+
+# Hooks by target status, run in registration order
+TRANSITION_HOOKS = defaultdict(list)
+
+
+def transition_hook(*statuses):
+    """
+    Register hook(orders, old_statuses, items, ledger) to run for each batch
+    of orders moved into one of statuses, inside the same transaction.
+    orders already carry the new status; old_statuses maps order id to the
+    previous one, and items are the batch's OrderItems.
+    """
+    def register(hook):
+        for status in statuses:
+            TRANSITION_HOOKS[status].append(hook)
+        return hook
+    return register
+
+
+def allowed_sources(new_status):
+    """Statuses an order may be in to move to new_status."""
+    from lib.ECommerce.Models.Order import Order
+
+    return [
+        status for status, targets in Order.ALLOWED_TRANSITIONS.items()
+        if new_status in targets
+    ]
+
+
+def transition_orders(order_ids, new_status, batch_size=TRANSITION_BATCH_SIZE):
+    """
+    Move orders to new_status where their current status allows it.
+    Cancelling restores the stock of every line and records 'cancellation'
+    inventory transactions. Everything runs in one transaction.
+    Returns dict with success, message, count (orders moved) and skipped
+    (ids that were missing or not allowed to move).
+    """
+    from lib.ECommerce.Cache import bump_namespace
+    from lib.ECommerce.Inventory import ledger_writer
+    from lib.ECommerce.Models.Order import Order
+
+    if new_status not in dict(Order.STATUS_CHOICES):
+        return {'success': False, 'message': f"Invalid status: '{new_status}'"}
+
+    order_ids = sorted({int(order_id) for order_id in order_ids})
+    sources = allowed_sources(new_status)
+    moved = []
+
+    with ledger_writer() as ledger:
+        for offset in range(0, len(order_ids), batch_size):
+            batch = order_ids[offset:offset + batch_size]
+            moved.extend(_transition_batch(batch, new_status, sources, ledger))
+
+    if moved:
+        # Queryset updates bypass the Order save hooks
+        bump_namespace('orders')
+
+    moved_ids = {order.id for order in moved}
+    skipped = [order_id for order_id in order_ids if order_id not in moved_ids]
+    message = f'{len(moved)} order(s) updated to {new_status}'
+    if skipped:
+        message += f', {len(skipped)} skipped'
+    return {
+        'success': True,
+        'message': message,
+        'count': len(moved),
+        'skipped': skipped,
+    }
+
+
+def _transition_batch(order_ids, new_status, sources, ledger):
+    """Move one batch of orders. Returns the orders that were moved."""
+    from lib.ECommerce.Models.Order import Order, OrderItem
+    from lib.ECommerce.Outbox import record_transitions
+    from lib.ECommerce.Rollups import record_status_change
+
+    selected = _select_batch(order_ids, sources)
+    if not selected:
+        return []
+
+    # Only rows still in the status they were selected in are moved, so an
+    # order another transaction changed meanwhile (databases without row
+    # locks) is neither moved again nor given hooks or events
+    now = timezone.now()
+    by_status = defaultdict(list)
+    for order in selected:
+        by_status[order.status].append(order)
+    orders = []
+    for old_status, group in by_status.items():
+        ids = [order.id for order in group]
+        updated = Order.objects.filter(id__in=ids, status=old_status).update(status=new_status, updated_at=now)
+        if updated != len(ids):
+            ids = set(Order.objects.filter(id__in=ids, status=new_status, updated_at=now).values_list('id', flat=True))
+        orders.extend(order for order in group if order.id in ids)
+    if not orders:
+        return []
+
+    orders.sort(key=lambda order: order.id)
+    old_statuses = {order.id: order.status for order in orders}
+    for order in orders:
+        order.status = new_status
+        order.updated_at = now
+
+    # Loaded once for the hooks and the rollups
+    items = list(OrderItem.objects.filter(order_id__in=old_statuses).only(
+        'order_id', 'product_id', 'product_category', 'product_sku',
+        'product_name', 'quantity', 'subtotal'
+    ))
+
+    for hook in TRANSITION_HOOKS[new_status]:
+        hook(orders, old_statuses, items, ledger)
+
+    record_status_change(orders, old_statuses, new_status, items=items)
+    record_transitions(orders, old_statuses, new_status, created_at=now)
+    return orders
+
+
+def _select_batch(order_ids, sources):
+    """Select and lock the orders of a batch that may move."""
+    from lib.ECommerce.Models.Order import Order
+
+    return list(
+        Order.objects.select_for_update()
+        .filter(id__in=order_ids, status__in=sources)
+        .only('id', 'order_number', 'customer_id', 'status', 'total', 'created_at')
+        .order_by('id')
+    )
+
+
+@transition_hook('cancelled')
+def restore_stock(orders, old_statuses, items, ledger):
+    """Put cancelled lines back in stock and record 'cancellation' ledger rows."""
+    from lib.ECommerce.Cache import bump_namespace
+    from lib.ECommerce.Models.Product import Product
+
+    now = orders[0].updated_at
+    numbers = {order.id: order.order_number for order in orders}
+    restock = defaultdict(int)
+    for item in items:
+        if item.product_id is None:
+            continue
+        restock[item.product_id] += item.quantity
+        ledger.add(
+            item.product_id, item.quantity, 'cancellation',
+            reference_id=item.order_id,
+            notes=f"Order {numbers[item.order_id]} cancelled",
+            created_at=now
+        )
+    if not restock:
+        return
+
+    Product.objects.filter(id__in=restock).update(
+        stock_quantity=F('stock_quantity') + Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in restock.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        ),
+        updated_at=now
+    )
+    bump_namespace('products')
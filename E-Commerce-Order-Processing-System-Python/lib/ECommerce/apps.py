@@ -13,4 +13,9 @@ class ECommerceConfig(AppConfig):
 
     def ready(self):
         """Initialize the app when Django starts."""
-        pass
+        from django.db.backends.signals import connection_created
+        from lib.ECommerce.Database import apply_database_profile
+        from lib.ECommerce import Cache  # noqa: F401 - registers the shared cache check
+        from lib.ECommerce import Hashers  # noqa: F401 - registers the password hasher checks
+
+        connection_created.connect(apply_database_profile, dispatch_uid='shoppy_database_profile')
@@ -8,16 +8,24 @@ from lib.ECommerce.Config import APP_CONFIG
 
 def cart_context(request):
     """Add cart information to template context."""
-    cart = request.session.get('cart', [])
-    # Count distinct products in cart (not total quantity)
-    cart_count = len(cart)
+    cart = getattr(request, 'cart', None)
+    if cart is None:
+        return {'cart': [], 'cart_count': 0}
 
+    # Count distinct products in cart (not total quantity)
     return {
-        'cart': cart,
-        'cart_count': cart_count,
+        'cart': cart.items(),
+        'cart_count': len(cart),
     }
 
 
+def identity_context(request):
+    """Add the logged-in user's identity to template context without loading the user."""
+    from lib.ECommerce.Identity import get_identity
+
+    return {'shop_identity': get_identity(request)}
+
+
 def app_config(request):
     """Add application configuration to template context."""
     return {
@@ -0,0 +1,3 @@
+"""
+ShopPy - Management Commands Package
+"""
@@ -0,0 +1,129 @@
+"""
+ShopPy - Query Plan Check Command
+Fails if a hot-path view falls back to a full table scan (SQLite only).
+
+Every listed page is requested as an admin and as a customer, each query it
+runs is captured, and EXPLAIN QUERY PLAN is checked for a bare
+"SCAN <table>" on one of the application tables. Everything runs inside a
+transaction that is rolled back, so the database is left untouched.
+
+Usage:
+    python manage.py check_query_plans
+"""
+
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Models.User import User
+
+# Views that must be served from indexes, by role. Free-text search is
+# excluded because LIKE '%term%' cannot use a b-tree index.
+ADMIN_URLS = [
+    '/dashboard/',
+    '/dashboard/?page=2',
+    '/products/',
+    '/products/?category=Electronics',
+    '/products/?sort=in_stock',
+    '/products/?sort=low_stock',
+    '/products/?sort=out_of_stock',
+    '/orders/',
+    '/orders/?status=pending',
+    '/orders/?sort=oldest',
+    '/orders/?sort=total_high',
+    '/customers/',
+    '/reports/?period=year',
+    '/api/products/{product_id}/ledger/',
+]
+
+CUSTOMER_URLS = [
+    '/dashboard/',
+    '/products/',
+    '/products/?category=Books',
+    '/orders/',
+    '/orders/?status=pending',
+    '/api/products/?page=2',
+]
+
+CHECKED_TABLES = {
+    'products', 'orders', 'order_items', 'customers', 'inventory_transactions',
+    'daily_order_rollups', 'daily_sales_rollups',
+}
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+BOUNDED = re.compile(r'\bLIMIT \d+(?: OFFSET \d+)?$')
+
+
+class Command(BaseCommand):
+    help = 'Check that hot-path views do not fall back to full table scans.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans only supports SQLite')
+
+        admin = User.objects.filter(role__in=['admin', 'staff'], is_active=True).first()
+        customer = User.objects.filter(
+            role='customer', is_active=True, customer_profile__isnull=False
+        ).first()
+        product_id = Product.objects.order_by('id').values_list('id', flat=True).first()
+        if admin is None or customer is None or product_id is None:
+            raise CommandError('An active admin, an active customer with a profile and a product are required')
+
+        failures = []
+        with transaction.atomic():
+            for user, urls in [(admin, ADMIN_URLS), (customer, CUSTOMER_URLS)]:
+                failures.extend(self._check_user(user, [url.format(product_id=product_id) for url in urls]))
+            transaction.set_rollback(True)
+
+        if failures:
+            for url, table, sql in failures:
+                self.stderr.write(f'{url}: full scan of {table}\n    {sql}')
+            raise CommandError(f'{len(failures)} query plan(s) fall back to a full table scan')
+
+        self.stdout.write(self.style.SUCCESS('All hot-path queries use indexes'))
+
+    def _check_user(self, user, urls):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.force_login(user)
+
+        failures = []
+        for url in urls:
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code} for {user.username}')
+
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                for table in self._full_scans(sql):
+                    failures.append((f'{user.role} {url}', table, sql))
+        return failures
+
+    @staticmethod
+    def _full_scans(sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+
+        # An unfiltered, limited walk in primary key order reads only LIMIT rows
+        bounded_walk = (
+            ' WHERE ' not in sql
+            and BOUNDED.search(sql)
+            and not any(detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in details)
+        )
+        if bounded_walk:
+            return []
+
+        tables = []
+        for detail in details:
+            match = FULL_SCAN.match(detail)
+            if match and match.group(1) in CHECKED_TABLES:
+                tables.append(match.group(1))
+        return tables
@@ -0,0 +1,72 @@
+"""
+ShopPy - Import Products Command
+Streams a supplier catalog from CSV or JSON Lines and upserts it by SKU.
+
+Columns/keys: sku (required), name, description, category, price, cost,
+stock_quantity, reorder_level, image_url, is_active. New products need at
+least name, category and price; existing products only have the given
+fields changed. Existing products are never deleted.
+
+Usage:
+    python manage.py import_products catalog.csv
+    python manage.py import_products catalog.jsonl --batch-size 5000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.ECommerce.Imports import FEED_FORMATS, FeedError, import_products, read_feed
+
+# Rows between progress lines
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = 'Import products from a CSV or JSONL file, upserting by SKU.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--format', dest='fmt', choices=FEED_FORMATS,
+                            help='Feed format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows written per batch (default: 1000)')
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help='Number of rejected rows to print (default: 100)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        max_errors = options['max_errors']
+        started = time.monotonic()
+        printed = [0]
+        reported = [0]
+
+        def on_error(line_number, message):
+            if printed[0] < max_errors:
+                self.stderr.write(f'Line {line_number}: {message}')
+            printed[0] += 1
+
+        def on_batch(stats):
+            if stats['processed'] // PROGRESS_EVERY == reported[0]:
+                return
+            reported[0] = stats['processed'] // PROGRESS_EVERY
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{stats['processed']:,} rows ({stats['processed'] / elapsed:,.0f}/s): "
+                f"{stats['created']:,} created, {stats['updated']:,} updated, {stats['errors']:,} errors"
+            )
+
+        try:
+            records = read_feed(options['path'], options['fmt'])
+            stats = import_products(records, options['batch_size'], on_error, on_batch)
+        except (FeedError, OSError) as e:
+            raise CommandError(str(e))
+
+        elapsed = time.monotonic() - started
+        rate = stats['processed'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['processed']:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s): "
+            f"{stats['created']:,} created, {stats['updated']:,} updated, {stats['errors']:,} rejected"
+        ))
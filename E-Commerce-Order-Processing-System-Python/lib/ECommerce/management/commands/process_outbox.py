@@ -0,0 +1,77 @@
+"""
+ShopPy - Process Outbox Command
+Runs the order outbox consumers over the events written since their last run.
+
+Each consumer keeps its own cursor in outbox_cursors, so a run only sees
+new order events, and a consumer that fails resumes from its last
+committed batch. With --loop the command keeps polling, for running as a
+worker next to the web server.
+
+Usage:
+    python manage.py process_outbox
+    python manage.py process_outbox --consumer notifications
+    python manage.py process_outbox --loop --interval 2
+    python manage.py process_outbox --prune
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.ECommerce.Outbox import (
+    CONSUMERS, OUTBOX_BATCH_SIZE, OUTBOX_SETTLE_SECONDS, consume, get_backlog, prune_events
+)
+
+
+class Command(BaseCommand):
+    help = 'Feed new order events to the outbox consumers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', action='append', choices=sorted(CONSUMERS),
+                            help='Consumer to run; repeat for several (default: all)')
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE,
+                            help=f'Events per transaction (default: {OUTBOX_BATCH_SIZE})')
+        parser.add_argument('--settle-seconds', type=int, default=OUTBOX_SETTLE_SECONDS,
+                            help=f'Leave events younger than this for the next pass '
+                                 f'(default: {OUTBOX_SETTLE_SECONDS})')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new events until interrupted')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between polls with --loop (default: 5)')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete events every consumer has processed')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['settle_seconds'] < 0:
+            raise CommandError('--settle-seconds cannot be negative')
+
+        names = options['consumer'] or sorted(CONSUMERS)
+        try:
+            while True:
+                for name in names:
+                    started = time.monotonic()
+                    processed = consume(
+                        name, CONSUMERS[name],
+                        batch_size=options['batch_size'],
+                        settle_seconds=options['settle_seconds']
+                    )
+                    if processed or not options['loop']:
+                        self.stdout.write(
+                            f'{name}: {processed:,} event(s) in {time.monotonic() - started:.1f}s'
+                        )
+                if options['prune']:
+                    deleted = prune_events()
+                    if deleted or not options['loop']:
+                        self.stdout.write(f'Pruned {deleted:,} processed event(s)')
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        backlog = get_backlog()
+        self.stdout.write(self.style.SUCCESS(
+            'Backlog: ' + ', '.join(f'{name} {backlog[name]:,}' for name in names)
+        ))
@@ -0,0 +1,43 @@
+"""
+ShopPy - Rebuild Sales Rollup Command
+Backfills or rebuilds the daily sales rollup tables from raw orders.
+
+Usage:
+    python manage.py rebuild_sales_rollup
+    python manage.py rebuild_sales_rollup --from 2025-01-01 --to 2025-12-31
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.ECommerce.Rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups from orders, optionally for a day range.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        date_from = self._parse_date(options['date_from'])
+        date_to = self._parse_date(options['date_to'])
+
+        if date_from and date_to and date_from > date_to:
+            raise CommandError('--from must not be after --to')
+
+        order_rows, sales_rows = rebuild(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {order_rows} order rollup rows and {sales_rows} sales rollup rows'
+        ))
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
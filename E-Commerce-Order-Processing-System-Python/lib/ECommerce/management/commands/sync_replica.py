@@ -0,0 +1,56 @@
+"""
+ShopPy - Sync Replica Command
+Copies the SQLite primary database to the read replica file.
+
+Reads routed to the replica are at most one sync interval behind, so keep
+--interval below DATABASE_REPLICA_LAG (the time a browser stays on the
+primary after writing).
+
+Usage:
+    python manage.py sync_replica
+    python manage.py sync_replica --loop --interval 5
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.ECommerce.Replicas import sync_replica
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary database to the read replica.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep copying until interrupted')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between copies with --loop (default: 5)')
+
+    def handle(self, *args, **options):
+        if options['interval'] <= 0:
+            raise CommandError('--interval must be positive')
+        if options['loop'] and options['interval'] >= settings.DATABASE_REPLICA_LAG:
+            self.stdout.write(self.style.WARNING(
+                f"--interval {options['interval']:g}s is not below DATABASE_REPLICA_LAG "
+                f"({settings.DATABASE_REPLICA_LAG}s); recent writers may read stale data"
+            ))
+
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    path = sync_replica()
+                except ValueError as e:
+                    raise CommandError(str(e))
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Copied {os.path.getsize(path) / 1024 / 1024:,.1f} MB to {path} in {elapsed:.2f}s'
+                )
+                if not options['loop']:
+                    break
+                time.sleep(max(0, options['interval'] - elapsed))
+        except KeyboardInterrupt:
+            pass
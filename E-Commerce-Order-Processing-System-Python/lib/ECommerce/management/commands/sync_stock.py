@@ -0,0 +1,84 @@
+"""
+ShopPy - Sync Stock Command
+Streams a SKU to quantity feed from CSV or JSON Lines and sets stock levels.
+
+Columns/keys: sku and quantity (stock_quantity is accepted too). Every
+changed product gets an 'adjustment' inventory transaction for the
+difference; SKUs that are not in the catalog are reported and skipped.
+
+Usage:
+    python manage.py sync_stock warehouse.csv
+    python manage.py sync_stock warehouse.jsonl --batch-size 5000
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.ECommerce.Imports import FEED_FORMATS, FeedError, get_stock_totals, read_feed, sync_stock
+
+# Rows between progress lines
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = 'Set stock levels from a SKU/quantity CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to sync')
+        parser.add_argument('--format', dest='fmt', choices=FEED_FORMATS,
+                            help='Feed format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows written per batch (default: 1000)')
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help='Number of rejected rows to print (default: 100)')
+        parser.add_argument('--notes', default=None,
+                            help='Note stored on the inventory transactions')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        notes = options['notes'] or f"Stock sync from {os.path.basename(options['path'])}"
+        max_errors = options['max_errors']
+        started = time.monotonic()
+        printed = [0]
+        reported = [0]
+
+        def on_error(line_number, message):
+            if printed[0] < max_errors:
+                self.stderr.write(f'Line {line_number}: {message}')
+            printed[0] += 1
+
+        def on_batch(stats):
+            if stats['processed'] // PROGRESS_EVERY == reported[0]:
+                return
+            reported[0] = stats['processed'] // PROGRESS_EVERY
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{stats['processed']:,} rows ({stats['processed'] / elapsed:,.0f}/s): "
+                f"{stats['updated']:,} updated, {stats['unchanged']:,} unchanged, {stats['errors']:,} errors"
+            )
+
+        try:
+            records = read_feed(options['path'], options['fmt'])
+            stats = sync_stock(records, options['batch_size'], notes, on_error, on_batch)
+        except (FeedError, OSError) as e:
+            raise CommandError(str(e))
+
+        elapsed = time.monotonic() - started
+        rate = stats['processed'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {stats['processed']:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s): "
+            f"{stats['updated']:,} updated, {stats['unchanged']:,} unchanged, {stats['errors']:,} rejected"
+        ))
+        self.stdout.write(
+            f"Units added: {stats['units_added']:,}, units removed: {stats['units_removed']:,}"
+        )
+
+        totals = get_stock_totals()
+        self.stdout.write(
+            f"Catalog: {totals['total_products']:,} products, {totals['total_stock']:,} units in stock, "
+            f"{totals['low_stock']:,} low stock, {totals['out_of_stock']:,} out of stock"
+        )
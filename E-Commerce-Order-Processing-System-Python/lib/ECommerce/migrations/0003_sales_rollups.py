@@ -0,0 +1,81 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ECommerce', '0002_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Daily Order Rollup',
+                'verbose_name_plural': 'Daily Order Rollups',
+                'db_table': 'daily_order_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('category', models.CharField(max_length=50)),
+                ('product_sku', models.CharField(max_length=50)),
+                ('product_name', models.CharField(max_length=255)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Rollup',
+                'verbose_name_plural': 'Daily Sales Rollups',
+                'db_table': 'daily_sales_rollups',
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_category',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'status', 'category', 'product_sku'), name='daily_sales_rollup_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyorderrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'status'), name='daily_order_rollup_key'),
+        ),
+        # Snapshot the category of existing order items, then backfill the
+        # rollups from existing orders (DATE() is valid on SQLite and PostgreSQL)
+        migrations.RunSQL(
+            "UPDATE order_items SET product_category = COALESCE("
+            "(SELECT category FROM products WHERE products.id = order_items.product_id), '')",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            "INSERT INTO daily_order_rollups (day, status, order_count, revenue) "
+            "SELECT DATE(created_at), status, COUNT(*), SUM(total) FROM orders "
+            "GROUP BY DATE(created_at), status",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            "INSERT INTO daily_sales_rollups "
+            "(day, status, category, product_sku, product_name, quantity, revenue) "
+            "SELECT DATE(o.created_at), o.status, i.product_category, i.product_sku, "
+            "MAX(i.product_name), SUM(i.quantity), SUM(i.subtotal) "
+            "FROM order_items i JOIN orders o ON o.id = i.order_id "
+            "GROUP BY DATE(o.created_at), o.status, i.product_category, i.product_sku",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Full-text search index for products (SQLite FTS5 only)
+
+from django.db import migrations, OperationalError
+
+CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE products_fts USING fts5(
+        name, sku, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, sku, description, category)
+        VALUES (new.id, new.name, new.sku, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, sku, description, category)
+        VALUES ('delete', old.id, old.name, old.sku, old.description, old.category);
+    END
+    """,
+    # Only text columns are indexed, so stock and price updates skip the index
+    """
+    CREATE TRIGGER products_fts_update AFTER UPDATE OF name, sku, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, sku, description, category)
+        VALUES ('delete', old.id, old.name, old.sku, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, sku, description, category)
+        VALUES (new.id, new.name, new.sku, new.description, new.category);
+    END
+    """,
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS products_fts_update",
+    "DROP TRIGGER IF EXISTS products_fts_delete",
+    "DROP TRIGGER IF EXISTS products_fts_insert",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.fts5_probe")
+    except OperationalError:
+        # SQLite built without FTS5; search falls back to icontains
+        return
+    for statement in CREATE_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ECommerce', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
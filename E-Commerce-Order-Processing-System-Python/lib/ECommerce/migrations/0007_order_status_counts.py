@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ECommerce', '0006_cart_items'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyorderrollup',
+            index=models.Index(fields=['status', 'order_count'], name='daily_order_rollup_status_idx'),
+        ),
+    ]
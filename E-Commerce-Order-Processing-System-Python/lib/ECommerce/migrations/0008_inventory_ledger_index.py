@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ECommerce', '0007_order_status_counts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventorytransaction',
+            name='inv_txn_product_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['product', 'created_at', 'id'], name='inv_txn_product_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ECommerce', '0008_inventory_ledger_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_snapshot', serialize=False, to='ECommerce.product')),
+                ('balance', models.IntegerField(default=0)),
+                ('last_transaction_id', models.BigIntegerField(default=0)),
+                ('as_of', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Inventory Snapshot',
+                'verbose_name_plural': 'Inventory Snapshots',
+                'db_table': 'inventory_snapshots',
+                'indexes': [models.Index(fields=['last_transaction_id'], name='inv_snapshot_last_txn_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+"""
+ShopPy - Tests
+Run with `python manage.py test lib.ECommerce`.
+
+The SQLite test database is a file (see DATABASES['default']['TEST'] in
+Config.py), so the concurrency tests can share it between threads and
+processes.
+"""
+
+import itertools
+import threading
+
+from django.db import connection
+
+_numbers = itertools.count(1)
+
+
+def make_product(stock=100, price='10.00', **fields):
+    """Create an active product with a unique SKU."""
+    from lib.ECommerce.Models.Product import Product
+
+    number = next(_numbers)
+    fields.setdefault('name', f'Test Product {number}')
+    fields.setdefault('category', 'Other')
+    return Product.objects.create(sku=f'TEST-{number:06d}', price=price, stock_quantity=stock, **fields)
+
+
+def make_customer(**fields):
+    """Create a customer without a user account."""
+    from lib.ECommerce.Models.Customer import Customer
+
+    fields.setdefault('first_name', f'Customer {next(_numbers)}')
+    return Customer.objects.create(**fields)
+
+
+def run_in_threads(target, count):
+    """
+    Run target(index) on `count` threads at once and wait for them.
+    Each thread closes its own database connection when done. Returns the
+    results in thread order; an exception in any thread is re-raised.
+    """
+    results = [None] * count
+    errors = []
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        try:
+            barrier.wait()
+            results[index] = target(index)
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
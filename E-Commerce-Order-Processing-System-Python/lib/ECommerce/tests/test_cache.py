@@ -0,0 +1,76 @@
+"""
+ShopPy - Cache Namespace Tests
+Namespace bumps wait for the writing transaction to commit and reach every
+worker through a shared cache.
+"""
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from lib.ECommerce.Cache import check_shared_cache, namespace_version
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.tests import make_customer, make_product
+
+
+class BumpAfterCommitTests(TestCase):
+
+    def test_stock_change_bumps_products_on_commit(self):
+        product = make_product(stock=10)
+        before = namespace_version('products')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.apply_stock_change(product.id, -1, 'sale')
+            Product.set_stock(product.id, 20)
+            self.assertEqual(namespace_version('products'), before)
+
+        self.assertNotEqual(namespace_version('products'), before)
+
+    def test_checkout_bumps_after_commit(self):
+        product = make_product(stock=10)
+        customer = make_customer()
+        before = {name: namespace_version(name) for name in ('products', 'orders', 'customers')}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = Order.create_from_cart(
+                customer, [{'product_id': product.id, 'quantity': 1, 'name': product.name}],
+                'credit_card', 'Test Street 1'
+            )
+            self.assertTrue(result['success'])
+            self.assertEqual({name: namespace_version(name) for name in before}, before)
+
+        self.assertNotEqual(namespace_version('products'), before['products'])
+        self.assertNotEqual(namespace_version('orders'), before['orders'])
+
+    def test_rolled_back_write_does_not_bump(self):
+        product = make_product(stock=10)
+        before = namespace_version('products')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Product.apply_stock_change(product.id, -1, 'sale')
+                    raise RuntimeError('roll back')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(namespace_version('products'), before)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def caches(self, backend):
+        return {'default': {'BACKEND': f'django.core.cache.backends.{backend}'}}
+
+    def test_locmem_with_one_worker_is_fine(self):
+        with override_settings(WEB_CONCURRENCY=1, CACHES=self.caches('locmem.LocMemCache')):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_locmem_with_several_workers_is_an_error(self):
+        with override_settings(WEB_CONCURRENCY=4, CACHES=self.caches('locmem.LocMemCache')):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['ECommerce.E003'])
+
+    def test_shared_backend_with_several_workers_is_fine(self):
+        with override_settings(WEB_CONCURRENCY=4, CACHES=self.caches('filebased.FileBasedCache')):
+            self.assertEqual(check_shared_cache(None), [])
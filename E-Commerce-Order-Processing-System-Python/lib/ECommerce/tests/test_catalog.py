@@ -0,0 +1,55 @@
+"""
+ShopPy - Customer Catalog Cache Tests
+Sales leave the cached catalog alone; catalog edits invalidate it.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lib.ECommerce.Cache import namespace_version
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Models.User import User
+from lib.ECommerce.tests import make_customer, make_product
+
+
+class CustomerCatalogCacheTests(TestCase):
+
+    def setUp(self):
+        # Rolled-back tests reuse product ids, so drop cards cached by earlier ones
+        cache.clear()
+        user = User.objects.create_user('catalog-customer', 'catalog-customer@shoppy.invalid', role='customer')
+        make_customer(user=user)
+        self.client.force_login(user)
+        self.product = make_product(stock=10, name='Catalog Lamp', category='Home')
+        self.url = reverse('products') + '?category=Home'
+
+    def test_sale_updates_badge_without_invalidating_catalog(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(self.url)
+        catalog_version = namespace_version('catalog')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.apply_stock_change(self.product.id, -7, 'sale')
+        self.assertEqual(namespace_version('catalog'), catalog_version)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Only 3 left!')
+        self.assertContains(response, 'Catalog Lamp')
+        # Session, then the page's products by primary key; no listing query
+        product_queries = [query['sql'] for query in queries.captured_queries if '"products"' in query['sql']]
+        self.assertEqual(len(product_queries), 1)
+        self.assertIn('"products"."id" IN', product_queries[0])
+
+    def test_catalog_edit_invalidates_cards(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(self.url)
+            catalog_version = namespace_version('catalog')
+            self.product.name = 'Catalog Floor Lamp'
+            self.product.save(update_fields=['name'])
+
+        self.assertNotEqual(namespace_version('catalog'), catalog_version)
+        self.assertContains(self.client.get(self.url), 'Catalog Floor Lamp')
@@ -0,0 +1,44 @@
+"""
+ShopPy - Checkout Tests
+Order.create_from_cart only sells what is active and in stock.
+"""
+
+from django.test import TestCase
+
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.tests import make_customer, make_product
+
+
+class CreateFromCartTests(TestCase):
+
+    def setUp(self):
+        self.customer = make_customer()
+
+    def checkout(self, *products):
+        return Order.create_from_cart(self.customer, [
+            {'product_id': product.id, 'quantity': 1, 'name': product.name} for product in products
+        ], 'credit_card', 'Test Street 1')
+
+    def test_places_order_and_takes_stock(self):
+        product = make_product(stock=5)
+
+        result = self.checkout(product)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(Product.objects.get(id=product.id).stock_quantity, 4)
+
+    def test_deactivated_product_is_not_charged(self):
+        active = make_product(stock=5)
+        discontinued = make_product(stock=5, is_active=False)
+
+        result = self.checkout(active, discontinued)
+
+        self.assertFalse(result['success'])
+        self.assertEqual([line['product_id'] for line in result['failed_items']], [discontinued.id])
+        self.assertIn('No longer available', result['message'])
+        self.assertFalse(Order.objects.filter(customer=self.customer).exists())
+        self.assertEqual(
+            set(Product.objects.filter(id__in=[active.id, discontinued.id]).values_list('stock_quantity', flat=True)),
+            {5}
+        )
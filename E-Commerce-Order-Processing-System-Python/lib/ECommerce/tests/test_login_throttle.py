@@ -0,0 +1,33 @@
+"""
+ShopPy - Login Throttling Tests
+The address limit counts the client behind the proxy, not the proxy.
+"""
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from lib.ECommerce.LoginThrottle import login_blocked, record_login_failure
+
+
+@override_settings(LOGIN_ATTEMPT_LIMIT=0, LOGIN_IP_ATTEMPT_LIMIT=2, LOGIN_CLIENT_IP_HEADER='X-Forwarded-For')
+class AddressLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, forwarded_for):
+        # Every request reaches the app from the proxy's address
+        return RequestFactory().post('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+    def test_clients_behind_one_proxy_are_counted_apart(self):
+        for _ in range(2):
+            record_login_failure(self.request('203.0.113.7'), 'someone')
+
+        self.assertTrue(login_blocked(self.request('203.0.113.7'), 'someone'))
+        self.assertFalse(login_blocked(self.request('198.51.100.4'), 'someone'))
+
+    def test_client_cannot_forge_its_address(self):
+        for forged in ('1.1.1.1', '2.2.2.2'):
+            record_login_failure(self.request(f'{forged}, 203.0.113.7'), 'someone')
+
+        self.assertTrue(login_blocked(self.request('203.0.113.7'), 'someone'))
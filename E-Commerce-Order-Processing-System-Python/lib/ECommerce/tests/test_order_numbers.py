@@ -0,0 +1,92 @@
+"""
+ShopPy - Order Number Tests
+Sequence-backed order numbers inside transactions and across processes.
+"""
+
+import multiprocessing
+
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from lib.ECommerce import OrderNumbers
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.OrderNumbers import SequenceOrderNumberGenerator
+from lib.ECommerce.tests import make_customer, make_product
+
+
+def generate(block_size, count, results):
+    """Generate `count` numbers in a forked process and send them back."""
+    connections.close_all()
+    generator = SequenceOrderNumberGenerator(block_size=block_size)
+    try:
+        results.put([generator.next() for _ in range(count)])
+    finally:
+        connections.close_all()
+
+
+class SequenceInTransactionTests(TestCase):
+
+    def setUp(self):
+        OrderNumbers._generator = None
+        self.addCleanup(setattr, OrderNumbers, '_generator', None)
+
+    @override_settings(ORDER_NUMBER_BLOCK_SIZE=1)
+    def test_checkout_inside_a_transaction_leases_a_new_block(self):
+        customer = make_customer()
+        product = make_product(stock=10)
+        cart = [{'product_id': product.id, 'quantity': 1, 'name': product.name}]
+
+        with transaction.atomic():
+            results = [Order.create_from_cart(customer, cart, 'credit_card', 'Street 1') for _ in range(3)]
+
+        self.assertTrue(all(result['success'] for result in results), results)
+        self.assertEqual(len({result['order_number'] for result in results}), 3)
+
+    def test_block_leased_in_a_rolled_back_transaction_is_not_kept(self):
+        generator = SequenceOrderNumberGenerator(block_size=10)
+        with transaction.atomic():
+            generator.next()
+            transaction.set_rollback(True)
+
+        # The rollback returned the block to the sequence, so another
+        # process leases it; this generator must not keep using it
+        other = SequenceOrderNumberGenerator(block_size=10)
+        numbers = [other.next() for _ in range(5)] + [generator.next() for _ in range(5)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+    def test_block_leased_in_a_committed_transaction_is_kept(self):
+        generator = SequenceOrderNumberGenerator(block_size=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                first = generator.next()
+
+        self.assertEqual(int(generator.next().rsplit('-', 1)[1]), int(first.rsplit('-', 1)[1]) + 1)
+
+
+class SequenceAcrossProcessesTests(TransactionTestCase):
+    """Forked processes leasing blocks from the same sequence."""
+
+    PROCESSES = 4
+    NUMBERS_PER_PROCESS = 250000
+    BLOCK_SIZE = 1000
+
+    def test_one_million_numbers_from_four_processes_never_collide(self):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        connections.close_all()
+        processes = [
+            context.Process(target=generate, args=(self.BLOCK_SIZE, self.NUMBERS_PER_PROCESS, results))
+            for _ in range(self.PROCESSES)
+        ]
+        for process in processes:
+            process.start()
+        batches = [results.get(timeout=300) for _ in processes]
+        for process in processes:
+            process.join()
+
+        numbers = [number for batch in batches for number in batch]
+        self.assertEqual(len(numbers), self.PROCESSES * self.NUMBERS_PER_PROCESS)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        # Each process hands its numbers out in increasing order
+        for batch in batches:
+            self.assertEqual(batch, sorted(batch))
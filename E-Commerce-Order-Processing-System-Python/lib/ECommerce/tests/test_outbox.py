@@ -0,0 +1,38 @@
+"""
+ShopPy - Order Outbox Tests
+Consumers never move their cursor past an event that has not settled yet.
+"""
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from lib.ECommerce.Models.Outbox import OrderEvent, OutboxCursor
+from lib.ECommerce.Outbox import consume
+
+
+class ConsumeSettleWindowTests(TestCase):
+
+    def event(self, age_seconds):
+        return OrderEvent.objects.create(
+            order_id=1, customer_id=1, to_status='pending',
+            created_at=timezone.now() - timedelta(seconds=age_seconds)
+        )
+
+    def test_batch_stops_at_first_unsettled_event(self):
+        settled = self.event(60)
+        unsettled = self.event(0)
+        # Settled, but queued behind the unsettled one
+        behind = self.event(60)
+        seen = []
+
+        processed = consume('test', seen.extend, settle_seconds=5)
+
+        self.assertEqual((processed, seen), (1, [settled]))
+        self.assertEqual(OutboxCursor.objects.get(consumer='test').last_event_id, settled.id)
+
+        OrderEvent.objects.filter(id=unsettled.id).update(created_at=timezone.now() - timedelta(seconds=60))
+        consume('test', seen.extend, settle_seconds=5)
+
+        self.assertEqual(seen, [settled, unsettled, behind])
@@ -0,0 +1,244 @@
+"""
+ShopPy - PostgreSQL Backend Tests
+The pooled backend and SKIP LOCKED checkout against a throwaway cluster.
+
+setUpModule runs initdb into a temporary directory and starts a server
+listening only on a Unix socket there; tearDownModule stops it and removes
+the directory. Skipped when psycopg, psycopg_pool or initdb (on PATH or in
+`pg_config --bindir`) is missing, or when running as root, which initdb
+refuses.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connections, transaction
+from django.test import SimpleTestCase
+
+from lib.ECommerce.Config import parse_database_url
+from lib.ECommerce.tests import make_customer, make_product
+
+try:
+    import psycopg
+    import psycopg_pool
+except ImportError:
+    psycopg = psycopg_pool = None
+
+_cluster = {}
+
+
+def _postgres_bin():
+    """The directory holding initdb and pg_ctl, or None."""
+    initdb = shutil.which('initdb')
+    if initdb:
+        return os.path.dirname(initdb)
+    try:
+        bindir = subprocess.run(
+            ['pg_config', '--bindir'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return bindir if os.path.exists(os.path.join(bindir, 'initdb')) else None
+
+
+def setUpModule():
+    if psycopg is None:
+        raise unittest.SkipTest('psycopg and psycopg_pool are not installed')
+    bindir = _postgres_bin()
+    if bindir is None:
+        raise unittest.SkipTest('initdb is not installed')
+    if os.geteuid() == 0:
+        raise unittest.SkipTest('initdb cannot run as root')
+
+    directory = tempfile.mkdtemp(prefix='shoppy-pg-')
+    data = os.path.join(directory, 'data')
+    try:
+        subprocess.run(
+            [os.path.join(bindir, 'initdb'), '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8', '--no-sync'],
+            capture_output=True, check=True
+        )
+        subprocess.run(
+            [os.path.join(bindir, 'pg_ctl'), '-D', data, '-l', os.path.join(directory, 'server.log'), '-w',
+             '-o', f"-k {directory} -c listen_addresses='' -F", 'start'],
+            capture_output=True, check=True
+        )
+    except subprocess.CalledProcessError as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise unittest.SkipTest(f'Could not start a PostgreSQL cluster: {e.stderr.decode().strip()}')
+    _cluster.update(bindir=bindir, directory=directory, data=data)
+
+
+def tearDownModule():
+    if not _cluster:
+        return
+    subprocess.run(
+        [os.path.join(_cluster['bindir'], 'pg_ctl'), '-D', _cluster['data'], '-m', 'immediate', 'stop'],
+        capture_output=True
+    )
+    shutil.rmtree(_cluster['directory'], ignore_errors=True)
+
+
+def cluster_settings(pool_size=0, **overrides):
+    """A complete DATABASES entry for the throwaway cluster."""
+    settings_dict = parse_database_url('postgres://postgres@localhost/postgres', pool_size=pool_size)
+    # The server only listens on its socket directory
+    settings_dict['HOST'] = _cluster['directory']
+    settings_dict.update(overrides)
+    return connections.configure_settings({'default': settings_dict})['default']
+
+
+class PooledConnectionTests(SimpleTestCase):
+
+    alias = 'pool_test'
+
+    def setUp(self):
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        self.wrapper().close_pool()
+
+    def wrapper(self, pool_size=1, **overrides):
+        from lib.ECommerce.Backends.postgresql.base import DatabaseWrapper
+
+        wrapper = DatabaseWrapper(cluster_settings(pool_size, **overrides), self.alias)
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def test_pool_is_shared_by_the_alias(self):
+        first, second = self.wrapper(), self.wrapper()
+
+        self.assertIsInstance(first.pool, psycopg_pool.ConnectionPool)
+        self.assertIs(first.pool, second.pool)
+        self.assertEqual(first.pool.max_size, 1)
+
+    def test_pool_is_off_without_pool_options(self):
+        self.assertIsNone(self.wrapper(pool_size=0).pool)
+
+    def test_pool_cannot_be_persistent(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'set CONN_MAX_AGE to 0'):
+            self.wrapper(CONN_MAX_AGE=60).pool
+
+    def test_close_returns_connection_to_the_pool(self):
+        first = self.wrapper()
+        first.ensure_connection()
+        raw = first.connection
+        self.assertIs(raw._pool, first.pool)
+
+        first.close()
+
+        self.assertIsNone(first.connection)
+        self.assertIsNone(raw._pool)
+        self.assertFalse(raw.closed)
+        # The pool holds one connection, so the next borrower gets the same one
+        second = self.wrapper()
+        second.ensure_connection()
+        self.assertIs(second.connection, raw)
+
+    def test_exhausted_pool_times_out(self):
+        first = self.wrapper()
+        first.settings_dict['OPTIONS']['pool']['timeout'] = 1
+        first.ensure_connection()
+
+        with self.assertRaises(OperationalError):
+            self.wrapper().ensure_connection()
+
+    def test_close_pool(self):
+        from lib.ECommerce.Backends.postgresql.base import _pools
+
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        pool = wrapper.pool
+
+        wrapper.close_pool()
+
+        self.assertNotIn(self.alias, _pools)
+        self.assertTrue(pool.closed)
+        # A connection borrowed before the pool closed is closed on return
+        wrapper.close()
+        self.assertTrue(raw.closed)
+        self.assertIsNot(self.wrapper().pool, pool)
+
+
+class SkipLockedCheckoutTests(SimpleTestCase):
+    """create_from_cart(skip_locked=True) on the default connection, pooled."""
+
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.saved_settings = connections.settings['default']
+        connections['default'].close()
+        connections.settings['default'] = cluster_settings(pool_size=4)
+        del connections['default']
+        call_command('migrate', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['default'].close()
+        connections['default'].close_pool()
+        connections.settings['default'] = cls.saved_settings
+        del connections['default']
+        super().tearDownClass()
+
+    def order_one(self, customer, product):
+        from lib.ECommerce.Models.Order import Order
+
+        return Order.create_from_cart(customer, [
+            {'product_id': product.id, 'quantity': 1, 'name': product.name}
+        ], 'credit_card', 'Test Street 1', skip_locked=True)
+
+    def test_checkout_skips_product_locked_by_another_checkout(self):
+        from lib.ECommerce.Models.Product import Product
+
+        customer = make_customer()
+        product = make_product(stock=10)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    Product.lock_for_update([product.id])
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections['default'].close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            result = self.order_one(customer, product)
+            updated = product.update_stock(-1, 'sale', skip_locked=True)
+        finally:
+            release.set()
+            holder.join()
+
+        self.assertFalse(result['success'])
+        self.assertIn('is being ordered by another customer', result['message'])
+        self.assertFalse(updated)
+        self.assertEqual(Product.objects.get(id=product.id).stock_quantity, 10)
+
+        self.assertTrue(self.order_one(customer, product)['success'])
+        self.assertEqual(Product.objects.get(id=product.id).stock_quantity, 9)
+
+    def test_checkout_returns_connections_to_the_pool(self):
+        customer = make_customer()
+        product = make_product(stock=10)
+        pool = connections['default'].pool
+
+        for _ in range(3):
+            self.assertTrue(self.order_one(customer, product)['success'])
+            connections['default'].close()
+
+            stats = pool.get_stats()
+            self.assertEqual(stats['pool_available'], stats['pool_size'])
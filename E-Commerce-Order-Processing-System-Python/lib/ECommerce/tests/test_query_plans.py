@@ -0,0 +1,46 @@
+"""
+ShopPy - Query Plan Tests
+Hot-path views are served from indexes (SQLite only).
+"""
+
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.User import User
+from lib.ECommerce.Rollups import rebuild
+from lib.ECommerce.tests import make_customer, make_product
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'check_query_plans reads SQLite query plans')
+class HotPathQueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('plans-admin', 'plans-admin@shoppy.invalid', role='admin')
+        user = User.objects.create_user('plans-customer', 'plans-customer@shoppy.invalid', role='customer')
+        customer = make_customer(user=user)
+        make_product(category='Books', stock=0)
+        product = make_product(category='Electronics')
+        for _ in range(2):
+            Order.create_from_cart(customer, [
+                {'product_id': product.id, 'quantity': 1, 'name': product.name}
+            ], 'credit_card', 'Test Street 1')
+        rebuild()
+
+    def test_hot_paths_use_indexes(self):
+        call_command('check_query_plans', stdout=StringIO())
+
+    def test_missing_index_is_reported(self):
+        # SQLite DDL is transactional, so the test's rollback restores them
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX orders_status_created_idx')
+            cursor.execute('DROP INDEX orders_customer_status_idx')
+
+        with self.assertRaisesMessage(CommandError, 'full table scan'):
+            call_command('check_query_plans', stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,28 @@
+"""
+ShopPy - Read Replica Routing Tests
+Replica reads cover the catalog, never users or always-current tables.
+"""
+
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+
+from lib.ECommerce import Replicas
+from lib.ECommerce.Models.Cart import CartItem
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Replicas import ReplicaRouter
+
+
+@mock.patch.object(Replicas, 'reading_from_replica', lambda: True)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def test_catalog_reads_go_to_the_replica(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Product), settings.DATABASE_REPLICA_ALIAS)
+
+    def test_users_are_read_from_the_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(get_user_model()), 'default')
+
+    def test_carts_are_read_from_the_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(CartItem), 'default')
@@ -0,0 +1,52 @@
+"""
+ShopPy - Sales Rollup Tests
+The incrementally maintained rollups agree with a rebuild from orders.
+"""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Rollup import DailyOrderRollup, DailySalesRollup
+from lib.ECommerce.Models.User import User
+from lib.ECommerce.Rollups import rebuild
+from lib.ECommerce.tests import make_customer, make_product
+
+
+def rollup_snapshot():
+    """Non-empty rollup rows; increments can leave zeroed rows a rebuild would not write."""
+    orders = DailyOrderRollup.objects.exclude(order_count=0).order_by('day', 'status').values_list(
+        'day', 'status', 'order_count', 'revenue'
+    )
+    sales = DailySalesRollup.objects.exclude(quantity=0).order_by('day', 'status', 'product_sku').values_list(
+        'day', 'status', 'category', 'product_sku', 'quantity', 'revenue'
+    )
+    return list(orders), list(sales)
+
+
+class OrderDeleteRollupTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('rollup-admin', 'rollup-admin@shoppy.invalid', role='admin')
+        self.client.force_login(self.admin)
+        customer = make_customer()
+        products = [make_product(), make_product(price='4.50')]
+        self.orders = []
+        for quantity in (1, 3):
+            result = Order.create_from_cart(customer, [
+                {'product_id': product.id, 'quantity': quantity, 'name': product.name}
+                for product in products
+            ], 'credit_card', 'Test Street 1')
+            self.assertTrue(result['success'])
+            self.orders.append(Order.objects.get(order_number=result['order_number']))
+
+    def test_admin_delete_matches_rebuild(self):
+        response = self.client.post(reverse('order_delete', args=[self.orders[0].id]))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Order.objects.filter(id=self.orders[0].id).exists())
+        incremental = rollup_snapshot()
+        self.assertEqual(sum(row[4] for row in incremental[1]), 6)
+
+        rebuild()
+        self.assertEqual(incremental, rollup_snapshot())
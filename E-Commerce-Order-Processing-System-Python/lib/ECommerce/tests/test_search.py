@@ -0,0 +1,74 @@
+"""
+ShopPy - Product Search Tests
+Full-text search matches prefixes, ranks selective searches by relevance
+and pages by cursor.
+"""
+
+import unittest
+from unittest import mock
+
+from django.test import TestCase
+
+from lib.ECommerce import Search
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Pagination import KeysetPaginator
+from lib.ECommerce.tests import make_product
+
+
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Probe the test database, not whichever database was checked first
+        Search._fts_enabled = None
+        if not Search.fts_enabled():
+            raise unittest.SkipTest('the FTS5 product index is not available')
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.in_description = make_product(name='Desk lamp', description='Works with a wireless dimmer')
+        cls.in_name = make_product(name='Wireless headphones')
+        cls.inactive = make_product(name='Wireless charger', is_active=False)
+        make_product(name='Garden hose')
+
+    def test_prefix_matches_ranked_by_field_weight(self):
+        results = list(Product.search_products('wirel'))
+
+        self.assertEqual(results, [self.in_name, self.in_description])
+
+    def test_inactive_products_only_for_staff(self):
+        self.assertIn(self.inactive, Product.search_products('wireless', active_only=False))
+        self.assertNotIn(self.inactive, Product.search_products('wireless'))
+
+    def test_cursor_pages_follow_the_rank(self):
+        paginator = KeysetPaginator(Product.search_products('wireless', active_only=False), 1)
+
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor, len(pages) + 1))
+
+        self.assertEqual(
+            [product for page in pages for product in page],
+            list(Product.search_products('wireless', active_only=False))
+        )
+        self.assertEqual(len(pages), 3)
+
+    def test_short_term_is_not_ranked(self):
+        results = list(Product.search_products('wi', active_only=False))
+
+        self.assertEqual(results, sorted(results, key=lambda product: product.id))
+        self.assertEqual(len(results), 3)
+
+    def test_common_term_pages_in_id_order(self):
+        with mock.patch.object(Search, 'SEARCH_RANK_LIMIT', 1):
+            paginator = KeysetPaginator(Product.search_products('wireless', active_only=False), 2)
+            first = paginator.page()
+            second = paginator.page(first.next_cursor, 2)
+            previous = paginator.page(second.previous_cursor, 1)
+
+        self.assertEqual(
+            [product for page in (first, second) for product in page],
+            [self.in_description, self.in_name, self.inactive]
+        )
+        self.assertEqual(list(previous), list(first))
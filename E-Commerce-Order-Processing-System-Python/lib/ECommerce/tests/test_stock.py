@@ -0,0 +1,78 @@
+"""
+ShopPy - Stock Mutation Tests
+Product.apply_stock_change under concurrent writers.
+"""
+
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+
+from lib.ECommerce.Models.Order import InventoryTransaction
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.tests import make_product, run_in_threads
+
+
+class ApplyStockChangeTests(TestCase):
+
+    def test_decrease_returns_new_quantity_and_records_ledger_row(self):
+        product = make_product(stock=10)
+
+        self.assertEqual(Product.apply_stock_change(product.id, -3, 'sale'), 7)
+        row = InventoryTransaction.objects.get(product=product)
+        self.assertEqual((row.quantity_change, row.transaction_type), (-3, 'sale'))
+
+    def test_decrease_below_zero_is_rejected(self):
+        product = make_product(stock=2)
+
+        self.assertIsNone(Product.apply_stock_change(product.id, -3, 'sale'))
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 2)
+        self.assertFalse(InventoryTransaction.objects.filter(product=product).exists())
+
+    def test_restock_applies_to_negative_stock(self):
+        product = make_product(stock=-10)
+
+        self.assertEqual(Product.apply_stock_change(product.id, 4, 'restock'), -6)
+
+    def test_missing_product_returns_none(self):
+        self.assertIsNone(Product.apply_stock_change(0, 5, 'restock'))
+
+
+class StockContentionTests(TransactionTestCase):
+    """Many threads decrementing the same product at once."""
+
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 25
+    STOCK = 60
+
+    def test_concurrent_decrements_never_oversell(self):
+        product = make_product(stock=self.STOCK)
+
+        def buy(index):
+            return sum(
+                Product.apply_stock_change(product.id, -1, 'sale') is not None
+                for _ in range(self.ATTEMPTS_PER_THREAD)
+            )
+
+        sold = sum(run_in_threads(buy, self.THREADS))
+
+        product.refresh_from_db()
+        ledger = InventoryTransaction.objects.filter(product=product).aggregate(total=Sum('quantity_change'))
+        self.assertEqual(sold, self.STOCK)
+        self.assertEqual(product.stock_quantity, 0)
+        self.assertEqual(ledger['total'], -self.STOCK)
+
+    def test_concurrent_restocks_and_sales_are_not_lost(self):
+        product = make_product(stock=1000)
+
+        def change(index):
+            quantity = 2 if index % 2 else -1
+            return sum(
+                quantity for _ in range(self.ATTEMPTS_PER_THREAD)
+                if Product.apply_stock_change(product.id, quantity, 'adjustment') is not None
+            )
+
+        applied = sum(run_in_threads(change, self.THREADS))
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 1000 + applied)
+        self.assertEqual(applied, (self.THREADS // 2) * self.ATTEMPTS_PER_THREAD)
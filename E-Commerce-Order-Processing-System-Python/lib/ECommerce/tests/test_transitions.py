@@ -0,0 +1,57 @@
+"""
+ShopPy - Order Transition Tests
+Batches move only the orders that are still in the status they were selected in.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+
+from lib.ECommerce import Transitions
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Outbox import OrderEvent
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Transitions import transition_orders
+from lib.ECommerce.tests import make_customer, make_product
+
+
+class TransitionBatchTests(TestCase):
+
+    def setUp(self):
+        customer = make_customer()
+        self.product = make_product(stock=10)
+        self.orders = []
+        for _ in range(2):
+            result = Order.create_from_cart(customer, [
+                {'product_id': self.product.id, 'quantity': 2, 'name': self.product.name}
+            ], 'credit_card', 'Test Street 1')
+            self.assertTrue(result['success'])
+            self.orders.append(Order.objects.get(order_number=result['order_number']))
+
+    def test_cancel_restores_stock(self):
+        result = transition_orders([order.id for order in self.orders], 'cancelled')
+
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_quantity, 10)
+
+    def test_order_changed_after_selection_is_skipped(self):
+        moved_elsewhere = self.orders[1]
+        select_batch = Transitions._select_batch
+
+        def select_then_ship(order_ids, sources):
+            # Another writer ships an order after it was selected
+            selected = select_batch(order_ids, sources)
+            Order.objects.filter(id=moved_elsewhere.id).update(status='shipped')
+            return selected
+
+        with mock.patch.object(Transitions, '_select_batch', select_then_ship):
+            result = transition_orders([order.id for order in self.orders], 'cancelled')
+
+        self.assertEqual((result['count'], result['skipped']), (1, [moved_elsewhere.id]))
+        self.assertEqual(Order.objects.get(id=moved_elsewhere.id).status, 'shipped')
+        # Only the cancelled order's two units go back on the shelf
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_quantity, 8)
+        self.assertEqual(
+            list(OrderEvent.objects.filter(to_status='cancelled').values_list('order_id', flat=True)),
+            [self.orders[0].id]
+        )
@@ -208,6 +208,10 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
+                    // Orders whose status does not allow the change are skipped
+                    if (data.skipped && data.skipped.length) {
+                        alert(data.message);
+                    }
                     location.reload();
                 } else {
                     alert(data.message || 'Failed to update orders');
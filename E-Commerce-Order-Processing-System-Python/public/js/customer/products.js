@@ -31,6 +31,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let isLoading = false;
     let hasMore = document.getElementById('infinite-scroll-status')?.dataset.hasMore === 'true';
     let nextPage = document.getElementById('infinite-scroll-status')?.dataset.nextPage;
+    let nextCursor = document.getElementById('infinite-scroll-status')?.dataset.nextCursor;
 
     // Show end message if no more products on initial load
     if (!hasMore && document.querySelectorAll('.product-card').length > 0) {
@@ -62,6 +63,9 @@ document.addEventListener('DOMContentLoaded', function() {
         const urlParams = new URLSearchParams(window.location.search);
         urlParams.set('page', page);
         urlParams.set('ajax', '1');
+        if (nextCursor) {
+            urlParams.set('cursor', nextCursor);
+        }
 
         fetch(window.productsUrls.products + '?' + urlParams.toString())
             .then(response => response.json())
@@ -87,8 +91,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Update state
                 hasMore = data.has_more;
                 nextPage = data.next_page;
+                nextCursor = data.next_cursor;
                 statusEl.dataset.hasMore = hasMore ? 'true' : 'false';
                 statusEl.dataset.nextPage = nextPage || '';
+                statusEl.dataset.nextCursor = nextCursor || '';
                 
                 statusEl.style.display = 'none';
                 
@@ -220,12 +226,14 @@ function createProductCard(product) {
                         </svg>
                        </div>`
                 }
-                ${stockBadge}
             </div>
-            <div class="product-info">
+            <div class="product-info product-details">
                 <span class="product-category">${product.category}</span>
                 <h3 class="product-name">${product.name}</h3>
                 <p class="product-description">${product.description}</p>
+            </div>
+            ${stockBadge}
+            <div class="product-info product-buy">
                 <div class="product-footer">
                     <span class="product-price">$${parseFloat(product.price).toFixed(2)}</span>
                     ${addButton}
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Load test cart mutations through the cart API.
+Usage: python scripts/benchmark_cart.py [--workers 4] [--seconds 5] [--lines 1 20 100]
+
+Each worker process logs in as its own temporary customer, fills its cart
+to --lines products and then repeatedly adds a product, changes its
+quantity and removes it again through /api/cart/add/, /api/cart/update/
+and /api/cart/remove/, so the cart stays the same size. The script reports
+the queries and p50 latency of each call and mutations per second per
+cart size. With per-line rows the query count does not grow with the cart;
+update and remove still answer with the whole repriced cart, so their
+responses do. The users, their sessions and their carts are deleted
+afterwards.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection, connections, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from lib.ECommerce.Models.Cart import CartItem
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Models.User import User
+
+USERNAME_PREFIX = '_benchmark_cart_'
+
+
+def login(user):
+    """A test client logged in as user."""
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    client.force_login(user)
+    return client
+
+
+def call(client, endpoint, **payload):
+    """POST JSON to a cart endpoint and fail loudly if it is refused."""
+    response = client.post(f'/api/cart/{endpoint}/', json.dumps(payload), content_type='application/json')
+    if response.status_code != 200 or not response.json().get('success'):
+        raise SystemExit(f'{endpoint} failed: {response.status_code} {response.content[:200]!r}')
+
+
+def fill(client, products, lines):
+    """Empty the cart and add `lines` products; returns the products left over."""
+    client.post('/api/cart/clear/')
+    for product_id in products[:lines]:
+        call(client, 'add', product_id=product_id, quantity=1)
+    return products[lines:]
+
+
+def mutate(client, spare):
+    """Add one spare product, change its quantity and remove it; returns the three latencies."""
+    product_id = random.choice(spare)
+    latencies = []
+    for endpoint, payload in [
+        ('add', {'product_id': product_id, 'quantity': 1}),
+        ('update', {'product_id': product_id, 'quantity': 2}),
+        ('remove', {'product_id': product_id}),
+    ]:
+        started = time.perf_counter()
+        call(client, endpoint, **payload)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def worker(user, products, lines, seconds, ready, results):
+    """Fill one user's cart, then mutate it for `seconds` once every worker is ready."""
+    client = login(user)
+    spare = fill(client, products, lines)
+    ready.wait()
+    deadline = time.monotonic() + seconds
+    latencies = []
+    while time.monotonic() < deadline:
+        latencies.append(mutate(client, spare))
+        # With DEBUG on every query is logged; keep the log from growing
+        reset_queries()
+    connections.close_all()
+    results.put(latencies)
+
+
+def count_queries(user, products, lines):
+    """Queries of each endpoint for a cart of `lines` products."""
+    client = login(user)
+    spare = fill(client, products, lines)
+    counts = {}
+    for endpoint, payload in [
+        ('add', {'product_id': spare[0], 'quantity': 1}),
+        ('update', {'product_id': spare[0], 'quantity': 2}),
+        ('remove', {'product_id': spare[0]}),
+    ]:
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            call(client, endpoint, **payload)
+        counts[endpoint] = len(queries)
+    return counts
+
+
+def run(users, products, lines, seconds):
+    """Run one cart size and print queries, mutations per second and latency."""
+    counts = count_queries(users[0], products, lines)
+
+    connections.close_all()
+    results = multiprocessing.Queue()
+    ready = multiprocessing.Barrier(len(users))
+    processes = [
+        multiprocessing.Process(target=worker, args=(user, products, lines, seconds, ready, results))
+        for user in users
+    ]
+    for process in processes:
+        process.start()
+    rounds = [row for _ in processes for row in results.get()]
+    for process in processes:
+        process.join()
+
+    columns = []
+    for index, endpoint in enumerate(('add', 'update', 'remove')):
+        latencies = sorted(row[index] for row in rounds)
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        columns.append(f'{endpoint} {counts[endpoint]} queries {p50:5.1f} ms')
+    print(f'{lines:4d} lines: {len(rounds) * 3 / seconds:7.1f} mutations/s  ' + '  '.join(columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 20, 100])
+    args = parser.parse_args()
+
+    needed = max(args.lines) + 10
+    products = list(
+        Product.objects.filter(is_active=True, stock_quantity__gte=2)
+        .order_by('id').values_list('id', flat=True)[:needed]
+    )
+    if len(products) < needed:
+        sys.exit(f'The database needs {needed} active products in stock; run import_products first')
+
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    users = [
+        User.objects.create_user(f'{USERNAME_PREFIX}{index}', f'benchmark-cart-{index}@shoppy.invalid', role='customer')
+        for index in range(args.workers)
+    ]
+    try:
+        print(f'{connection.vendor}: {args.workers} workers, {args.seconds:g}s per cart size')
+        for lines in args.lines:
+            run(users, products, lines, args.seconds)
+    finally:
+        user_ids = [user.id for user in users]
+        CartItem.objects.filter(cart_key__in=[f'user:{user_id}' for user_id in user_ids]).delete()
+        for session in Session.objects.iterator():
+            if str(session.get_decoded().get('_auth_user_id')) in map(str, user_ids):
+                CartItem.objects.filter(cart_key=f'session:{session.session_key}').delete()
+                session.delete()
+        User.objects.filter(id__in=user_ids).delete()
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
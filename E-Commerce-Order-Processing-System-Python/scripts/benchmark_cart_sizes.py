@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark checkout queries and throughput by cart size.
+Usage: python scripts/benchmark_cart_sizes.py [--lines 1 10 100] [--seconds 5]
+
+Places real orders through Order.create_from_cart against the configured
+database, so run it on a scratch database. For each cart size the script
+counts the queries of one checkout and then checks out as many carts of
+that size as it can in --seconds, reporting checkouts/s and latency.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from lib.ECommerce.Models.Customer import Customer
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Product import Product
+
+BENCHMARK_STOCK = 1000000
+
+
+def checkout(customers, products, lines):
+    """Check out one cart of `lines` distinct products."""
+    cart_items = [
+        {'product_id': product_id, 'quantity': 1, 'name': ''}
+        for product_id in random.sample(products, lines)
+    ]
+    result = Order.create_from_cart(random.choice(customers), cart_items, 'credit_card', 'Benchmark Street 1')
+    if not result['success']:
+        raise SystemExit(f"Checkout failed: {result['message']}")
+
+
+def run(customers, products, lines, seconds):
+    """Count the queries of one checkout, then measure throughput."""
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        checkout(customers, products, lines)
+    query_count = len(queries)
+
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        checkout(customers, products, lines)
+        latencies.append(time.perf_counter() - started)
+        # With DEBUG on every query is logged; keep the log from growing
+        reset_queries()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{lines:4d} lines: {query_count:3d} queries  {len(latencies) / seconds:8.1f} checkouts/s  '
+          f'p50 {p50:7.1f} ms  p99 {p99:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    products = list(Product.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)[:max(args.lines)])
+    customers = list(Customer.objects.all()[:100])
+    if len(products) < max(args.lines) or not customers:
+        sys.exit(f'The database needs {max(args.lines)} active products and a customer; '
+                 f'run initialize_database or import_products first')
+
+    for product_id in products:
+        Product.set_stock(product_id, BENCHMARK_STOCK, notes='Checkout benchmark')
+
+    print(f'{connection.vendor}: one checkout at a time, {args.seconds:g}s per cart size')
+    for lines in args.lines:
+        run(customers, products, lines, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
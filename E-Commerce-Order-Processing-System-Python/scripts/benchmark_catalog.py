@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Benchmark customer catalog requests per second.
+Usage: python scripts/benchmark_catalog.py [--seconds 5] [--pages 3] [--sale-every 10]
+
+Logs in as a benchmark customer (username _benchmark_catalog_customer,
+created on the first run and left in place) and cycles through the first
+--pages pages of the products view through the test client for --seconds
+per run: without a cache, as every request rendered before the catalog
+was cached, with a warm cache, and with a warm cache while a sale changes
+the stock of a product on the first page every --sale-every requests.
+Each sale is undone afterwards. The script prints the queries of one
+request and the requests per second of each run, so run it on a scratch
+database.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.conf import settings
+from django.db import connection, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lib.ECommerce.Models.Customer import Customer
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Models.User import User
+
+USERNAME = '_benchmark_catalog_customer'
+PER_PAGE = 10
+
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def customer_client():
+    """A test client logged in as the benchmark customer."""
+    user = User.objects.filter(username=USERNAME).first() or User.objects.create_user(
+        USERNAME, 'benchmark-catalog@shoppy.invalid', role='customer'
+    )
+    Customer.objects.get_or_create(user=user, defaults={'first_name': 'Benchmark', 'last_name': 'Catalog'})
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    client.force_login(user)
+    return client
+
+
+def measure(label, client, urls, seconds, sale_every=0):
+    """Print the queries of one request and requests per second over `seconds`."""
+    for url in urls:
+        client.get(url)
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(urls[0])
+    if response.status_code != 200:
+        raise SystemExit(f'{urls[0]} failed: {response.status_code}')
+    query_count = len(queries)
+
+    product = Product.objects.filter(is_active=True).order_by('id').first()
+    sales = 0
+    requests = 0
+    pages = itertools.cycle(urls)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if sale_every and requests % sale_every == sale_every - 1:
+            Product.apply_stock_change(product.id, -1, 'sale', notes='benchmark_catalog')
+            sales += 1
+        client.get(next(pages))
+        requests += 1
+        # With DEBUG on every query is logged; keep the log from growing
+        reset_queries()
+    if sales:
+        Product.apply_stock_change(product.id, sales, 'adjustment', notes='benchmark_catalog')
+    print(f'  {label:<30} {query_count:3d} queries  {requests / seconds:8.1f} req/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--sale-every', type=int, default=10)
+    args = parser.parse_args()
+
+    active = Product.objects.filter(is_active=True).count()
+    if active < args.pages * PER_PAGE:
+        sys.exit(f'The database needs {args.pages * PER_PAGE} active products; run import_products first')
+
+    client = customer_client()
+    urls = [f"{reverse('products')}?page={page}" for page in range(1, args.pages + 1)]
+    print(f'{connection.vendor}: {active} active products, {args.pages} pages, {args.seconds:g}s per run')
+
+    with override_settings(CACHES=DUMMY_CACHES):
+        measure('no cache', client, urls, args.seconds)
+    measure('cached', client, urls, args.seconds)
+    measure(f'cached, sale every {args.sale_every}', client, urls, args.seconds, args.sale_every)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Benchmark checkout throughput with several worker processes.
+Usage: python scripts/benchmark_checkout.py [--workers 1 4 16] [--seconds 10] [--products 20]
+
+Places real orders through Order.create_from_cart against the configured
+database (SQLite, or PostgreSQL when DATABASE_URL is set), so run it on a
+scratch database. Each run tops the chosen products' stock up first; fewer
+--products means more checkouts competing for the same rows.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.db import connections
+
+from lib.ECommerce.Models.Customer import Customer
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Product import Product
+
+BENCHMARK_STOCK = 1000000
+
+
+def close_connections():
+    """Close connections and pools so forked workers open their own."""
+    connections.close_all()
+    for connection in connections.all():
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+
+
+def worker(deadline, products, customers, skip_locked, results):
+    """Place orders until the deadline."""
+    customers = list(Customer.objects.filter(id__in=customers))
+    placed = failed = 0
+    latencies = []
+    while time.monotonic() < deadline:
+        cart_items = [
+            {'product_id': product_id, 'quantity': 1, 'name': ''}
+            for product_id in random.sample(products, random.randint(1, 3))
+        ]
+        started = time.perf_counter()
+        result = Order.create_from_cart(
+            random.choice(customers), cart_items, 'credit_card', 'Benchmark Street 1',
+            skip_locked=skip_locked
+        )
+        latencies.append(time.perf_counter() - started)
+        if result['success']:
+            placed += 1
+        else:
+            failed += 1
+    close_connections()
+    results.put((placed, failed, latencies))
+
+
+def run(workers, seconds, products, customers, skip_locked):
+    """Run one round with the given number of worker processes."""
+    close_connections()
+    results = multiprocessing.Queue()
+    deadline = time.monotonic() + seconds
+    processes = [
+        multiprocessing.Process(target=worker, args=(deadline, products, customers, skip_locked, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    placed = sum(row[0] for row in rows)
+    failed = sum(row[1] for row in rows)
+    latencies = sorted(latency for row in rows for latency in row[2])
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f'{workers:3d} workers: {placed / seconds:8.1f} orders/s  p50 {p50:7.1f} ms  '
+          f'p99 {p99:7.1f} ms  failed {failed}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--products', type=int, default=20,
+                        help='Number of products the checkouts spread over (default: 20)')
+    parser.add_argument('--skip-locked', action='store_true',
+                        help='Fail checkouts for products another checkout holds instead of waiting')
+    args = parser.parse_args()
+
+    products = list(Product.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)[:args.products])
+    customers = list(Customer.objects.values_list('id', flat=True)[:100])
+    if len(products) < 3 or not customers:
+        sys.exit('The database needs at least 3 active products and a customer; run initialize_database first')
+
+    for product_id in products:
+        Product.set_stock(product_id, BENCHMARK_STOCK, notes='Checkout benchmark')
+
+    vendor = connections['default'].vendor
+    print(f'{vendor}: checkouts over {len(products)} products, {args.seconds:g}s per round'
+          f'{", skip_locked" if args.skip_locked else ""}')
+    for workers in args.workers:
+        run(workers, args.seconds, products, customers, args.skip_locked)
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
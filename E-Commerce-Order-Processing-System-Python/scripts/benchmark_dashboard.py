@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Benchmark dashboard requests per second for admins and customers.
+Usage: python scripts/benchmark_dashboard.py [--seconds 5] [--orders 200]
+
+Logs in as a benchmark admin and a benchmark customer (usernames starting
+with _benchmark_dashboard_, created on the first run and left in place
+together with the customer's --orders generated orders) and requests
+/dashboard/ through the test client for --seconds, once with the headline
+numbers counted query by query as the dashboard used to and once with the
+cached grouped figures from lib/ECommerce/Dashboard.py. The script prints
+the queries of one request and the requests per second of each, so run it
+on a scratch database.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.conf import settings
+from django.db import connection, reset_queries
+from django.db.models import F, Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from lib.ECommerce.Models.Customer import Customer
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Models.User import User
+from lib.ECommerce.Rollups import rebuild
+
+USERNAME_PREFIX = '_benchmark_dashboard_'
+ORDER_NUMBER_PREFIX = 'BENCH-DASH-'
+STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'delivered', 'delivered', 'cancelled']
+
+
+def legacy_admin_stats():
+    """The admin figures as the dashboard counted them before Dashboard.py: one query each."""
+    return {
+        'total_products': Product.objects.filter(is_active=True).count(),
+        'low_stock': Product.objects.filter(is_active=True, stock_quantity__lte=F('reorder_level')).count(),
+        'total_orders': Order.objects.exclude(status__in=['delivered', 'cancelled', 'refunded']).count(),
+        'total_customers': Customer.objects.count(),
+    }
+
+
+def legacy_customer_stats(customer_id):
+    """The customer figures as the dashboard counted them before Dashboard.py: one query each."""
+    orders = Order.objects.filter(customer_id=customer_id)
+    return {
+        'total_orders': orders.count(),
+        'pending_orders': orders.filter(status='pending').count(),
+        'delivered_orders': orders.filter(status='delivered').count(),
+        'total_spent': orders.exclude(status='cancelled').aggregate(total=Sum('total'))['total'] or 0,
+    }
+
+
+def accounts(order_count):
+    """The benchmark admin and customer users, creating them and the customer's orders if needed."""
+    admin = User.objects.filter(username=f'{USERNAME_PREFIX}admin').first() or User.objects.create_user(
+        f'{USERNAME_PREFIX}admin', 'benchmark-dashboard-admin@shoppy.invalid', role='admin'
+    )
+    user = User.objects.filter(username=f'{USERNAME_PREFIX}customer').first() or User.objects.create_user(
+        f'{USERNAME_PREFIX}customer', 'benchmark-dashboard-customer@shoppy.invalid', role='customer'
+    )
+    customer, _ = Customer.objects.get_or_create(
+        user=user, defaults={'first_name': 'Benchmark', 'last_name': 'Dashboard'}
+    )
+
+    missing = order_count - Order.objects.filter(customer=customer).count()
+    if missing > 0:
+        first = Order.objects.filter(order_number__startswith=ORDER_NUMBER_PREFIX).count()
+        now = timezone.now()
+        orders = []
+        for number in range(first, first + missing):
+            subtotal = Decimal(random.randint(500, 50000)) / 100
+            orders.append(Order(
+                order_number=f'{ORDER_NUMBER_PREFIX}{number:07d}',
+                customer=customer,
+                status=random.choice(STATUSES),
+                subtotal=subtotal,
+                total=subtotal,
+                created_at=now - timedelta(minutes=random.randint(0, 365 * 24 * 60)),
+            ))
+        Order.objects.bulk_create(orders)
+        rebuild()
+    return admin, user
+
+
+def measure(label, client, seconds):
+    """Print the queries of one dashboard request and requests per second over `seconds`."""
+    client.get('/dashboard/')
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/dashboard/')
+    if response.status_code != 200:
+        raise SystemExit(f'/dashboard/ failed: {response.status_code}')
+    query_count = len(queries)
+
+    requests = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        client.get('/dashboard/')
+        requests += 1
+        # With DEBUG on every query is logged; keep the log from growing
+        reset_queries()
+    print(f'  {label:<22} {query_count:3d} queries  {requests / seconds:8.1f} req/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--orders', type=int, default=200)
+    args = parser.parse_args()
+
+    admin, customer = accounts(args.orders)
+    print(f'{connection.vendor}: {Product.objects.count()} products, {Order.objects.count()} orders, '
+          f'{args.seconds:g}s per run')
+
+    for role, user in (('admin', admin), ('customer', customer)):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.force_login(user)
+        with mock.patch('lib.ECommerce.Controllers.shared_routes.get_admin_stats', legacy_admin_stats), \
+                mock.patch('lib.ECommerce.Controllers.shared_routes.get_customer_stats', legacy_customer_stats):
+            measure(f'{role}, per-figure', client, args.seconds)
+        measure(f'{role}, Dashboard.py', client, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Benchmark concurrent reads and checkouts under each database profile.
+Usage: python scripts/benchmark_database.py [--readers 8] [--writers 4] [--seconds 10]
+
+Each profile runs against its own copy of the database, so the real data is
+never touched. Reader processes list products and order statistics while
+writer processes place orders through Order.create_from_cart; the script
+reports throughput, latency and "database is locked" failures per profile.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from lib.ECommerce.Models.Customer import Customer
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Models.Product import Product
+
+
+def read(products, customers):
+    """One page of the product list and one customer's order stats."""
+    list(Product.objects.filter(is_active=True).order_by('name')[:20])
+    Order.get_status_counts(customer_id=random.choice(customers))
+    return True
+
+
+def checkout(products, customers):
+    """Place a one- or two-line order for a random customer."""
+    customer = Customer.objects.get(id=random.choice(customers))
+    cart_items = [
+        {'product_id': product_id, 'quantity': 1, 'name': ''}
+        for product_id in random.sample(products, random.randint(1, 2))
+    ]
+    result = Order.create_from_cart(customer, cart_items, 'credit_card', 'Benchmark Street 1')
+    if not result['success'] and 'locked' in result.get('message', ''):
+        raise sqlite3.OperationalError(result['message'])
+    return result['success']
+
+
+def worker(role, path, profile, deadline, products, customers, results):
+    """Run one role against the copied database until the deadline."""
+    settings.DATABASE_PROFILE = profile
+    connections['default'].settings_dict['NAME'] = path
+    action = read if role == 'reader' else checkout
+
+    done = failed = locked = 0
+    latencies = []
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if action(products, customers):
+                done += 1
+            else:
+                failed += 1
+        except (sqlite3.OperationalError, OperationalError):
+            locked += 1
+        latencies.append(time.perf_counter() - started)
+    connections.close_all()
+    results.put((role, done, failed, locked, latencies))
+
+
+def run_profile(profile, source, args, products, customers):
+    """Copy the database, apply the profile's journal mode and run the workers."""
+    workdir = tempfile.mkdtemp(prefix='shoppy-bench-')
+    path = os.path.join(workdir, 'bench.db')
+    shutil.copyfile(source, path)
+    with sqlite3.connect(path) as db:
+        db.execute('PRAGMA journal_mode = DELETE')
+        db.execute('UPDATE products SET stock_quantity = 1000000 WHERE id IN (%s)' % ','.join(
+            str(product_id) for product_id in products
+        ))
+
+    connections.close_all()
+    results = multiprocessing.Queue()
+    deadline = time.monotonic() + args.seconds
+    roles = ['reader'] * args.readers + ['writer'] * args.writers
+    processes = [
+        multiprocessing.Process(
+            target=worker, args=(role, path, profile, deadline, products, customers, results)
+        )
+        for role in roles
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    shutil.rmtree(workdir)
+
+    print(f"\nProfile '{profile}': {settings.DATABASE_PROFILES[profile] or 'SQLite defaults'}")
+    for role in ('reader', 'writer'):
+        done = sum(row[1] for row in rows if row[0] == role)
+        failed = sum(row[2] for row in rows if row[0] == role)
+        locked = sum(row[3] for row in rows if row[0] == role)
+        latencies = sorted(latency for row in rows if row[0] == role for latency in row[4])
+        if not latencies:
+            continue
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f'  {role}s: {done / args.seconds:8.1f} ops/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  '
+              f'failed {failed}  locked {locked}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profile', action='append', choices=sorted(settings.DATABASE_PROFILES),
+                        help='Profile to run; repeat for several (default: all)')
+    args = parser.parse_args()
+
+    if connections['default'].vendor != 'sqlite':
+        sys.exit('Database profiles apply to SQLite; use scripts/benchmark_checkout.py for PostgreSQL')
+    source = str(settings.DATABASES['default']['NAME'])
+    products = list(Product.objects.filter(is_active=True).values_list('id', flat=True)[:200])
+    customers = list(Customer.objects.values_list('id', flat=True)[:200])
+    if not products or not customers:
+        sys.exit('The database needs active products and customers; run initialize_database first')
+
+    print(f'{args.readers} readers and {args.writers} writers for {args.seconds:g}s each, on a copy of {source}')
+    for profile in args.profile or sorted(settings.DATABASE_PROFILES):
+        run_profile(profile, source, args, products, customers)
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
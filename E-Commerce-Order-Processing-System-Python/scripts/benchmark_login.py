@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Benchmark login throughput for each password hasher.
+Usage: python scripts/benchmark_login.py [--workers 4] [--seconds 5] [--hasher bcrypt --cost 10]
+
+Worker processes log a temporary user in through Auth.login_user, with its
+password stored by each hasher in turn, and the script reports logins per
+second and latency. It then times the first login of a user whose password
+is still a PBKDF2 hash (the rehash to the configured hasher) and the rate of
+wrong-password attempts with and without the login throttle. The user and
+its sessions are deleted afterwards.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.test import RequestFactory, override_settings
+
+from lib.ECommerce.Auth import Auth
+from lib.ECommerce.Hashers import DEFAULT_COSTS, HASHER_LIBRARIES
+from lib.ECommerce.Models.User import User
+
+# Throttle counters go to a private cache, never the configured one
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-login'},
+}
+
+BENCHMARK_USERNAME = '_benchmark_login'
+BENCHMARK_PASSWORD = 'benchmark-password-123'
+
+factory = RequestFactory()
+
+
+def hasher_settings(name, cost=None):
+    """Settings that make `name` the configured hasher."""
+    return override_settings(
+        PASSWORD_HASHER=name,
+        PASSWORD_HASH_COST=cost,
+        PASSWORD_HASHERS=[settings.PASSWORD_HASHER_CLASSES[name]] + [
+            path for other, path in settings.PASSWORD_HASHER_CLASSES.items() if other != name
+        ],
+    )
+
+
+def attempt(password):
+    """One login through Auth.login_user; returns (succeeded, session key)."""
+    from django.contrib.auth.models import AnonymousUser
+    from importlib import import_module
+
+    request = factory.post('/login/')
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    request.user = AnonymousUser()
+    user = Auth.login_user(request, BENCHMARK_USERNAME, password)
+    return user is not None, request.session.session_key
+
+
+def worker(deadline, password, results):
+    """Log in until the deadline."""
+    done = failed = 0
+    latencies = []
+    sessions = []
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        succeeded, session_key = attempt(password)
+        latencies.append(time.perf_counter() - started)
+        if succeeded:
+            done += 1
+            sessions.append(session_key)
+        else:
+            failed += 1
+    connections.close_all()
+    results.put((done, failed, latencies, sessions))
+
+
+def run(label, workers, seconds, password=BENCHMARK_PASSWORD):
+    """Run one round and print attempts per second and latency."""
+    connections.close_all()
+    results = multiprocessing.Queue()
+    deadline = time.monotonic() + seconds
+    processes = [
+        multiprocessing.Process(target=worker, args=(deadline, password, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    done = sum(row[0] for row in rows)
+    failed = sum(row[1] for row in rows)
+    latencies = sorted(latency for row in rows for latency in row[2])
+    sessions = [key for row in rows for key in row[3]]
+    for start in range(0, len(sessions), 500):
+        Session.objects.filter(session_key__in=sessions[start:start + 500]).delete()
+
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f'  {label:<24} {(done + failed) / seconds:9.1f} attempts/s  p50 {p50:8.1f} ms  '
+          f'p99 {p99:8.1f} ms  logged in {done}')
+
+
+def installed(module):
+    """Check whether a hasher's library can be imported."""
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--hasher', action='append', choices=sorted(settings.PASSWORD_HASHER_CLASSES),
+                        help='Hasher to run; repeat for several (default: all installed)')
+    parser.add_argument('--cost', type=int, help='Cost for the hashers (default: each one\'s default)')
+    args = parser.parse_args()
+
+    names = args.hasher or [
+        name for name in settings.PASSWORD_HASHER_CLASSES
+        if name not in HASHER_LIBRARIES or installed(HASHER_LIBRARIES[name])
+    ]
+
+    User.objects.filter(username=BENCHMARK_USERNAME).delete()
+    user = User.objects.create_user(BENCHMARK_USERNAME, 'benchmark-login@shoppy.invalid', role='staff')
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            benchmark(user, names, args)
+    finally:
+        user.delete()
+
+
+def benchmark(user, names, args):
+    """Run every round for the benchmark user."""
+    print(f'{args.workers} workers, {args.seconds:g}s per round')
+    with override_settings(LOGIN_ATTEMPT_LIMIT=0, LOGIN_IP_ATTEMPT_LIMIT=0):
+        for name in names:
+            cost = args.cost or DEFAULT_COSTS[name]
+            with hasher_settings(name, cost):
+                user.set_password(BENCHMARK_PASSWORD)
+                user.save(update_fields=['password'])
+                run(f'{name} (cost {cost})', args.workers, args.seconds)
+
+        # First login of a user created before the switch: verify the
+        # PBKDF2 hash, then store it again with the configured hasher
+        user.password = make_password(BENCHMARK_PASSWORD, hasher='pbkdf2_sha256')
+        user.save(update_fields=['password'])
+        for label in ('rehash from pbkdf2', 'after rehash'):
+            started = time.perf_counter()
+            _, session_key = attempt(BENCHMARK_PASSWORD)
+            elapsed = time.perf_counter() - started
+            Session.objects.filter(session_key=session_key).delete()
+            user.refresh_from_db()
+            print(f'  {label:<24} {elapsed * 1000:9.1f} ms          '
+                  f'stored as {identify_hasher(user.password).algorithm}')
+
+    print('Wrong passwords:')
+    with override_settings(LOGIN_ATTEMPT_LIMIT=0, LOGIN_IP_ATTEMPT_LIMIT=0):
+        run('throttle off', args.workers, args.seconds, password='wrong')
+    cache.clear()
+    run(f'throttle at {settings.LOGIN_ATTEMPT_LIMIT} failures', args.workers, args.seconds,
+        password='wrong')
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Benchmark order statistics and status counts on a large orders table.
+Usage: python scripts/benchmark_order_stats.py [--orders 1000000] [--repeat 5]
+
+Tops the orders table up to --orders rows with generated orders (numbered
+BENCH-STATS-nnnnnnn and left in place for the next run), rebuilds the
+rollups for them and then times each way of computing the report numbers:
+the old per-status queries, the single grouped pass, the cached result,
+and the status counts from orders and from the rollups. The script prints
+the query count and the median wall time of each, so run it on a scratch
+database.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.db import connection, reset_queries
+from django.db.models import Avg, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from lib.ECommerce.Models.Customer import Customer
+from lib.ECommerce.Models.Order import Order
+from lib.ECommerce.Rollups import rebuild
+
+ORDER_NUMBER_PREFIX = 'BENCH-STATS-'
+SEED_BATCH_SIZE = 5000
+
+# Roughly the mix of a shop that has been running for a while
+STATUS_WEIGHTS = {
+    'pending': 2, 'processing': 3, 'shipped': 5, 'delivered': 80, 'cancelled': 7, 'refunded': 3,
+}
+
+
+def legacy_order_stats():
+    """get_order_stats as it was before the grouped pass: one query per figure and per status."""
+    total_revenue = Order.objects.exclude(status='cancelled').aggregate(total=Sum('total'))['total'] or 0
+    total_orders = Order.objects.exclude(status__in=['delivered', 'cancelled', 'refunded']).count()
+    avg_order = Order.objects.exclude(status='cancelled').aggregate(avg=Avg('total'))['avg'] or 0
+
+    by_status = {}
+    for status, _ in Order.STATUS_CHOICES:
+        count = Order.objects.filter(status=status).count()
+        if count > 0:
+            revenue = Order.objects.filter(status=status).aggregate(total=Sum('total'))['total'] or 0
+            by_status[status] = {'count': count, 'revenue': revenue}
+
+    return {
+        'total_revenue': total_revenue,
+        'total_orders': total_orders,
+        'average_order_value': avg_order,
+        'by_status': by_status,
+    }
+
+
+def summary(stats):
+    """The figures both versions must agree on, to the cent (SQLite sums decimals as floats)."""
+    cents = Decimal('0.01')
+    return (
+        Decimal(stats['total_revenue']).quantize(cents),
+        stats['total_orders'],
+        {status: (row['count'], Decimal(row['revenue']).quantize(cents)) for status, row in stats['by_status'].items()},
+    )
+
+
+def seed(target):
+    """Add generated orders until the table holds `target` rows; returns how many were added."""
+    missing = target - Order.objects.count()
+    if missing <= 0:
+        return 0
+    customers = list(Customer.objects.values_list('id', flat=True)[:100])
+    if not customers:
+        sys.exit('The database needs a customer; run initialize_database first')
+
+    first = Order.objects.filter(order_number__startswith=ORDER_NUMBER_PREFIX).count()
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    now = timezone.now()
+    started = time.perf_counter()
+    for offset in range(0, missing, SEED_BATCH_SIZE):
+        batch = []
+        for number in range(first + offset, first + min(offset + SEED_BATCH_SIZE, missing)):
+            subtotal = Decimal(random.randint(500, 50000)) / 100
+            batch.append(Order(
+                order_number=f'{ORDER_NUMBER_PREFIX}{number:07d}',
+                customer_id=random.choice(customers),
+                status=random.choices(statuses, weights)[0],
+                subtotal=subtotal,
+                total=subtotal,
+                created_at=now - timedelta(minutes=random.randint(0, 365 * 24 * 60)),
+            ))
+        Order.objects.bulk_create(batch)
+    print(f'Seeded {missing} orders in {time.perf_counter() - started:.1f}s; rebuilding rollups')
+    rebuild()
+    return missing
+
+
+def measure(label, compute, repeat):
+    """Print the query count of one call and the median time of `repeat` calls."""
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        compute()
+    query_count = len(queries)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compute()
+        timings.append(time.perf_counter() - started)
+        # With DEBUG on every query is logged; keep the log from growing
+        reset_queries()
+    print(f'  {label:<34} {query_count:3d} queries  {statistics.median(timings) * 1000:10.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.orders)
+    print(f'{connection.vendor}: {Order.objects.count()} orders, median of {args.repeat} runs')
+
+    if summary(legacy_order_stats()) != summary(Order.get_order_stats()):
+        sys.exit('The grouped pass does not match the per-status queries')
+
+    # Warm the cache so the cached row times hits only
+    Order.get_order_stats(cached=True)
+    measure('order stats, per-status queries', legacy_order_stats, args.repeat)
+    measure('order stats, grouped pass', Order.get_order_stats, args.repeat)
+    measure('order stats, cached', lambda: Order.get_order_stats(cached=True), args.repeat)
+    measure('status counts, from orders', Order.get_status_counts, args.repeat)
+    measure('status counts, from rollups', lambda: Order.get_status_counts(from_rollups=True), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
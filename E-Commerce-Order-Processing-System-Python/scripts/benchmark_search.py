@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Benchmark product search latency on a large catalog.
+Usage: python scripts/benchmark_search.py [--products 500000] [--repeat 20] [--terms wi wireless ...]
+
+Tops the catalog up to --products rows with generated products (SKUs
+BENCH-SEARCH-nnnnnnn, left in place for the next run) and then fetches the
+first and second page of results for each term, the way the products view
+and the infinite-scroll API do, with the full-text index and with the
+icontains filters it replaced. The script prints p50 and p99 latency per
+term, so run it on a scratch database.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.db import connection, reset_queries
+
+from lib.ECommerce.Models.Product import Product
+from lib.ECommerce.Pagination import KeysetPaginator
+from lib.ECommerce.Search import fts_enabled, icontains_search, search_products
+
+SKU_PREFIX = 'BENCH-SEARCH-'
+SEED_BATCH_SIZE = 5000
+PER_PAGE = 10
+
+# Short prefixes match a large share of the catalog, like the first
+# keystrokes of a search; whole and rare words match few
+DEFAULT_TERMS = ['wi', 'pro', 'wireless', 'steel water', 'zircon']
+
+ADJECTIVES = [
+    'wireless', 'portable', 'premium', 'compact', 'classic', 'professional', 'organic', 'smart',
+    'vintage', 'heavy', 'deluxe', 'mini', 'ultra', 'eco', 'waterproof', 'stainless', 'wooden',
+]
+NOUNS = [
+    'headphones', 'charger', 'bottle', 'backpack', 'lamp', 'keyboard', 'jacket', 'novel', 'blender',
+    'speaker', 'helmet', 'puzzle', 'serum', 'wrench', 'mug', 'notebook', 'camera', 'sneakers',
+]
+FILLER = [
+    'steel', 'water', 'designed', 'for', 'everyday', 'use', 'with', 'durable', 'materials', 'and',
+    'a', 'two', 'year', 'warranty', 'lightweight', 'easy', 'to', 'clean', 'gift', 'ready', 'box',
+]
+RARE = ['zircon', 'quokka', 'obsidian']
+
+
+def seed(target):
+    """Add generated products until the catalog holds `target` rows; returns how many were added."""
+    missing = target - Product.objects.count()
+    if missing <= 0:
+        return 0
+
+    first = Product.objects.filter(sku__startswith=SKU_PREFIX).count()
+    categories = [choice[0] for choice in Product.CATEGORY_CHOICES]
+    started = time.perf_counter()
+    for offset in range(0, missing, SEED_BATCH_SIZE):
+        batch = []
+        for number in range(first + offset, first + min(offset + SEED_BATCH_SIZE, missing)):
+            words = random.choices(FILLER, k=20)
+            if random.random() < 0.001:
+                words.append(random.choice(RARE))
+            batch.append(Product(
+                name=f'{random.choice(ADJECTIVES).title()} {random.choice(NOUNS)} {number}',
+                sku=f'{SKU_PREFIX}{number:07d}',
+                description=' '.join(words).capitalize() + '.',
+                category=random.choice(categories),
+                price=Decimal(random.randint(100, 50000)) / 100,
+                stock_quantity=random.randint(0, 500),
+            ))
+        Product.objects.bulk_create(batch)
+    print(f'Seeded {missing} products in {time.perf_counter() - started:.1f}s')
+    return missing
+
+
+def two_pages(queryset):
+    """Fetch the first page and follow its cursor to the second."""
+    paginator = KeysetPaginator(queryset, PER_PAGE)
+    page = paginator.page()
+    if page.next_cursor:
+        paginator.page(page.next_cursor, 2)
+    return len(page)
+
+
+def measure(label, term, search, repeat):
+    """Print p50 and p99 latency of `repeat` two-page searches."""
+    queryset = Product.objects.filter(is_active=True)
+    found = two_pages(search(queryset, term))
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        two_pages(search(queryset, term))
+        latencies.append(time.perf_counter() - started)
+        # With DEBUG on every query is logged; keep the log from growing
+        reset_queries()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+    print(f'  {term!r:<16} {label:<10} p50 {p50:9.1f} ms  p99 {p99:9.1f} ms  first page {found}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS)
+    args = parser.parse_args()
+
+    seed(args.products)
+    if not fts_enabled():
+        sys.exit('The full-text index is not available; search uses icontains only')
+
+    print(f'{connection.vendor}: {Product.objects.count()} products, two pages of {PER_PAGE}, '
+          f'{args.repeat} runs per term')
+    for term in args.terms:
+        measure('fts5', term, search_products, args.repeat)
+        measure('icontains', term, icontains_search, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
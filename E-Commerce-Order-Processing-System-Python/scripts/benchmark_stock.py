@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Stress test stock reservation with many threads on one product.
+Usage: python scripts/benchmark_stock.py [--threads 1 4 16] [--seconds 5] [--stock 2000]
+
+Each round creates a temporary product with --stock units, then every
+thread takes one unit at a time through Product.apply_stock_change until
+the deadline. The script reports reservations per second and checks that
+no unit was sold twice: units sold, the final stock level and the ledger
+must all agree. The product and its ledger rows are deleted afterwards.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.db import connection
+from django.db.models import Sum
+
+from lib.ECommerce.Models.Order import InventoryTransaction
+from lib.ECommerce.Models.Product import Product
+
+BENCHMARK_SKU = 'BENCHMARK-STOCK'
+
+
+def worker(product_id, deadline, results, index):
+    """Take one unit at a time until the deadline."""
+    sold = rejected = 0
+    try:
+        while time.monotonic() < deadline:
+            if Product.apply_stock_change(product_id, -1, 'sale', notes='Stock benchmark') is None:
+                rejected += 1
+            else:
+                sold += 1
+    finally:
+        connection.close()
+    results[index] = (sold, rejected)
+
+
+def run(threads, seconds, stock):
+    """Run one round; returns False if the counts do not agree."""
+    Product.objects.filter(sku=BENCHMARK_SKU).delete()
+    product = Product.objects.create(
+        name='Stock benchmark', sku=BENCHMARK_SKU, category='Other', price=1, stock_quantity=stock, is_active=False
+    )
+    try:
+        results = [None] * threads
+        deadline = time.monotonic() + seconds
+        workers = [
+            threading.Thread(target=worker, args=(product.id, deadline, results, index))
+            for index in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        sold = sum(row[0] for row in results)
+        rejected = sum(row[1] for row in results)
+        product.refresh_from_db()
+        ledger = InventoryTransaction.objects.filter(product=product).aggregate(total=Sum('quantity_change'))['total'] or 0
+        consistent = product.stock_quantity >= 0 and stock - sold == product.stock_quantity == stock + ledger
+        print(f'{threads:3d} threads: {sold / seconds:8.1f} reservations/s  sold {sold}  '
+              f'rejected {rejected}  stock left {product.stock_quantity}  '
+              f'{"OK" if consistent else "OVERSOLD OR LOST UPDATE"}')
+        return consistent
+    finally:
+        product.delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--stock', type=int, default=2000,
+                        help='Units available per round; fewer than the threads can take shows the guard at work')
+    args = parser.parse_args()
+
+    print(f'{connection.vendor}: one product, {args.stock} units, {args.seconds:g}s per round')
+    results = [run(threads, args.seconds, args.stock) for threads in args.threads]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 """
 Import products from Perl database with correct image URLs
+
+Products are upserted by SKU, so running the script again updates the
+existing rows instead of deleting the catalog. For large supplier files use
+`python manage.py import_products <file>` instead.
 """
 import os
 import django
@@ -11,6 +15,9 @@ sys.path.insert(0, os.path.dirname(__file__))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
 django.setup()
 
+from django.db.models import Count
+
+from lib.ECommerce.Imports import import_products
 from lib.ECommerce.Models.Product import Product
 
 # Product data from update_images.pl with image URLs
@@ -58,19 +65,20 @@ products_data = [
 print("Importing products with image URLs...")
 print("-" * 60)
 
-# Delete existing products
-Product.objects.all().delete()
-print("✓ Cleared existing products")
 
-# Import products
-for product_data in products_data:
-    product = Product.objects.create(**product_data)
-    print(f"✓ Created: {product.name} (ID: {product.id})")
+def report_error(line_number, message):
+    print(f"✗ Row {line_number}: {message}")
+
+
+# Upsert by SKU; existing products are kept and updated in place
+stats = import_products(enumerate(products_data, 1), on_error=report_error)
 
 print("-" * 60)
-print(f"\n✓ Successfully imported {len(products_data)} products!")
+print(f"\n✓ Imported {len(products_data)} products: "
+      f"{stats['created']} created, {stats['updated']} updated, {stats['errors']} rejected")
 print("\nProduct Categories:")
-categories = Product.get_categories()
-for cat in categories:
-    count = Product.objects.filter(category=cat).count()
-    print(f"  • {cat}: {count} products")
+counts = dict(
+    Product.objects.order_by().values_list('category').annotate(count=Count('id'))
+)
+for cat in Product.get_categories():
+    print(f"  • {cat}: {counts.get(cat, 0)} products")
@@ -2,9 +2,13 @@
 """
 Import stock quantities for products.
 Usage: python import_stock.py
+
+Stock is written through the same batched path as `manage.py sync_stock`,
+which is the command to use for full warehouse feeds.
 """
 
 import os
+import random
 import sys
 import django
 
@@ -13,6 +17,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lib.ECommerce.Config')
 sys.path.insert(0, os.path.dirname(__file__))
 django.setup()
 
+from django.db.models.functions import Lower
+
+from lib.ECommerce.Imports import get_stock_totals, sync_stock
 from lib.ECommerce.Models.Product import Product
 
 # Stock data - map product names to stock quantities
@@ -45,66 +52,54 @@ STOCK_DATA = {
 
 def import_stock():
     """Import stock quantities for products."""
-    total = 0
-    updated = 0
-    failed = 0
-    
     print("=" * 60)
     print("IMPORTING PRODUCT STOCK")
     print("=" * 60)
-    
+
+    # Resolve every product name to its SKU in one query
+    wanted = {name.lower(): qty for name, qty in STOCK_DATA.items()}
+    skus = dict(
+        Product.objects.annotate(lower_name=Lower('name'))
+        .filter(lower_name__in=list(wanted))
+        .values_list('lower_name', 'sku')
+    )
+
+    records = []
+    failed = 0
     for product_name, stock_qty in STOCK_DATA.items():
-        try:
-            product = Product.objects.get(name__iexact=product_name)
-            old_stock = product.stock_quantity
-            product.stock_quantity = stock_qty
-            product.save()
-            
-            print(f"✓ {product.name}")
-            print(f"  SKU: {product.sku}")
-            print(f"  Stock: {old_stock} → {stock_qty}")
-            print()
-            
-            updated += 1
-            total += stock_qty
-            
-        except Product.DoesNotExist:
+        sku = skus.get(product_name.lower())
+        if sku is None:
             print(f"✗ Product not found: {product_name}")
             failed += 1
-            print()
-    
-    # Also update any remaining products with random stock
-    remaining = Product.objects.filter(stock_quantity=0)
-    for product in remaining:
-        import random
-        stock_qty = random.randint(10, 100)
-        product.stock_quantity = stock_qty
-        product.save()
-        print(f"+ {product.name}")
-        print(f"  SKU: {product.sku}")
-        print(f"  Stock: {stock_qty} (auto-assigned)")
-        print()
-        updated += 1
-        total += stock_qty
-    
+            continue
+        records.append({'sku': sku, 'quantity': stock_qty})
+
+    # Also give any remaining out-of-stock products a random stock level
+    remaining = Product.objects.filter(stock_quantity=0).exclude(sku__in=list(skus.values()))
+    auto_assigned = 0
+    for sku in remaining.values_list('sku', flat=True):
+        records.append({'sku': sku, 'quantity': random.randint(10, 100)})
+        auto_assigned += 1
+
+    stats = sync_stock(enumerate(records, 1), notes='Stock import')
+
     print("=" * 60)
     print("IMPORT SUMMARY")
     print("=" * 60)
-    print(f"Total products updated: {updated}")
-    print(f"Total stock quantity: {total}")
+    print(f"Total products updated: {stats['updated']} ({auto_assigned} auto-assigned)")
+    print(f"Unchanged: {stats['unchanged']}")
     print(f"Failed: {failed}")
     print()
-    
+
     # Show final inventory
-    products = Product.objects.all()
+    totals = get_stock_totals()
     print("FINAL INVENTORY:")
-    print(f"Total products: {products.count()}")
-    total_stock = sum(p.stock_quantity for p in products)
-    print(f"Total stock items: {total_stock}")
+    print(f"Total products: {totals['total_products']}")
+    print(f"Total stock items: {totals['total_stock']}")
     print()
-    
+
     # Show low stock items
-    low_stock = products.filter(stock_quantity__lte=10)
+    low_stock = Product.objects.filter(stock_quantity__lte=10).order_by('stock_quantity')
     if low_stock.exists():
         print("LOW STOCK ITEMS:")
         for product in low_stock: